@@ -3,13 +3,39 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import random
+import timeit
 import unittest
 
 import isolation
 import game_agent
+import competition_agent
 
 from importlib import reload
 
+from sample_players import improved_score
+from transposition import TranspositionTable, EXACT, LOWER
+
+
+def minimax_value(game, player, depth):
+    """Reference fixed-depth minimax value of a position for `player`. """
+    moves = game.get_legal_moves()
+    if not moves:
+        return game.utility(player)
+    if depth == 0:
+        return improved_score(game, player)
+    values = [minimax_value(game.forecast_move(m), player, depth - 1) for m in moves]
+    return max(values) if game.active_player == player else min(values)
+
+
+def random_position(player1, player2, num_moves, seed):
+    """Return a board advanced by `num_moves` random legal moves. """
+    rng = random.Random(seed)
+    game = isolation.Board(player1, player2)
+    for _ in range(num_moves):
+        game.apply_move(rng.choice(game.get_legal_moves(shuffle=False)))
+    return game
+
 
 class IsolationTest(unittest.TestCase):
     """Unit tests for isolation agents"""
@@ -21,5 +47,282 @@ class IsolationTest(unittest.TestCase):
         self.game = isolation.Board(self.player1, self.player2)
 
 
+class TranspositionTableTest(unittest.TestCase):
+    """Unit tests for the transposition table"""
+
+    def test_replacement(self):
+        tt = TranspositionTable(size=4, replacement="depth")
+        tt.store(1, 5, 1., EXACT, (0, 0))
+        tt.store(5, 3, 2., EXACT, (1, 1))
+        self.assertEqual(tt.probe(1).depth, 5)
+        self.assertIsNone(tt.probe(5))
+        tt.store(5, 6, 2., LOWER, (1, 1))
+        self.assertEqual(tt.lookup(5, 6, 0., 1.), (2., (1, 1)))
+        self.assertEqual(tt.lookup(5, 6, 0., 3.), (None, (1, 1)))
+
+        tt = TranspositionTable(size=4, replacement="always")
+        tt.store(1, 5, 1., EXACT, (0, 0))
+        tt.store(5, 3, 2., EXACT, (1, 1))
+        self.assertIsNone(tt.probe(1))
+        self.assertEqual(tt.probe(5).move, (1, 1))
+
+    def test_alphabeta_values(self):
+        for seed in range(6):
+            player = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+            player.time_left = lambda: float("inf")
+            game = random_position(player, "Opponent", 2 + 2 * (seed % 3), seed)
+            for depth in range(1, 5):
+                move = player.alphabeta(game, depth)
+                best = max(minimax_value(game.forecast_move(m), player, depth - 1)
+                           for m in game.get_legal_moves())
+                self.assertEqual(minimax_value(game.forecast_move(move), player, depth - 1), best)
+
+    def test_mirrored_seat(self):
+        # search a position as player 1, then one of its successors in a game
+        # where the same agent holds the player 2 seat; the stored scores of
+        # the first search must not be reused from the other point of view
+        for seed in range(4):
+            player = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+            player.time_left = lambda: float("inf")
+            rng = random.Random(seed)
+            first = isolation.Board(player, "Opponent")
+            second = isolation.Board("Opponent", player)
+            for _ in range(4):
+                move = rng.choice(first.get_legal_moves())
+                first.apply_move(move)
+                second.apply_move(move)
+            second.apply_move(rng.choice(second.get_legal_moves()))
+            for depth in range(1, 5):
+                player.alphabeta(first, depth)
+            move = player.alphabeta(second, 3)
+            best = max(minimax_value(second.forecast_move(m), player, 2)
+                       for m in second.get_legal_moves())
+            self.assertEqual(minimax_value(second.forecast_move(move), player, 2), best)
+
+    def test_symmetric_entries(self):
+        # positions symmetric about a diagonal reach mirrored transpositions,
+        # which share table entries only when the table is keyed by the
+        # canonical form; the root values must not change
+        nodes = {True: 0, False: 0}
+        for opening in [[(3, 3), (0, 0)], [(3, 3), (2, 2)], [(0, 0), (6, 6)]]:
+            for symmetry in (True, False):
+                random.seed(0)
+                player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                                    tt_symmetry=symmetry)
+                player.time_left = lambda: float("inf")
+                game = isolation.Board(player, "Opponent")
+                for move in opening:
+                    game.apply_move(move)
+                for depth in range(1, 5):
+                    move = player.alphabeta(game, depth)
+                nodes[symmetry] += sum(player.node_counts.values())
+                best = max(minimax_value(game.forecast_move(m), player, 3)
+                           for m in game.get_legal_moves())
+                self.assertEqual(minimax_value(game.forecast_move(move), player, 3), best)
+        self.assertLess(nodes[True], nodes[False])
+
+
+class MoveOrderingTest(unittest.TestCase):
+    """Unit tests for alpha-beta move ordering and search statistics"""
+
+    def test_ordered_values(self):
+        # iteratively deepen the same positions with and without ordering;
+        # the root values must agree and ordering must visit fewer nodes
+        nodes = {True: 0, False: 0}
+        for seed in range(4):
+            for ordering in (True, False):
+                random.seed(seed)
+                player = game_agent.AlphaBetaPlayer(score_fn=improved_score, tt_size=0,
+                                                    move_ordering=ordering)
+                player.time_left = lambda: float("inf")
+                game = random_position(player, "Opponent", 4, seed)
+                for depth in range(1, 6):
+                    move = player.alphabeta(game, depth)
+                nodes[ordering] += player.node_counts[5]
+                best = max(minimax_value(game.forecast_move(m), player, 4)
+                           for m in game.get_legal_moves())
+                self.assertEqual(minimax_value(game.forecast_move(move), player, 4), best)
+        self.assertLess(nodes[True], nodes[False])
+
+    def test_decided_roots(self):
+        # a root where every move loses must still return a legal move, and
+        # one where a move wins must still record its principal variation
+        for value in (float("-inf"), float("inf")):
+            player = game_agent.AlphaBetaPlayer(score_fn=lambda game, player: value)
+            player.time_left = lambda: float("inf")
+            game = random_position(player, "Opponent", 2, 0)
+            for depth in range(1, 4):
+                move = player.alphabeta(game, depth)
+                self.assertIn(move, game.get_legal_moves())
+                self.assertEqual(player.pv[0], move)
+                self.assertEqual(len(player.pv), depth)
+
+    def test_node_counts(self):
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+        game = random_position(player, "Opponent", 2, 0)
+        deadline = timeit.default_timer() + 0.1
+        move = player.get_move(game, lambda: 1000 * (deadline - timeit.default_timer()))
+        self.assertIn(move, game.get_legal_moves())
+        depths = sorted(player.node_counts)
+        self.assertEqual(depths, list(range(1, len(depths) + 1)))
+        self.assertTrue(all(n > 0 for n in player.node_counts.values()))
+        self.assertTrue(all(isinstance(c, tuple) for c in player.cutoff_counts.values()))
+        self.assertEqual(sorted(player.cutoff_counts), depths)
+
+        stats = player.search_stats()
+        self.assertEqual(stats.depth, player.depth_reached)
+        self.assertEqual(stats.nodes, sum(player.node_counts.values()))
+        self.assertTrue(0. <= stats.tt_hit_rate <= 1.)
+
+    def test_large_board(self):
+        # the agent plays legal moves in time on a 21x21 board, including
+        # the first moves, where no iteration may finish before the deadline
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+        game = isolation.Board(player, "Opponent", width=21, height=21)
+        for _ in range(3):
+            deadline = timeit.default_timer() + 0.1
+            move = player.get_move(game, lambda: 1000 * (deadline - timeit.default_timer()))
+            self.assertGreater(deadline, timeit.default_timer())
+            self.assertIn(move, game.get_legal_moves())
+            game.apply_move(move)
+            game.apply_move(game.get_legal_moves(shuffle=False)[0])
+        self.assertGreater(player.depth_reached, 1)
+
+
+class SearchModeTest(unittest.TestCase):
+    """Unit tests for principal variation search and aspiration windows"""
+
+    def test_root_values(self):
+        for mode in game_agent.SEARCH_MODES:
+            for seed in range(4):
+                random.seed(seed)
+                player = game_agent.AlphaBetaPlayer(score_fn=improved_score, search_mode=mode)
+                player.time_left = lambda: float("inf")
+                player.reset_search()
+                game = random_position(player, "Opponent", 2 + 2 * seed, seed)
+                move = player.iterative_deepening(game, depth_limit=5)
+                best = max(minimax_value(game.forecast_move(m), player, 4)
+                           for m in game.get_legal_moves())
+                self.assertEqual(player.depth_reached, 5)
+                self.assertEqual(player.root_score, best, (mode, seed))
+                self.assertEqual(minimax_value(game.forecast_move(move), player, 4), best)
+
+    def test_window_failure(self):
+        # a window that excludes the root score is searched again
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score, search_mode="aspiration",
+                                            aspiration_window=0.)
+        player.time_left = lambda: float("inf")
+        player.reset_search()
+        game = random_position(player, "Opponent", 4, 0)
+        player.iterative_deepening(game, depth_limit=4)
+        value = minimax_value(game, player, 4)
+        self.assertEqual(player.root_score, value)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            game_agent.AlphaBetaPlayer(search_mode="mtdf")
+
+
+class SelectiveSearchTest(unittest.TestCase):
+    """Unit tests for late move reductions and futility pruning"""
+
+    def search(self, selective, seed):
+        random.seed(seed)
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score, selective=selective)
+        player.time_left = lambda: float("inf")
+        player.reset_search()
+        game = random_position(player, "Opponent", 4, seed)
+        move = player.iterative_deepening(game, depth_limit=7)
+        self.assertIn(move, game.get_legal_moves())
+        return sum(player.node_counts.values()), player.root_score
+
+    def test_disabled(self):
+        # no reduced or futile node: only the move order changes, so the
+        # root value is exact
+        off = game_agent.SelectiveSearch(reduction_depth=100, futility_depth=0)
+        for seed in range(3):
+            self.assertEqual(self.search(off, seed)[1], self.search(None, seed)[1])
+
+    def test_null_window_research(self):
+        # late moves searched by a null window at full depth, then again
+        # with the full window if they beat the bound, keep the exact value
+        exact = game_agent.SelectiveSearch(reduction=0, futility_depth=0)
+        for seed in range(6):
+            self.assertEqual(self.search(exact, seed)[1], self.search(None, seed)[1])
+
+    def test_nodes(self):
+        nodes = {True: 0, False: 0}
+        for seed in range(4):
+            nodes[True] += self.search(game_agent.SelectiveSearch(), seed)[0]
+            nodes[False] += self.search(None, seed)[0]
+        self.assertLess(nodes[True], nodes[False])
+
+
+class SearchClockTest(unittest.TestCase):
+    """Unit tests for the amortized search deadline check"""
+
+    def test_interval(self):
+        # a fake timer losing 0.01 ms per node
+        nodes = [0]
+        clock = game_agent.SearchClock(lambda: 100. - 0.01 * nodes[0], threshold=10.)
+        with self.assertRaises(game_agent.SearchTimeout):
+            while True:
+                nodes[0] += 1
+                clock.countdown -= 1
+                if not clock.countdown:
+                    clock.check()
+        # the timer is read about every 0.5 ms, and the search stops within
+        # the threshold but less than 0.5 ms after crossing it
+        self.assertLess(clock.checks, nodes[0] / 20)
+        self.assertGreater(100. - 0.01 * nodes[0], 10. - 0.5)
+        self.assertLessEqual(100. - 0.01 * nodes[0], 10.)
+
+    def test_deadline(self):
+        for player in (game_agent.MinimaxPlayer(search_depth=20, score_fn=improved_score),
+                       game_agent.AlphaBetaPlayer(score_fn=improved_score)):
+            game = random_position(player, "Opponent", 2, 0)
+            deadline = timeit.default_timer() + 0.1
+            time_left = lambda: 1000 * (deadline - timeit.default_timer())
+            player.get_move(game, time_left)
+            self.assertGreater(time_left(), 0)
+            self.assertLess(time_left(), player.TIMER_THRESHOLD)
+            self.assertLess(player.clock.checks, 1000)
+
+
+class MCTSPlayerTest(unittest.TestCase):
+    """Unit tests for the Monte Carlo tree search agent"""
+
+    def test_tree_reuse(self):
+        player = competition_agent.CustomPlayer()
+        opponent = "Opponent"
+        game = random_position(player, opponent, 4, 0)
+        deadline = timeit.default_timer() + 0.05
+        time_left = lambda: 1000 * (deadline - timeit.default_timer()) + 10.
+        move = player.get_move(game, time_left)
+        self.assertIn(move, game.get_legal_moves())
+        self.assertGreater(player.stats.playouts, 0)
+        self.assertGreater(player.stats.playouts_per_second, 0)
+        self.assertGreater(player.stats.bytes_per_node, 0)
+        self.assertEqual(player.stats.reused_nodes, 0)
+
+        # the subtree under the opponent's most searched reply is reused
+        reply = max(player._root.children, key=lambda c: c.visits)
+        game.apply_move(move)
+        game.apply_move(reply.move)
+        deadline = timeit.default_timer() + 0.05
+        move = player.get_move(game, time_left)
+        self.assertIn(move, game.get_legal_moves())
+        self.assertGreater(player.stats.reused_nodes, 0)
+
+    def test_low_time(self):
+        # a move is returned even if no iteration finishes in time
+        player = competition_agent.CustomPlayer()
+        game = random_position(player, "Opponent", 4, 0)
+        move = player.get_move(game, lambda: 5.)
+        self.assertIn(move, game.get_legal_moves())
+        self.assertEqual(player.stats.playouts, 0)
+        self.assertIsNone(player._root)
+
+
 if __name__ == '__main__':
     unittest.main()
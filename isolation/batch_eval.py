@@ -0,0 +1,218 @@
+"""This file contains vectorized versions of the evaluation features and
+heuristics of `sample_players` and `game_agent`, which score a whole batch
+of leaf positions with a few NumPy operations instead of one Python call
+per board.
+
+A batch stores each position as a 64-bit mask of the blocked cells and the
+cell indices of the two players, using the cell layout of `isolation.tables`
+(`row + column * height`), so boards of up to 64 cells are supported.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from isolation import Board, BitBoard
+from isolation.tables import knight_tables
+from sample_players import improved_score
+from game_agent import custom_score, custom_score_3
+
+# a batch of positions scored from the point of view of one player
+BoardBatch = namedtuple("BoardBatch", ["width", "height", "blocked", "own", "opp", "own_active"])
+BatchTables = namedtuple("BatchTables", ["masks", "neighbors", "rows", "cols"])
+
+
+def _swar_popcount(x):
+    """Count the set bits of each element of a uint64 array. """
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0f0f0f0f0f0f0f0f)
+    return ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(x):
+        """Count the set bits of each element of a uint64 array. """
+        return np.bitwise_count(x).astype(np.int64)
+else:
+    popcount = _swar_popcount
+
+
+@lru_cache(maxsize=None)
+def batch_tables(width, height):
+    """Return the knight-move tables of `isolation.tables.knight_tables` as
+    NumPy arrays, with one extra sentinel cell (index `width * height`) that
+    has no neighbors, used to pad the neighbor lists to 8 entries.
+
+    Returns
+    -------
+    BatchTables
+        `masks` holds the neighbor bitmask of each cell, `neighbors` the
+        (cells + 1, 8) array of neighbor indices, and `rows` and `cols` the
+        coordinates of each cell.
+    """
+    size = width * height
+    if size > 64:
+        raise ValueError("Batches support boards of up to 64 cells, not {}x{}".format(width, height))
+    tables = knight_tables(width, height)
+    masks = np.zeros(size + 1, dtype=np.uint64)
+    masks[:size] = tables.masks
+    neighbors = np.full((size + 1, 8), size, dtype=np.int64)
+    for idx, cells in enumerate(tables.neighbors):
+        neighbors[idx, :len(cells)] = [n_idx for _, n_idx in cells]
+    rows = np.array([r for r, _ in tables.cells] + [0])
+    cols = np.array([c for _, c in tables.cells] + [0])
+    return BatchTables(masks, neighbors, rows, cols)
+
+
+def pack_boards(boards, player):
+    """Pack a sequence of boards of the same size into a `BoardBatch` scored
+    from the point of view of `player`. The players must have moved.
+    """
+    boards = [board if isinstance(board, BitBoard) else BitBoard.from_board(board)
+              for board in boards]
+    width, height = boards[0].width, boards[0].height
+    blocked = np.array([board._blocked for board in boards], dtype=np.uint64)
+    own, opp, own_active = [], [], []
+    for board in boards:
+        slot = 0 if player == board._player_1 else 1
+        own.append(board._locs[slot])
+        opp.append(board._locs[slot ^ 1])
+        own_active.append(board.move_count & 1 == slot)
+    if Board.NOT_MOVED in own or Board.NOT_MOVED in opp:
+        raise ValueError("Batches can only hold positions where both players have moved")
+    return BoardBatch(width, height, blocked, np.array(own, dtype=np.int64),
+                      np.array(opp, dtype=np.int64), np.array(own_active))
+
+
+def pack_children(game, moves, player):
+    """Pack the positions reached by each of `moves` of the active player
+    in `game` into a `BoardBatch` scored from the point of view of
+    `player`, without creating a board for each of them.
+    """
+    if not isinstance(game, BitBoard):
+        game = BitBoard.from_board(game)
+    slot = game.move_count & 1
+    if game._locs[slot ^ 1] is Board.NOT_MOVED:
+        raise ValueError("Batches can only hold positions where both players have moved")
+    height = game.height
+    cells = np.array([r + c * height for r, c in moves], dtype=np.int64)
+    blocked = np.uint64(game._blocked) | (np.uint64(1) << cells.astype(np.uint64))
+    waiting = np.full(len(cells), game._locs[slot ^ 1], dtype=np.int64)
+    # after each move the player who moved waits, so `player` is active in
+    # the children iff it is waiting in `game`
+    if (player == game._player_1) == (slot == 0):
+        own, opp, own_active = cells, waiting, False
+    else:
+        own, opp, own_active = waiting, cells, True
+    return BoardBatch(game.width, height, blocked, own, opp,
+                      np.full(len(cells), own_active))
+
+
+def mobility(batch, locs):
+    """Return the number of legal moves from the cells `locs` of each
+    position in the batch.
+    """
+    masks = batch_tables(batch.width, batch.height).masks
+    return popcount(masks[locs] & ~batch.blocked)
+
+
+def two_ply_mobility(batch, locs):
+    """Return, for each position in the batch, the total number of legal
+    moves after each legal move from the cells `locs`.
+    """
+    tables = batch_tables(batch.width, batch.height)
+    neighbors = tables.neighbors[locs]
+    is_open = ((batch.blocked[:, None] >> neighbors.astype(np.uint64)) & np.uint64(1)) == 0
+    replies = popcount(tables.masks[neighbors] & ~batch.blocked[:, None])
+    return (replies * is_open).sum(axis=1)
+
+
+def center_distance(batch, locs):
+    """Return the Manhattan distance from the cells `locs` to the center
+    cell (height // 2, width // 2) of the board.
+    """
+    tables = batch_tables(batch.width, batch.height)
+    return (np.abs(tables.rows[locs] - batch.height // 2) +
+            np.abs(tables.cols[locs] - batch.width // 2))
+
+
+def player_distance(batch):
+    """Return the Manhattan distance between the two players. """
+    tables = batch_tables(batch.width, batch.height)
+    return (np.abs(tables.rows[batch.own] - tables.rows[batch.opp]) +
+            np.abs(tables.cols[batch.own] - tables.cols[batch.opp]))
+
+
+def _terminal(batch, own_moves, opp_moves, scores):
+    """Replace the scores of won and lost positions by +/-inf, like the
+    is_winner()/is_loser() checks of the scalar heuristics.
+    """
+    active_moves = np.where(batch.own_active, own_moves, opp_moves)
+    done = active_moves == 0
+    scores = np.where(done & batch.own_active, float("-inf"), scores)
+    return np.where(done & ~batch.own_active, float("inf"), scores)
+
+
+def improved_scores(batch):
+    """Vectorized `sample_players.improved_score`. """
+    own_moves, opp_moves = mobility(batch, batch.own), mobility(batch, batch.opp)
+    return _terminal(batch, own_moves, opp_moves, (own_moves - opp_moves).astype(float))
+
+
+def custom_scores(batch):
+    """Vectorized `game_agent.custom_score`. """
+    own_moves, opp_moves = mobility(batch, batch.own), mobility(batch, batch.opp)
+    scores = (own_moves - 2 * opp_moves) / player_distance(batch)
+    return _terminal(batch, own_moves, opp_moves, scores)
+
+
+def custom_scores_3(batch):
+    """Vectorized `game_agent.custom_score_3`. """
+    own_moves, opp_moves = mobility(batch, batch.own), mobility(batch, batch.opp)
+    by_center = center_distance(batch, batch.opp) - 2 * center_distance(batch, batch.own)
+    scores = np.where(own_moves != opp_moves, own_moves - 2 * opp_moves, by_center)
+    return _terminal(batch, own_moves, opp_moves, scores.astype(float))
+
+
+# the vectorized counterpart of each scalar heuristic
+BATCH_SCORES = {
+    improved_score: improved_scores,
+    custom_score: custom_scores,
+    custom_score_3: custom_scores_3,
+}
+
+
+class FrontierScorer:
+    """Score all children of a search node in one vectorized call, for the
+    `frontier_score_fn` of `game_agent.AlphaBetaPlayer`.
+
+    Parameters
+    ----------
+    score_fn : callable (optional)
+        The scalar heuristic to reproduce; one of the keys of
+        `BATCH_SCORES`.
+    """
+    def __init__(self, score_fn=improved_score):
+        self.batch_fn = BATCH_SCORES[score_fn]
+
+    def __call__(self, game, moves, player):
+        """Return the list of scores of the positions reached by each of
+        `moves` in `game`, from the point of view of `player`, or None if
+        the waiting player has not moved yet.
+        """
+        if game.get_player_location(game.inactive_player) is Board.NOT_MOVED:
+            return None
+        return self.batch_fn(pack_children(game, moves, player)).tolist()
+
+
+def evaluate(boards, player, score_fn=improved_score):
+    """Score a list of boards from the point of view of `player` with the
+    vectorized counterpart of the heuristic `score_fn` in one call.
+
+    Returns
+    -------
+    numpy.ndarray
+        The score of each board, equal to `score_fn(board, player)`.
+    """
+    return BATCH_SCORES[score_fn](pack_boards(boards, player))
@@ -0,0 +1,84 @@
+"""Unit tests for the vectorized evaluation of batches of boards. """
+
+import random
+import unittest
+
+import numpy as np
+
+from isolation import BitBoard
+from batch_eval import (FrontierScorer, center_distance, evaluate, pack_boards,
+                        pack_children, two_ply_mobility)
+from agent_test import minimax_value, random_position
+from game_agent import AlphaBetaPlayer, custom_score, custom_score_3
+from sample_players import improved_score
+
+
+def random_boards(num_boards, seed=0):
+    """Return boards from random games after both players have moved. """
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < num_boards:
+        game = BitBoard("Player1", "Player2")
+        game.apply_move(rng.choice(game.get_legal_moves()))
+        while True:
+            game.apply_move(rng.choice(game.get_legal_moves()))
+            boards.append(game.copy())
+            if not game.get_legal_moves():
+                break
+    return boards
+
+
+class BatchEvalTest(unittest.TestCase):
+    """Unit tests for the batch evaluation functions"""
+
+    def test_scores(self):
+        boards = random_boards(300)
+        for score_fn in (improved_score, custom_score, custom_score_3):
+            for player in ("Player1", "Player2"):
+                expected = [score_fn(board, player) for board in boards]
+                self.assertEqual(evaluate(boards, player, score_fn).tolist(), expected)
+
+    def test_features(self):
+        boards = random_boards(100, seed=1)
+        batch = pack_boards(boards, "Player1")
+        two_ply = two_ply_mobility(batch, batch.own)
+        center = center_distance(batch, batch.own)
+        for board, moves, distance in zip(boards, two_ply, center):
+            r, c = board.get_player_location("Player1")
+            self.assertEqual(distance, abs(r - 3) + abs(c - 3))
+            total = 0
+            for move in board.get_legal_moves("Player1"):
+                # the legal moves of player 1 if it had moved there
+                after = board.copy()
+                after._blocked |= 1 << (move[0] + move[1] * 7)
+                after._locs[0] = move[0] + move[1] * 7
+                total += len(after.get_legal_moves("Player1"))
+            self.assertEqual(moves, total)
+
+    def test_pack_children(self):
+        for board in random_boards(50, seed=2):
+            moves = board.get_legal_moves()
+            if not moves:
+                continue
+            for player in ("Player1", "Player2"):
+                children = pack_children(board, moves, player)
+                expected = pack_boards([board.forecast_move(m) for m in moves], player)
+                for field in ("blocked", "own", "opp", "own_active"):
+                    np.testing.assert_array_equal(getattr(children, field),
+                                                  getattr(expected, field))
+
+    def test_frontier_search(self):
+        for seed in range(4):
+            player = AlphaBetaPlayer(score_fn=improved_score,
+                                     frontier_score_fn=FrontierScorer(improved_score))
+            player.time_left = lambda: float("inf")
+            game = random_position(player, "Opponent", 2 + 2 * seed, seed)
+            for depth in range(1, 5):
+                move = player.alphabeta(game, depth)
+                best = max(minimax_value(game.forecast_move(m), player, depth - 1)
+                           for m in game.get_legal_moves())
+                self.assertEqual(minimax_value(game.forecast_move(move), player, depth - 1), best)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Benchmark of the board engines and the alpha-beta agent on boards of
+growing size. Every cell of a `BitBoard` is one bit of an arbitrary
+precision integer, so its moves cost about the same on any board, while
+the list-backed `Board` copies its whole state on every move.
+
+Run this file to print the speed of each engine and of the search on
+square boards from 7x7 to 21x21:
+
+    python board_scaling.py
+"""
+import timeit
+from collections import namedtuple
+
+from isolation import Board, BitBoard
+from game_agent import AlphaBetaPlayer
+from perft import perft, perft_in_place
+from sample_players import improved_score
+
+# the board sizes measured, and the depth of the perft and of the search
+# from the opening position of each board
+SIZES = (7, 9, 11, 15, 21)
+DEPTH = 5
+
+# the positions per second of perft with forecast_move() on `Board` and
+# with apply_move()/undo_move() on `BitBoard`, the nodes per second of
+# the agent's search, and the microseconds taken by a flood fill of the
+# region reachable from the opening (`BitBoard.region`), the worst case of
+# a region connectivity check
+Scaling = namedtuple("Scaling", ["size", "board_perft", "bitboard_perft", "search",
+                                 "region_usec"])
+
+
+def opening(engine, size, players=("Player1", "Player2")):
+    """Return a `size` x `size` board of class `engine` with both players
+    next to the center.
+    """
+    game = engine(players[0], players[1], width=size, height=size)
+    center = size // 2
+    game.apply_move((center, center))
+    game.apply_move((center - 1, center + 1))
+    return game
+
+
+def measure(size, depth=DEPTH):
+    """Measure the engines and the agent on a `size` x `size` board.
+
+    Returns
+    -------
+    Scaling
+        The speeds measured.
+    """
+    speeds = []
+    for engine, method in ((Board, perft), (BitBoard, perft_in_place)):
+        game = opening(engine, size)
+        start = timeit.default_timer()
+        count = method(game, depth)
+        speeds.append(count / (timeit.default_timer() - start))
+
+    player = AlphaBetaPlayer(score_fn=improved_score)
+    player.time_left = lambda: float("inf")
+    game = opening(BitBoard, size, (player, "Opponent"))
+    start = timeit.default_timer()
+    player.iterative_deepening(game, depth_limit=depth)
+    speeds.append(sum(player.node_counts.values()) / (timeit.default_timer() - start))
+
+    number = 1000
+    game = opening(BitBoard, size)
+    elapsed = timeit.timeit(lambda: game.region("Player1"), number=number)
+    return Scaling(size, *speeds, region_usec=1e6 * elapsed / number)
+
+
+def main():
+    print("{:<8}{:>14}{:>16}{:>14}{:>14}".format(
+        "Board", "Board pos/s", "BitBoard pos/s", "Search n/s", "Region usec"))
+    for size in SIZES:
+        result = measure(size)
+        print("{:<8}{:>14.0f}{:>16.0f}{:>14.0f}{:>14.1f}".format(
+            "{0}x{0}".format(size), *result[1:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Unit tests for the board size benchmark. """
+
+import unittest
+
+from board_scaling import measure, opening
+from isolation import Board, BitBoard
+from perft import perft, perft_in_place
+
+
+class BoardScalingTest(unittest.TestCase):
+    """Unit tests for the board size benchmark"""
+
+    def test_openings(self):
+        # both engines count the same positions on every board measured
+        for size in (7, 21):
+            self.assertEqual(perft(opening(Board, size), 3),
+                             perft_in_place(opening(BitBoard, size), 3))
+
+    def test_measure(self):
+        result = measure(9, depth=2)
+        self.assertEqual(result.size, 9)
+        self.assertTrue(all(speed > 0 for speed in result[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+"""Unit tests comparing the alternative board engines against the reference
+list-backed `isolation.Board`.
+"""
+
+import inspect
+import random
+import unittest
+
+from isolation import Board, BitBoard
+from isolation.tables import knight_tables, knight_spread, symmetry_tables
+from game_agent import AlphaBetaPlayer
+from sample_players import RandomPlayer, improved_score
+
+
+def random_games(num_games, seed=0, width=7, height=7):
+    """Yield pairs of (Board, BitBoard) advanced through the same random
+    sequence of moves, one pair per ply.
+    """
+    rng = random.Random(seed)
+    for _ in range(num_games):
+        board = Board("Player1", "Player2", width=width, height=height)
+        bitboard = BitBoard("Player1", "Player2", width=width, height=height)
+        while True:
+            yield board, bitboard
+            moves = board.get_legal_moves()
+            if not moves:
+                break
+            move = rng.choice(moves)
+            board.apply_move(move)
+            bitboard.apply_move(move)
+
+
+class KnightTablesTest(unittest.TestCase):
+    """Unit tests for the cached move lookup tables"""
+
+    def test_neighbors(self):
+        for width, height in [(7, 7), (5, 8), (1, 3), (21, 21)]:
+            tables = knight_tables(width, height)
+            self.assertIs(tables, knight_tables(width, height))
+            for idx, (r, c) in enumerate(tables.cells):
+                expected = {(r + dr, c + dc) for dr, dc in [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                                                            (1, -2), (1, 2), (2, -1), (2, 1)]
+                            if 0 <= r + dr < height and 0 <= c + dc < width}
+                self.assertEqual({move for move, _ in tables.neighbors[idx]}, expected)
+                self.assertEqual(bin(tables.masks[idx]).count("1"), len(expected))
+                self.assertEqual(knight_spread(1 << idx, tables.shifts), tables.masks[idx])
+
+    def test_symmetries(self):
+        for width, height, count in [(7, 7, 8), (5, 8, 4)]:
+            tables = knight_tables(width, height)
+            symmetries = symmetry_tables(width, height)
+            self.assertEqual(len(set(symmetries.forward)), count)
+            self.assertEqual(symmetries.forward[0], tuple(range(width * height)))
+            for perm, inv in zip(*symmetries):
+                self.assertEqual([inv[idx] for idx in perm], list(range(width * height)))
+                for idx, neighbors in enumerate(tables.neighbors):
+                    self.assertEqual({perm[n_idx] for _, n_idx in neighbors},
+                                     {n_idx for _, n_idx in tables.neighbors[perm[idx]]})
+
+
+class BitBoardTest(unittest.TestCase):
+    """Unit tests for the bitboard engine"""
+
+    def test_matches_board(self):
+        for board, bitboard in random_games(20):
+            self.assertEqual(board.to_string(), bitboard.to_string())
+            self.assertEqual(board.get_blank_spaces(), bitboard.get_blank_spaces())
+            self.assertEqual(board.active_player, bitboard.active_player)
+            self.assertEqual(board.hash(), bitboard.hash())
+            for player in ("Player1", "Player2"):
+                self.assertEqual(board.get_player_location(player),
+                                 bitboard.get_player_location(player))
+                self.assertEqual(sorted(board.get_legal_moves(player)),
+                                 sorted(bitboard.get_legal_moves(player)))
+                self.assertEqual(board.utility(player), bitboard.utility(player))
+
+    def test_overrides_list_state(self):
+        for name, attr in vars(Board).items():
+            if isinstance(attr, property):
+                attr = attr.fget
+            if not callable(attr):
+                continue
+            source = inspect.getsource(attr)
+            if "_board_state" in source or "__get_moves" in source:
+                self.assertIn(name, vars(BitBoard), name)
+        bitboard = BitBoard("Player1", "Player2")
+        bitboard.apply_move((3, 3))
+        bitboard.apply_move((0, 0))
+        self.assertEqual(sorted(bitboard._Board__get_moves((3, 3))),
+                         sorted(bitboard.get_legal_moves()))
+
+    def test_move_cache(self):
+        # the cached moves and counts follow every move, and callers get
+        # lists of their own
+        for board, bitboard in random_games(5, seed=5):
+            for engine in (board, bitboard):
+                for player in ("Player1", "Player2"):
+                    moves = engine.get_legal_moves(player, shuffle=False)
+                    opp_moves = engine.get_legal_moves(engine.get_opponent(player))
+                    self.assertEqual(engine.mobility(player), len(moves))
+                    self.assertEqual(engine.status(player),
+                                     (engine.utility(player), len(moves), len(opp_moves)))
+                    moves.clear()
+                    self.assertEqual(engine.mobility(player),
+                                     len(engine.get_legal_moves(player, shuffle=False)))
+
+            # undo_move restores the moves of the parent state
+            moves = bitboard.get_legal_moves(shuffle=False)
+            if moves:
+                bitboard.apply_move(moves[0])
+                self.assertEqual(bitboard.mobility(),
+                                 len(BitBoard.from_board(bitboard).get_legal_moves()))
+                bitboard.undo_move()
+                self.assertEqual(bitboard.get_legal_moves(shuffle=False), moves)
+                self.assertEqual(bitboard.mobility(), len(moves))
+
+    def test_large_boards(self):
+        # the engines agree on boards far wider than a machine word
+        for width, height in [(15, 15), (21, 21), (9, 13)]:
+            for board, bitboard in random_games(1, seed=6, width=width, height=height):
+                self.assertEqual(board.to_string(), bitboard.to_string())
+                self.assertEqual(board.hash(), bitboard.hash())
+                for player in ("Player1", "Player2"):
+                    self.assertEqual(sorted(board.get_legal_moves(player)),
+                                     sorted(bitboard.get_legal_moves(player)))
+                    self.assertEqual(board.status(player), bitboard.status(player))
+
+    def test_regions(self):
+        # the flood fill finds the cells reachable by the knight's moves of
+        # each player
+        def reachable(game, player):
+            game = game.copy()
+            seen, frontier = set(), [game.get_player_location(player)]
+            while frontier:
+                r, c = frontier.pop()
+                for move in game._Board__get_moves((r, c)):
+                    if move not in seen:
+                        seen.add(move)
+                        frontier.append(move)
+            return {move[0] + move[1] * game.height for move in seen}
+
+        for width, height in [(7, 7), (21, 21)]:
+            for _, bitboard in random_games(2, seed=7, width=width, height=height):
+                if bitboard.move_count < 2:
+                    self.assertIsNone(bitboard.regions())
+                    continue
+                cells = {}
+                for player in ("Player1", "Player2"):
+                    region = bitboard.region(player)
+                    cells[player] = {idx for idx in range(width * height) if region >> idx & 1}
+                    self.assertEqual(cells[player], reachable(bitboard, player))
+                regions = bitboard.regions()
+                separated = not cells["Player1"] & cells["Player2"]
+                self.assertEqual(regions is not None, separated)
+                if separated:
+                    self.assertEqual(regions, (bitboard.region(bitboard.active_player),
+                                               bitboard.region(bitboard.inactive_player)))
+
+    def test_from_board(self):
+        for board, bitboard in random_games(5, seed=1):
+            converted = BitBoard.from_board(board)
+            self.assertEqual(converted.to_string(), bitboard.to_string())
+            self.assertEqual(converted.hash(), bitboard.hash())
+            self.assertEqual(converted.active_player, bitboard.active_player)
+
+    def test_undo_move(self):
+        game = BitBoard("Player1", "Player2")
+        states = []
+        rng = random.Random(2)
+        while game.get_legal_moves():
+            states.append((game.to_string(), game.hash(), game.active_player))
+            game.apply_move(rng.choice(game.get_legal_moves()))
+        while states:
+            game.undo_move()
+            self.assertEqual(states.pop(), (game.to_string(), game.hash(), game.active_player))
+        self.assertEqual(game.move_count, 0)
+
+    def test_canonical_key(self):
+        rng = random.Random(4)
+        symmetries = symmetry_tables(7, 7)
+        for board, bitboard in random_games(3, seed=4):
+            key, sym = board.canonical_key()
+            self.assertEqual((key, sym), bitboard.canonical_key())
+            self.assertEqual(board.transform(sym).hash(), key)
+            for s, perm in enumerate(symmetries.forward):
+                image, bit_image = board.transform(s), bitboard.transform(s)
+                self.assertEqual(image.canonical_key()[0], key)
+                self.assertEqual(image.to_string(), bit_image.to_string())
+                self.assertEqual(image.hash(), bit_image.hash())
+                self.assertEqual(image.hash(), BitBoard.from_board(image).hash())
+                moves = board.get_legal_moves()
+                if moves:
+                    # the image of a move is legal in the image of the position
+                    r, c = rng.choice(moves)
+                    idx = perm[r + c * 7]
+                    self.assertTrue(bit_image.move_is_legal((idx % 7, idx // 7)))
+                    self.assertEqual(board.forecast_move((r, c)).transform(s).hash(),
+                                     bit_image.forecast_move((idx % 7, idx // 7)).hash())
+
+    def test_playout(self):
+        for _, bitboard in random_games(2, seed=3):
+            state = (bitboard.to_string(), bitboard.hash(), bitboard.move_count)
+            winner, plies = bitboard.playout()
+            self.assertEqual(state, (bitboard.to_string(), bitboard.hash(), bitboard.move_count))
+            if not bitboard.get_legal_moves():
+                self.assertEqual((winner, plies), (bitboard.inactive_player, 0))
+            else:
+                self.assertIn(winner, ("Player1", "Player2"))
+                self.assertGreater(plies, 0)
+
+    def test_play(self):
+        player1 = AlphaBetaPlayer(score_fn=improved_score)
+        player2 = RandomPlayer()
+        game = BitBoard(player1, player2)
+        winner, history, termination = game.play()
+        self.assertIn(winner, (player1, player2))
+        self.assertEqual(len(history), game.move_count)
+
+    def test_telemetry(self):
+        # one record per move requested, with search statistics from the
+        # agents that report them; moves of the endgame solver and the
+        # final stuck move search no nodes
+        player1 = AlphaBetaPlayer(score_fn=improved_score)
+        player2 = RandomPlayer()
+        game = BitBoard(player1, player2)
+        telemetry = []
+        winner, history, termination = game.play(time_limit=50, telemetry=telemetry)
+        self.assertEqual(len(telemetry), len(history) + 1)
+        self.assertEqual([record.player for record in telemetry],
+                         [(player1, player2)[ply & 1] for ply in range(len(telemetry))])
+        for record in telemetry:
+            self.assertAlmostEqual(record.time_used + record.time_left, 50)
+            if record.player is player1:
+                self.assertGreaterEqual(record.nodes, 0)
+                self.assertGreaterEqual(record.depth, 0)
+            else:
+                self.assertEqual((record.depth, record.nodes, record.tt_hit_rate),
+                                 (None, None, None))
+        self.assertGreater(telemetry[0].nodes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
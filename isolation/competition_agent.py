@@ -4,7 +4,14 @@ champions) in a tournament.
 
          COMPLETING AND SUBMITTING A COMPETITION AGENT IS OPTIONAL
 """
+import gc
+import math
 import random
+import sys
+import timeit
+
+from isolation import BitBoard
+from opening_book import BOOK_FILE, OpeningBook
 
 
 class SearchTimeout(Exception):
@@ -36,13 +43,111 @@ def custom_score(game, player):
     raise NotImplementedError
 
 
+class MCTSStats:
+    """Statistics of the Monte Carlo tree search for one call to get_move().
+
+    Attributes
+    ----------
+    playouts : int
+        The number of random playouts run.
+
+    plies : int
+        The total number of random moves played in the playouts.
+
+    nodes : int
+        The number of nodes in the search tree when the move was chosen,
+        including the nodes carried over from the previous move.
+
+    reused_nodes : int
+        The number of nodes carried over from the previous move.
+
+    tree_bytes : int
+        The approximate memory used by the nodes of the tree, as measured
+        when each node was added.
+
+    elapsed : float
+        The search time in seconds.
+    """
+    def __init__(self):
+        self.playouts = 0
+        self.plies = 0
+        self.nodes = 0
+        self.reused_nodes = 0
+        self.tree_bytes = 0
+        self.elapsed = 0.
+
+    @property
+    def playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed else 0.
+
+    @property
+    def bytes_per_node(self):
+        return self.tree_bytes / self.nodes if self.nodes else 0.
+
+    def __repr__(self):
+        return ("MCTSStats(playouts={}, playouts/s={:.0f}, nodes={}, reused={}, "
+                "bytes/node={:.0f})").format(self.playouts, self.playouts_per_second,
+                                             self.nodes, self.reused_nodes,
+                                             self.bytes_per_node)
+
+
+class MCTSNode:
+    """Node of the Monte Carlo search tree. `wins` counts the playouts won
+    by the player who made `move`, i.e., the player waiting in the node's
+    position, out of `visits` playouts through the node.
+
+    Nodes do not link back to their parent, so the tree has no reference
+    cycles and discarded subtrees are freed as soon as they are dropped.
+    """
+    __slots__ = ("move", "children", "untried", "wins", "visits")
+
+    def __init__(self, move, untried):
+        self.move = move
+        self.children = []
+        self.untried = untried
+        self.wins = 0
+        self.visits = 0
+
+    def select_child(self, exploration):
+        """Return the child with the highest UCT (UCB1) value. """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda c: c.wins / c.visits +
+                   exploration * math.sqrt(log_visits / c.visits))
+
+    def find_child(self, move):
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+    def nbytes(self):
+        """Return the approximate memory used by this node in bytes. """
+        return (sys.getsizeof(self) + sys.getsizeof(self.children) +
+                sys.getsizeof(self.untried))
+
+    def size(self):
+        """Return the number of nodes and their approximate size in bytes
+        in the subtree rooted at this node.
+        """
+        count, size, stack = 0, 0, [self]
+        while stack:
+            node = stack.pop()
+            count += 1
+            size += node.nbytes()
+            stack.extend(node.children)
+        return count, size
+
+
 class CustomPlayer:
     """Game-playing agent to use in the optional player vs player Isolation
     competition.
 
-    You must at least implement the get_move() method and a search function
-    to complete this class, but you may use any of the techniques discussed
-    in lecture or elsewhere on the web -- opening books, MCTS, etc.
+    The agent chooses moves with Monte Carlo tree search: children are
+    selected by the UCT rule, expanded one at a time, and evaluated by
+    uniformly random playouts on a `BitBoard`. The tree is kept between
+    moves, so the subtree under the opponent's actual reply to our last move
+    is reused in the next search. The statistics of the last search are
+    available in `stats`.
 
     **************************************************************************
           THIS CLASS IS OPTIONAL -- IT IS ONLY USED IN THE ISOLATION PvP
@@ -55,16 +160,32 @@ class CustomPlayer:
         The name of the search method to use in get_move().
 
     timeout : float (optional)
-        Time remaining (in milliseconds) when search is aborted.  Note that
-        the PvP competition uses more accurate timers that are not cross-
-        platform compatible, so a limit of 1ms (vs 10ms for the other classes)
-        is generally sufficient.
+        Time remaining (in milliseconds) when search is aborted. One MCTS
+        iteration usually takes well under 1ms, but the default leaves the
+        same margin as the other agents for scheduling delays.
+
+    exploration : float (optional)
+        The exploration constant of the UCT selection rule.
+
+    book : `opening_book.OpeningBook` or str (optional)
+        The opening book consulted before searching, or the path of a book
+        file; the book shipped with the agent by default. None disables the
+        book.
     """
 
-    def __init__(self, data=None, timeout=1.):
+    def __init__(self, data=None, timeout=10., exploration=math.sqrt(2), book=BOOK_FILE):
+        if isinstance(book, str):
+            book = OpeningBook.load(book)
+        self.book = book
         self.score = custom_score
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.exploration = exploration
+        self.stats = MCTSStats()
+
+        # the tree after our last move and the position it was searched from
+        self._root = None
+        self._root_board = None
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -93,5 +214,97 @@ class CustomPlayer:
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        # OPTIONAL: Finish this function!
-        raise NotImplementedError
+        self.time_left = time_left
+        self.stats = MCTSStats()
+        start = timeit.default_timer()
+
+        board = BitBoard.from_board(game)
+
+        # play the book move of an opening position without searching
+        if self.book is not None:
+            book_move = self.book.lookup(board)
+            if book_move in board.get_legal_moves(shuffle=False):
+                self._root = self._root_board = None
+                return book_move
+
+        root = self.reuse_tree(board)
+        if root is None:
+            root = MCTSNode(None, board.get_legal_moves(shuffle=False))
+        self.stats.nodes, self.stats.tree_bytes = root.size()
+        self.stats.reused_nodes = self.stats.nodes - 1 if root.children else 0
+        if not root.untried and not root.children:
+            return (-1, -1)
+
+        # the tree allocates many small objects; suspend the cyclic garbage
+        # collector so that a full collection cannot stall past the deadline
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            while self.time_left() > self.TIMER_THRESHOLD:
+                self.search(board, root)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        self.stats.elapsed = timeit.default_timer() - start
+        if not root.children:
+            # no iteration finished before the deadline
+            self._root = self._root_board = None
+            return random.choice(root.untried)
+        best = max(root.children, key=lambda c: c.visits)
+
+        # keep the subtree of our move for the next turn
+        self._root = best
+        self._root_board = board.forecast_move(best.move)
+        return best.move
+
+    def reuse_tree(self, board):
+        """Return the subtree of the previous search under the opponent's
+        reply that led to `board`, or None if it is not available.
+        """
+        root, root_board = self._root, self._root_board
+        self._root = self._root_board = None
+        if root is None or board.move_count != root_board.move_count + 1:
+            return None
+        reply = board.get_player_location(board.inactive_player)
+        if reply is None or not root_board.move_is_legal(reply):
+            return None
+        root_board.apply_move(reply)
+        if root_board.hash() != board.hash():
+            return None
+        return root.find_child(reply)
+
+    def search(self, board, root):
+        """Run one iteration of selection, expansion, random playout and
+        backpropagation from `root`, the node of the position `board`.
+        """
+        node = root
+        path = [root]
+
+        # select a path of fully expanded nodes by the UCT rule
+        while not node.untried and node.children:
+            node = node.select_child(self.exploration)
+            board.apply_move(node.move)
+            path.append(node)
+
+        # expand one untried move
+        if node.untried:
+            move = node.untried.pop(random.randrange(len(node.untried)))
+            board.apply_move(move)
+            node = MCTSNode(move, board.get_legal_moves(shuffle=False))
+            path[-1].children.append(node)
+            path.append(node)
+            self.stats.nodes += 1
+            self.stats.tree_bytes += node.nbytes()
+
+        winner, plies = board.playout()
+        self.stats.playouts += 1
+        self.stats.plies += plies
+
+        # the player waiting at each node made the move leading to it
+        for node in reversed(path):
+            node.visits += 1
+            if winner == board.inactive_player:
+                node.wins += 1
+            if node is not root:
+                board.undo_move()
@@ -0,0 +1,182 @@
+"""This file contains an exact solver for endgames of Isolation in which
+the two players can no longer reach a common cell. Each player is then
+confined to its own region of the board, so the game is decided by which
+player has the longer knight's path through its region.
+"""
+from isolation import BitBoard
+from isolation.tables import symmetry_tables
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def canonical_path(board, idx, region):
+    """Return the least image of the pair (cell `idx`, region bitmask)
+    under the symmetries of the board, which is the same for every
+    symmetric pair and has the same longest path.
+    """
+    cells = []
+    while region:
+        low = region & -region
+        cells.append(low.bit_length() - 1)
+        region ^= low
+    images = []
+    for perm in symmetry_tables(board.width, board.height).forward:
+        image = 0
+        for cell in cells:
+            image |= 1 << perm[cell]
+        images.append((image, perm[idx]))
+    region, idx = min(images)
+    return idx, region
+
+
+class EndgameSolver:
+    """Detect partitioned positions and solve them exactly.
+
+    Longest paths are memoized on the pair (cell, region bitmask), which
+    does not depend on how the position was reached, so the cache is shared
+    by every position and search. Each search starts from the canonical
+    form of its pair among the images under the symmetries of the board
+    (see `isolation.tables.symmetry_tables`), so symmetric positions share
+    their entries.
+
+    Parameters
+    ----------
+    max_cells : int (optional)
+        Only positions with at most this many open cells are checked for a
+        partition. Bounds the cost of the checks and of the exponential
+        longest-path search: with 16 cells a cold search of one region
+        takes a few milliseconds, under `AlphaBetaPlayer.TIMER_THRESHOLD`,
+        while 20 cells can take twice as long as the threshold.
+
+    cache_size : int (optional)
+        The number of longest paths kept; the cache is emptied when full.
+    """
+    def __init__(self, max_cells=16, cache_size=2**18):
+        self.max_cells = max_cells
+        self.cache_size = cache_size
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def regions(self, board):
+        """Return the bitmasks of the cells reachable by the active player
+        and by the inactive player if the two sets are disjoint, or None if
+        the players may still interact or the board has too many open cells.
+        """
+        if not isinstance(board, BitBoard):
+            board = BitBoard.from_board(board)
+        # every move blocks one cell
+        size = board.width * board.height
+        if size - board.move_count > self.max_cells:
+            return None
+        return board.regions()
+
+    def longest_path(self, board, idx, region, goal=float("inf"), clock=None):
+        """Return the number of moves in the longest knight's path on `board`
+        starting from cell `idx` and visiting each cell of `region` at most
+        once.
+
+        The search stops as soon as it finds a path of `goal` moves or more
+        and returns its length, which is then only a lower bound. With a
+        `game_agent.SearchClock`, each step counts as a search node and
+        SearchTimeout is raised when the clock runs out.
+        """
+        idx, region = canonical_path(board, idx, region)
+        return self._longest_path(idx, region, board._masks, goal, clock)
+
+    def _longest_path(self, idx, region, masks, goal, clock):
+        if clock is not None:
+            clock.countdown -= 1
+            if not clock.countdown:
+                clock.check()
+        key = (idx, region)
+        length = self.cache.get(key)
+        if length is not None:
+            self.hits += 1
+            return length
+        self.misses += 1
+
+        length = 0
+        bound = min(popcount(region), goal)
+        moves = masks[idx] & region
+        while moves and length < bound:
+            low = moves & -moves
+            moves ^= low
+            length = max(length, 1 + self._longest_path(low.bit_length() - 1, region ^ low, masks,
+                                                        goal - 1, clock))
+
+        # a path cut short by the goal is not cached
+        if length < goal:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[key] = length
+        return length
+
+    def solve(self, board, clock=None):
+        """Return the lengths of the longest paths of the active and the
+        inactive player if the position is partitioned, or None otherwise.
+        The active player wins iff its path is strictly longer.
+        """
+        if not isinstance(board, BitBoard):
+            board = BitBoard.from_board(board)
+        regions = self.regions(board)
+        if regions is None:
+            return None
+        slot = board.move_count & 1
+        return (self.longest_path(board, board._locs[slot], regions[0], clock=clock),
+                self.longest_path(board, board._locs[slot ^ 1], regions[1], clock=clock))
+
+    def active_wins(self, board, clock=None):
+        """Return True if the active player wins the partitioned position,
+        False if it loses, or None if the position is not solved.
+
+        Unlike solve(), the longest paths are only searched until the
+        winner is known: the active player's path until it is longer than
+        the inactive player's region, then the inactive player's path until
+        it is as long as the active player's.
+        """
+        if not isinstance(board, BitBoard):
+            board = BitBoard.from_board(board)
+        regions = self.regions(board)
+        if regions is None:
+            return None
+        slot = board.move_count & 1
+        active = self.longest_path(board, board._locs[slot], regions[0],
+                                   popcount(regions[1]) + 1, clock)
+        if active > popcount(regions[1]):
+            return True
+        inactive = self.longest_path(board, board._locs[slot ^ 1], regions[1], active, clock)
+        return active > inactive
+
+    def score(self, board, player, clock=None):
+        """Return the exact value of a partitioned position to `player`,
+        float("inf") for a win or float("-inf") for a loss, or None if the
+        position is not solved.
+        """
+        active_wins = self.active_wins(board, clock)
+        if active_wins is None:
+            return None
+        if active_wins == (player == board.active_player):
+            return float("inf")
+        return float("-inf")
+
+    def best_move(self, board, clock=None):
+        """Return the first move of the active player's longest path if the
+        position is partitioned, or None otherwise. SearchTimeout is raised
+        if the `clock` runs out.
+        """
+        if not isinstance(board, BitBoard):
+            board = BitBoard.from_board(board)
+        regions = self.regions(board)
+        if regions is None:
+            return None
+        region = regions[0]
+        best_move, best_length = None, -1
+        for move, idx in board._neighbors[board._locs[board.move_count & 1]]:
+            if (region >> idx) & 1:
+                length = self.longest_path(board, idx, region ^ (1 << idx), clock=clock)
+                if length > best_length:
+                    best_move, best_length = move, length
+        return best_move
@@ -0,0 +1,152 @@
+"""Unit tests for the partitioned endgame solver. """
+
+import random
+import timeit
+import unittest
+
+from isolation import BitBoard
+from endgame import EndgameSolver
+from game_agent import AlphaBetaPlayer, SearchClock, SearchTimeout
+from sample_players import improved_score
+
+
+def active_wins(game):
+    """Solve the game by exhaustive search. """
+    for move in game.get_legal_moves(shuffle=False):
+        game.apply_move(move)
+        won = not active_wins(game)
+        game.undo_move()
+        if won:
+            return True
+    return False
+
+
+def partitioned_positions(player_1, player_2, count, max_cells=16):
+    """Return the first partitioned position of random games until `count`
+    positions are found.
+    """
+    solver = EndgameSolver(max_cells)
+    positions = []
+    rng = random.Random(0)
+    while len(positions) < count:
+        game = BitBoard(player_1, player_2)
+        while game.get_legal_moves():
+            if solver.regions(game) is not None:
+                positions.append(game)
+                break
+            game.apply_move(rng.choice(game.get_legal_moves()))
+    return positions
+
+
+def single_region_position(player_1, player_2, cells, seed):
+    """Return a position where the active player at (3, 3) has a region of
+    `cells` open cells, grown at random, and the inactive player at (0, 0)
+    is stuck.
+    """
+    rng = random.Random(seed)
+    game = BitBoard(player_1, player_2)
+    game.apply_move((3, 3))
+    game.apply_move((0, 0))
+    # the center, the corner and the corner's neighbors stay blocked
+    closed = {24, 0, 9, 15}
+    region, frontier = set(), [24]
+    while len(region) < cells:
+        idx = rng.choice(frontier)
+        moves = [n_idx for _, n_idx in game._neighbors[idx]
+                 if n_idx not in region and n_idx not in closed]
+        if not moves:
+            frontier.remove(idx)
+            continue
+        n_idx = rng.choice(moves)
+        region.add(n_idx)
+        frontier.append(n_idx)
+    game._blocked = (1 << 49) - 1 - sum(1 << idx for idx in region)
+    # about one move per blocked cell, with player 1 still to move
+    game.move_count = (49 - cells + 1) & ~1
+    return game
+
+
+class EndgameSolverTest(unittest.TestCase):
+    """Unit tests for the endgame solver"""
+
+    def test_solve(self):
+        solver = EndgameSolver()
+        for game in partitioned_positions("Player1", "Player2", 40):
+            active, inactive = solver.solve(game)
+            self.assertEqual(active > inactive, active_wins(game))
+            self.assertEqual(EndgameSolver().active_wins(game), active > inactive)
+            self.assertEqual(solver.score(game, game.active_player) > 0, active > inactive)
+
+            # the best move keeps the longest path
+            game.apply_move(solver.best_move(game))
+            self.assertEqual(solver.solve(game)[1], active - 1)
+        self.assertGreater(solver.hits, 0)
+
+    def test_symmetric_positions(self):
+        # the images of a position under the symmetries of the board find
+        # the entries cached by the search of the position
+        for game in partitioned_positions("Player1", "Player2", 5):
+            solver = EndgameSolver()
+            lengths = solver.solve(game)
+            misses = solver.misses
+            for symmetry in range(1, 8):
+                self.assertEqual(solver.solve(game.transform(symmetry)), lengths)
+            self.assertEqual(solver.misses, misses)
+
+    def test_connected(self):
+        solver = EndgameSolver(max_cells=49)
+        game = BitBoard("Player1", "Player2")
+        self.assertIsNone(solver.solve(game))
+        game.apply_move((0, 0))
+        game.apply_move((2, 1))
+        self.assertIsNone(solver.solve(game))
+        self.assertIsNone(EndgameSolver(max_cells=20).regions(game))
+
+    def test_alphabeta(self):
+        player = AlphaBetaPlayer(score_fn=improved_score)
+        player.time_left = lambda: float("inf")
+        for game in partitioned_positions(player, "Opponent", 10):
+            if game.active_player != player:
+                continue
+            # every child is solved without searching below it, and the
+            # search finds a winning move when there is one
+            won = active_wins(game)
+            move = player.alphabeta(game, 4)
+            self.assertLessEqual(player.node_counts[4], len(game.get_legal_moves()))
+            self.assertEqual(not active_wins(game.forecast_move(move)), won)
+
+            move = player.get_move(game, lambda: 1000.)
+            self.assertEqual(player.node_counts, {})
+            self.assertEqual(move, player.endgame.best_move(game))
+
+    def test_clock(self):
+        # the longest path search stops when the search clock runs out
+        game = single_region_position("Player1", "Player2", 19, 0)
+        solver = EndgameSolver(max_cells=20)
+        self.assertIsNotNone(solver.regions(game))
+        with self.assertRaises(SearchTimeout):
+            solver.best_move(game, SearchClock(lambda: 0., 10.))
+
+        # and the agent still moves in time
+        for seed in range(3):
+            player = AlphaBetaPlayer(score_fn=improved_score, endgame_cells=20)
+            game = single_region_position(player, "Opponent", 19, seed)
+            deadline = timeit.default_timer() + 0.015
+            move = player.get_move(game, lambda: 1000 * (deadline - timeit.default_timer()))
+            self.assertGreater(deadline, timeit.default_timer())
+            self.assertIn(move, game.get_legal_moves())
+
+    def test_default_size(self):
+        # a region of the default size is solved within the time threshold
+        elapsed = []
+        for seed in range(3):
+            game = single_region_position("Player1", "Player2", 16, seed)
+            solver = EndgameSolver()
+            start = timeit.default_timer()
+            solver.best_move(game)
+            elapsed.append(1000 * (timeit.default_timer() - start))
+        self.assertLess(min(elapsed), AlphaBetaPlayer().TIMER_THRESHOLD)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""This file contains a bounded cache of heuristic values that wraps any
+`score_fn` of an `IsolationPlayer`. Iterative deepening visits the leaves of
+one iteration again as interior nodes of the next, and transpositions reach
+the same leaf through different move orders, so expensive heuristics like
+`custom_score_2` are called many times on the same positions.
+
+Run this file to compare the search speed of `custom_score_2` with and
+without a cache:
+
+    python eval_cache.py
+"""
+import random
+import timeit
+
+from collections import OrderedDict
+
+from isolation import BitBoard
+from game_agent import AlphaBetaPlayer, custom_score_2
+
+# the eviction policies of EvalCache
+EVICTION_POLICIES = ("lru", "clock")
+
+
+class EvalCache:
+    """Heuristic that returns the value of `score_fn` for a position from a
+    cache keyed by the position hash (`Board.hash()`) and the seat of the
+    scored player, and calls `score_fn` on a miss.
+
+    When the cache is full, a miss evicts a value: the least recently used
+    one with the "lru" policy, or with the "clock" policy the first value
+    without a reference bit found by a hand sweeping the slots in a circle
+    and clearing the bits it passes; a hit sets the bit of its slot. Clock
+    eviction approximates LRU without reordering entries on every hit.
+
+    `hits` and `misses` count the lookups since the cache was created or
+    cleared.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The heuristic `f(game, player)` to cache.
+
+    size : int (optional)
+        The number of values kept.
+
+    policy : str (optional)
+        One of `EVICTION_POLICIES`.
+    """
+    def __init__(self, score_fn, size=2**16, policy="lru"):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError("Unknown eviction policy {!r}; expected one of {}".format(
+                policy, EVICTION_POLICIES))
+        self.score_fn = score_fn
+        self.size = size
+        self.policy = policy
+        self._lookup = self._lookup_lru if policy == "lru" else self._lookup_clock
+        self.clear()
+
+    def clear(self):
+        """Drop every value and reset the counters. """
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict() if self.policy == "lru" else {}
+        self._keys = [None] * self.size if self.policy == "clock" else None
+        self._referenced = bytearray(self.size) if self.policy == "clock" else None
+        self._hand = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def hit_rate(self):
+        """The fraction of lookups that found their value. """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def __call__(self, game, player):
+        return self._lookup((game.hash(), game.active_player == player), game, player)
+
+    def _lookup_lru(self, key, game, player):
+        values = self._values
+        value = values.get(key)
+        if value is not None:
+            self.hits += 1
+            values.move_to_end(key)
+            return value
+        self.misses += 1
+        value = values[key] = self.score_fn(game, player)
+        if len(values) > self.size:
+            values.popitem(last=False)
+        return value
+
+    def _lookup_clock(self, key, game, player):
+        # values maps each key to its (value, slot)
+        entry = self._values.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._referenced[entry[1]] = 1
+            return entry[0]
+        self.misses += 1
+        value = self.score_fn(game, player)
+        if len(self._values) < self.size:
+            slot = len(self._values)
+        else:
+            # advance the hand to a slot whose bit is clear, clearing the
+            # bits of the slots it passes
+            referenced, hand = self._referenced, self._hand
+            while referenced[hand]:
+                referenced[hand] = 0
+                hand = (hand + 1) % self.size
+            slot = hand
+            self._hand = (hand + 1) % self.size
+            del self._values[self._keys[slot]]
+        self._keys[slot] = key
+        self._referenced[slot] = 0
+        self._values[key] = (value, slot)
+        return value
+
+
+def main():
+    """Report the time taken by two agents with `custom_score_2` playing
+    games from random openings with iterative deepening to a fixed depth,
+    uncached and with each eviction policy, and the hit rates of the
+    caches. Each agent keeps its cache for the whole game, so the leaves of
+    a search are found again two plies higher in its next search.
+    """
+    rng = random.Random(0)
+    openings = []
+    for _ in range(5):
+        game = BitBoard("Player1", "Player2")
+        opening = []
+        for _ in range(4):
+            opening.append(rng.choice(game.get_legal_moves()))
+            game.apply_move(opening[-1])
+        openings.append(opening)
+
+    depth, num_moves = 6, 12
+    print("{:<10}{:>10}{:>10}{:>10}".format("Cache", "Seconds", "Nodes", "Hit rate"))
+    for policy in (None,) + EVICTION_POLICIES:
+        caches, nodes, elapsed = [], 0, 0.
+        for opening in openings:
+            players = []
+            for _ in range(2):
+                score_fn = custom_score_2
+                if policy is not None:
+                    score_fn = EvalCache(custom_score_2, policy=policy)
+                    caches.append(score_fn)
+                players.append(AlphaBetaPlayer(score_fn=score_fn, endgame_cells=0))
+                players[-1].time_left = lambda: float("inf")
+            game = BitBoard(players[0], players[1])
+            for move in opening:
+                game.apply_move(move)
+            for _ in range(num_moves):
+                player = game.active_player
+                player.reset_search()
+                start = timeit.default_timer()
+                move = player.iterative_deepening(game, depth_limit=depth)
+                elapsed += timeit.default_timer() - start
+                nodes += sum(player.node_counts.values())
+                if move == (-1, -1):
+                    break
+                game.apply_move(move)
+        hits = sum(cache.hits for cache in caches)
+        lookups = hits + sum(cache.misses for cache in caches)
+        print("{:<10}{:>10.2f}{:>10}{:>10}".format(
+            policy or "none", elapsed, nodes,
+            "-" if policy is None else "{:.0%}".format(hits / lookups)))
+
+
+if __name__ == "__main__":
+    main()
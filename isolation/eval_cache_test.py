@@ -0,0 +1,98 @@
+"""Unit tests for the heuristic value cache. """
+
+import unittest
+
+from isolation import BitBoard
+from batch_eval_test import random_boards
+from eval_cache import EvalCache, EVICTION_POLICIES
+from game_agent import AlphaBetaPlayer, custom_score_2
+from sample_players import improved_score
+
+
+class CountingScore:
+    """improved_score that counts its calls. """
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, game, player):
+        self.calls += 1
+        return improved_score(game, player)
+
+
+class EvalCacheTest(unittest.TestCase):
+    """Unit tests for cached heuristics"""
+
+    def setUp(self):
+        self.boards = random_boards(10)
+
+    def test_values(self):
+        # cached values are those of the heuristic, for either player, and
+        # each position is scored once
+        for policy in EVICTION_POLICIES:
+            score = CountingScore()
+            cache = EvalCache(score, policy=policy)
+            for _ in range(2):
+                for board in self.boards:
+                    for player in ("Player1", "Player2"):
+                        self.assertEqual(cache(board, player), improved_score(board, player))
+            self.assertEqual(score.calls, 2 * len(self.boards))
+            self.assertEqual((cache.hits, cache.misses), (2 * len(self.boards), 2 * len(self.boards)))
+            self.assertEqual(cache.hit_rate, 0.5)
+            cache.clear()
+            self.assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+
+    def test_lru(self):
+        # the least recently used value is evicted
+        score = CountingScore()
+        cache = EvalCache(score, size=2, policy="lru")
+        a, b, c = self.boards[:3]
+        for board in (a, b, a, c):
+            cache(board, "Player1")
+        self.assertEqual(len(cache), 2)
+        for board in (a, c):
+            cache(board, "Player1")
+        self.assertEqual(score.calls, 3)
+        cache(b, "Player1")
+        self.assertEqual(score.calls, 4)
+
+    def test_clock(self):
+        # the hand passes over referenced values, clearing their bits
+        score = CountingScore()
+        cache = EvalCache(score, size=2, policy="clock")
+        a, b, c, d = self.boards[:4]
+        for board in (a, b, a, c):
+            cache(board, "Player1")
+        # b was evicted, and a is referenced again
+        cache(a, "Player1")
+        self.assertEqual(score.calls, 3)
+        # so d evicts c
+        cache(d, "Player1")
+        cache(a, "Player1")
+        self.assertEqual(score.calls, 4)
+        cache(c, "Player1")
+        self.assertEqual(score.calls, 5)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            EvalCache(improved_score, policy="fifo")
+
+    def test_search(self):
+        # a search with the cached heuristic finds the same value
+        for policy in EVICTION_POLICIES:
+            cache = EvalCache(custom_score_2, policy=policy)
+            values = []
+            for score_fn in (custom_score_2, cache):
+                player = AlphaBetaPlayer(score_fn=score_fn, move_ordering=False, endgame_cells=0)
+                player.time_left = lambda: float("inf")
+                game = BitBoard(player, "Opponent")
+                for move in ((2, 3), (4, 4), (0, 2), (2, 5)):
+                    game.apply_move(move)
+                player.alphabeta(game, 4)
+                values.append(player.root_score)
+            self.assertEqual(values[0], values[1])
+            self.assertGreater(cache.misses, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
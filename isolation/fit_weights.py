@@ -0,0 +1,243 @@
+"""Fit the weights of a linear evaluation function from self-play games,
+instead of hand-picking the constants of heuristics like `custom_score`.
+
+The pipeline:
+
+1. plays games between two alpha-beta agents from random openings, in
+   parallel worker processes, and appends them to a `game_archive`;
+2. replays the archived games into labeled positions, labeled by the
+   result of the game, and extracts their features in vectorized batches
+   with `batch_eval` (mobility, two-ply mobility, center distance and the
+   distance between the players);
+3. fits a logistic regression of the result on the features, and saves
+   the weights as a `LinearScore`, a score function for
+   `IsolationPlayer(score_fn=...)`.
+
+Run this file to play `num_games` new games and fit the weights shipped
+next to it:
+
+    python fit_weights.py [num_games]
+"""
+import json
+import os
+import random
+import sys
+
+import numpy as np
+
+from isolation import Board, BitBoard
+from batch_eval import center_distance, mobility, pack_boards, player_distance, two_ply_mobility
+from endgame import popcount
+from game_agent import AlphaBetaPlayer
+from game_archive import ArchiveWriter, GameArchive
+from sample_players import improved_score
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GAMES_FILE = os.path.join(HERE, "self_play_games.bin")
+WEIGHTS_FILE = os.path.join(HERE, "fitted_score.json")
+NUM_GAMES = 400  # self-play games played by default
+TIME_LIMIT = 30  # milliseconds per move in self-play, above the agents' timeout
+
+# the features of a position from the point of view of one player
+FEATURES = ("own_moves", "opp_moves", "own_two_ply", "opp_two_ply",
+            "own_center", "opp_center", "distance", "active")
+
+
+def batch_features(batch):
+    """Return the (positions, features) array of the `FEATURES` of each
+    position of a `batch_eval.BoardBatch`.
+    """
+    return np.column_stack([
+        mobility(batch, batch.own), mobility(batch, batch.opp),
+        two_ply_mobility(batch, batch.own), two_ply_mobility(batch, batch.opp),
+        center_distance(batch, batch.own), center_distance(batch, batch.opp),
+        player_distance(batch), batch.own_active,
+    ]).astype(float)
+
+
+class LinearScore:
+    """A heuristic scoring a position by a weighted sum of its `FEATURES`
+    for the player, and +/-inf for a won or lost game. Positions where a
+    player has not moved yet score 0.
+
+    Parameters
+    ----------
+    weights : sequence of float
+        The weight of each feature, in the order of `FEATURES`.
+    """
+    def __init__(self, weights):
+        if len(weights) != len(FEATURES):
+            raise ValueError("Expected {} weights, got {}".format(len(FEATURES), len(weights)))
+        self.weights = tuple(float(w) for w in weights)
+
+    def __call__(self, game, player):
+        if not isinstance(game, BitBoard):
+            game = BitBoard.from_board(game)
+        slot = 0 if player == game._player_1 else 1
+        own, opp = game._locs[slot], game._locs[slot ^ 1]
+        active = game.move_count & 1 == slot
+        if own is Board.NOT_MOVED or opp is Board.NOT_MOVED:
+            if not game.get_legal_moves():
+                return float("-inf") if active else float("inf")
+            return 0.
+
+        masks, open_cells, height = game._masks, ~game._blocked, game.height
+        own_open, opp_open = masks[own] & open_cells, masks[opp] & open_cells
+        own_moves, opp_moves = popcount(own_open), popcount(opp_open)
+        if active and not own_moves:
+            return float("-inf")
+        if not active and not opp_moves:
+            return float("inf")
+
+        own_two_ply = sum(popcount(masks[idx] & open_cells)
+                          for _, idx in game._neighbors[own] if own_open >> idx & 1)
+        opp_two_ply = sum(popcount(masks[idx] & open_cells)
+                          for _, idx in game._neighbors[opp] if opp_open >> idx & 1)
+        own_r, own_c = own % height, own // height
+        opp_r, opp_c = opp % height, opp // height
+        center_r, center_c = height // 2, game.width // 2
+        features = (own_moves, opp_moves, own_two_ply, opp_two_ply,
+                    abs(own_r - center_r) + abs(own_c - center_c),
+                    abs(opp_r - center_r) + abs(opp_c - center_c),
+                    abs(own_r - opp_r) + abs(own_c - opp_c), active)
+        return sum(w * f for w, f in zip(self.weights, features))
+
+    def save(self, path):
+        """Write the weights to a JSON file. """
+        with open(path, "w") as f:
+            json.dump({"features": FEATURES, "weights": self.weights}, f, indent=2)
+            f.write("\n")
+
+    @classmethod
+    def load(cls, path=WEIGHTS_FILE):
+        """Read weights written by `save`. """
+        with open(path) as f:
+            data = json.load(f)
+        if tuple(data["features"]) != FEATURES:
+            raise ValueError("The weights in {} are for other features: {}".format(
+                path, data["features"]))
+        return cls(data["weights"])
+
+
+def self_play_game(agents, time_limit):
+    """Play one game between two agents from a random opening of one move
+    each and return (opening, move history, winning seat, termination).
+    """
+    game = BitBoard(agents[0], agents[1])
+    opening = []
+    for _ in range(2):
+        opening.append(random.choice(game.get_legal_moves()))
+        game.apply_move(opening[-1])
+    winner, history, termination = game.play(time_limit=time_limit)
+    return opening, history, 0 if winner == agents[0] else 1, termination
+
+
+def self_play(path, num_games, agents, time_limit=TIME_LIMIT, processes=1):
+    """Play `num_games` games between the two `agents` over `processes`
+    worker processes and append them to the archive at `path`.
+    """
+    # the process pool of the tournament, with one core per worker
+    from tournament import make_pool
+
+    pool = make_pool(processes)
+    jobs = [(agents, time_limit)] * num_games
+    try:
+        results = pool.starmap(self_play_game, jobs, chunksize=1) if pool else \
+            [self_play_game(*job) for job in jobs]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    names = ("SelfPlay1", "SelfPlay2")
+    with ArchiveWriter(path) as archive:
+        for opening, history, winner, termination in results:
+            archive.append(names[0], names[1], winner, termination, opening, history)
+
+
+def labeled_positions(archive):
+    """Replay the games of a `game_archive.GameArchive` and return the list
+    of positions where both players have moved and the player to move has
+    a legal move, and an array of the seat of the winner of the game of
+    each position.
+    """
+    positions, winners = [], []
+    for record in archive:
+        game = BitBoard("Player1", "Player2", width=archive.width, height=archive.height)
+        for move in record.moves:
+            game.apply_move(move)
+            if game.move_count >= 2 and game.get_legal_moves(shuffle=False):
+                positions.append(game.copy())
+                winners.append(record.winner)
+    return positions, np.array(winners)
+
+
+def training_data(positions, winners):
+    """Return the features and labels of the positions from the point of
+    view of each player: features (2 * positions, features) and a label
+    of 1 if that player won.
+    """
+    features = [batch_features(pack_boards(positions, player)) for player in ("Player1", "Player2")]
+    labels = [(winners == 0).astype(float), (winners == 1).astype(float)]
+    return np.vstack(features), np.concatenate(labels)
+
+
+def fit_logistic(features, labels, l2=1e-3, iterations=50):
+    """Fit P(win) = 1 / (1 + exp(-(features . weights + intercept))) by
+    Newton's method with an L2 penalty, and return (weights, intercept).
+    """
+    x = np.column_stack([features, np.ones(len(features))])
+    w = np.zeros(x.shape[1])
+    for _ in range(iterations):
+        p = 1. / (1. + np.exp(-x.dot(w)))
+        gradient = x.T.dot(p - labels) + l2 * w
+        hessian = (x * (p * (1. - p))[:, None]).T.dot(x) + l2 * np.eye(len(w))
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    return w[:-1], w[-1]
+
+
+def log_loss(features, labels, weights, intercept):
+    """Return the mean log loss and accuracy of a fitted model. """
+    z = features.dot(weights) + intercept
+    p = np.clip(1. / (1. + np.exp(-z)), 1e-12, 1. - 1e-12)
+    loss = -np.mean(labels * np.log(p) + (1. - labels) * np.log(1. - p))
+    return loss, np.mean((p > 0.5) == (labels > 0.5))
+
+
+def main():
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_GAMES
+    agents = (AlphaBetaPlayer(score_fn=improved_score), AlphaBetaPlayer(score_fn=improved_score))
+    self_play(GAMES_FILE, num_games, agents, processes=os.cpu_count())
+
+    with GameArchive(GAMES_FILE) as archive:
+        positions, winners = labeled_positions(archive)
+        print("{} games, {} positions".format(len(archive), len(positions)))
+
+    # hold out the last fifth of the positions, from the last games played
+    split = int(0.8 * len(positions))
+    features, labels = training_data(positions[:split], winners[:split])
+    test_features, test_labels = training_data(positions[split:], winners[split:])
+
+    weights, intercept = fit_logistic(features, labels)
+    print("\n{:<14}{:>10}".format("Feature", "Weight"))
+    for name, weight in zip(FEATURES, weights):
+        print("{:<14}{:>10.4f}".format(name, weight))
+
+    # the baseline: improved_score, own_moves - opp_moves, with a fitted scale
+    improved = features[:, :1] - features[:, 1:2]
+    scale, offset = fit_logistic(improved, labels)
+    print("\n{:<14}{:>10}{:>10}".format("Held out", "Log loss", "Accuracy"))
+    print("{:<14}{:>10.4f}{:>10.3f}".format(
+        "improved", *log_loss(test_features[:, :1] - test_features[:, 1:2], test_labels,
+                              scale, offset)))
+    print("{:<14}{:>10.4f}{:>10.3f}".format(
+        "fitted", *log_loss(test_features, test_labels, weights, intercept)))
+
+    LinearScore(weights).save(WEIGHTS_FILE)
+    print("\nWrote {}; use LinearScore.load() as a score_fn".format(WEIGHTS_FILE))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Unit tests for the self-play weight fitting pipeline. """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from isolation import Board
+from batch_eval import pack_boards
+from batch_eval_test import random_boards
+from fit_weights import (FEATURES, LinearScore, batch_features, fit_logistic,
+                         labeled_positions, self_play, training_data)
+from game_agent import AlphaBetaPlayer
+from game_archive import GameArchive
+from sample_players import improved_score
+
+
+class FitWeightsTest(unittest.TestCase):
+    """Unit tests for fitting and using linear evaluation weights"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_features(self):
+        # the scalar score is the weighted sum of the batch features on
+        # Board and BitBoard positions, or +/-inf when the game is over
+        boards = random_boards(200)
+        rng = np.random.RandomState(0)
+        for player in ("Player1", "Player2"):
+            features = batch_features(pack_boards(boards, player))
+            for board, row in zip(boards, features):
+                score = LinearScore(rng.uniform(-1., 1., len(FEATURES)))
+                expected = np.dot(score.weights, row)
+                if board.is_loser(player):
+                    expected = float("-inf")
+                elif board.is_winner(player):
+                    expected = float("inf")
+                self.assertAlmostEqual(score(board, player), expected)
+        self.assertEqual(LinearScore([0.] * len(FEATURES))(Board("Player1", "Player2"),
+                                                             "Player1"), 0.)
+
+    def test_fit_logistic(self):
+        # recovers the weights of a known logistic model
+        rng = np.random.RandomState(0)
+        features = rng.normal(size=(20000, 3))
+        weights = np.array([1.5, -2., 0.])
+        labels = (rng.random_sample(20000) < 1. / (1. + np.exp(-features.dot(weights) - 0.5)))
+        fitted, intercept = fit_logistic(features, labels.astype(float))
+        np.testing.assert_allclose(fitted, weights, atol=0.1)
+        self.assertAlmostEqual(intercept, 0.5, delta=0.1)
+
+    def test_pipeline(self):
+        # self-play games are archived, replayed into labeled positions and
+        # fitted into a score function usable by the agents
+        path = os.path.join(self.tmpdir, "games.bin")
+        agents = (AlphaBetaPlayer(score_fn=improved_score), AlphaBetaPlayer(score_fn=improved_score))
+        self_play(path, 4, agents, time_limit=30)
+        with GameArchive(path) as archive:
+            self.assertEqual(len(archive), 4)
+            positions, winners = labeled_positions(archive)
+        self.assertGreater(len(positions), 4 * 20)
+        self.assertTrue(all(p.move_count >= 2 and p.get_legal_moves() for p in positions))
+        features, labels = training_data(positions, winners)
+        self.assertEqual(features.shape, (2 * len(positions), len(FEATURES)))
+        self.assertEqual(labels.sum(), len(positions))
+
+        score = LinearScore(fit_logistic(features, labels)[0])
+        score_file = os.path.join(self.tmpdir, "score.json")
+        score.save(score_file)
+        self.assertEqual(LinearScore.load(score_file).weights, score.weights)
+        player = AlphaBetaPlayer(search_depth=3, score_fn=LinearScore.load(score_file))
+        player.time_left = lambda: 1000.
+        game = Board(player, AlphaBetaPlayer())
+        game.apply_move((2, 3))
+        game.apply_move((4, 4))
+        self.assertIn(player.alphabeta(game, 3), game.get_legal_moves())
+
+
+if __name__ == "__main__":
+    unittest.main()
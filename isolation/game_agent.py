@@ -1,9 +1,75 @@
 import random
+import struct
+
+from collections import namedtuple
+
+from isolation import BitBoard
+from isolation.tables import symmetry_tables
+from transposition import TranspositionTable, bound_type
+from endgame import EndgameSolver, popcount
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
     pass
 
+
+class SearchClock:
+    """Deadline check of a search that reads the timer only every
+    `interval` nodes instead of at every node.
+
+    The search decrements `countdown` at each node and calls check() when
+    it reaches zero. check() raises SearchTimeout once less than
+    `threshold` milliseconds are left, like the per-node check it replaces,
+    and sets the next interval from the node rate measured since the
+    previous check, so that the timer is read about every `check_millis`
+    milliseconds and never later than halfway to the threshold.
+
+    Parameters
+    ----------
+    time_left : callable
+        The timer of the turn, returning the milliseconds left.
+
+    threshold : float
+        Time remaining (in milliseconds) when search is aborted.
+
+    check_millis : float (optional)
+        The target time between two timer reads, in milliseconds.
+
+    max_interval : int (optional)
+        The largest number of nodes between two timer reads.
+    """
+    def __init__(self, time_left, threshold, check_millis=0.5, max_interval=1024):
+        self.time_left = time_left
+        self.threshold = threshold
+        self.check_millis = check_millis
+        self.max_interval = max_interval
+        self.interval = 1
+        self.countdown = 1
+        self.checks = 0
+        self._last_left = None
+
+    def check(self):
+        """Read the timer, raise SearchTimeout if the search must stop, and
+        restart the countdown.
+        """
+        left = self.time_left()
+        self.checks += 1
+        if left < self.threshold:
+            raise SearchTimeout()
+
+        last_left, self._last_left = self._last_left, left
+        if left == float("inf"):
+            interval = self.max_interval
+        elif last_left is None or last_left - left <= 0:
+            # no time measured yet: grow the interval slowly
+            interval = 2 * self.interval
+        else:
+            nodes_per_milli = self.interval / (last_left - left)
+            millis = min(self.check_millis, (left - self.threshold) / 2)
+            interval = min(int(nodes_per_milli * millis), 2 * self.interval)
+        self.interval = max(1, min(interval, self.max_interval))
+        self.countdown = self.interval
+
 def custom_score(game, player):
     """Calculate the heuristic value: the ratio between the difference in moves left and the 
     difference in distance of two players. 
@@ -24,15 +90,11 @@ def custom_score(game, player):
         The heuristic value of the current game state to the specified player.
     """
 
-    # return inf if player has won the game, otherwise return -inf
-    if game.is_winner(player): 
-        return float('inf')
-    elif game.is_loser(player):
-        return float('-inf')
-
-    # calculate number of moves left
-    my_moves_left = len(game.get_legal_moves(player))
-    opponent_moves_left = len(game.get_legal_moves(game.get_opponent(player)))
+    # return inf if player has won the game, -inf if it has lost, and
+    # otherwise the number of moves left
+    utility, my_moves_left, opponent_moves_left = game.status(player)
+    if utility:
+        return utility
     delta_moves = my_moves_left - 2*opponent_moves_left
 
     # calculate Manhattan distance from current position to the center position for both
@@ -64,25 +126,18 @@ def custom_score_2(game, player):
     """
 
     # return inf if player has won the game, otherwise return -inf
-    if game.is_winner(player):
-    	return float('inf')
-    elif game.is_loser(player):
-    	return float('-inf')
+    utility, my_total_moves, opponent_total_moves = game.status(player)
+    if utility:
+    	return utility
 
     # calculate number of moves left
-    my_legal_moves = game.get_legal_moves(player)
-    my_total_moves = len(my_legal_moves)
-    for move in my_legal_moves:
-    	board = game
+    for move in game.get_legal_moves(player, shuffle=False):
     	board = game.forecast_move(move)
-    	my_total_moves += len(board.get_legal_moves())
+    	my_total_moves += board.mobility()
 
-    opponent_legal_moves = game.get_legal_moves(game.get_opponent(player))
-    opponent_total_moves = len(opponent_legal_moves)
-    for move in opponent_legal_moves:
-    	board = game
+    for move in game.get_legal_moves(game.get_opponent(player), shuffle=False):
     	board = game.forecast_move(move)
-    	opponent_total_moves += len(board.get_legal_moves())
+    	opponent_total_moves += board.mobility()
 
     return float(my_total_moves - 2*opponent_total_moves)
 
@@ -106,15 +161,11 @@ def custom_score_3(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    # return inf if player has won the game, otherwise return -inf
-    if game.is_winner(player):
-        return float('inf')
-    elif game.is_loser(player):
-        return float('-inf')
-
-    # calculate number of moves left
-    my_moves_left = len(game.get_legal_moves(player))
-    opponent_moves_left = len(game.get_legal_moves(game.get_opponent(player)))
+    # return inf if player has won the game, -inf if it has lost, and
+    # otherwise calculate number of moves left
+    utility, my_moves_left, opponent_moves_left = game.status(player)
+    if utility:
+        return utility
 
     if my_moves_left != opponent_moves_left:
     	return float(my_moves_left - 2*opponent_moves_left)
@@ -131,6 +182,61 @@ def custom_score_3(game, player):
 
 
 
+# the search algorithms of AlphaBetaPlayer: plain alpha-beta, principal
+# variation search, and principal variation search with aspiration windows
+# at the root
+SEARCH_MODES = ("alphabeta", "pvs", "aspiration")
+
+# the parameters of the selective search of AlphaBetaPlayer: moves after
+# the first `reduction_moves` of a node off the principal variation with at
+# least `reduction_depth` plies left are searched `reduction` plies
+# shallower, and nodes with at most `futility_depth` plies left whose
+# static score misses the window by more than `futility_margin` per ply
+# only search their first move
+SelectiveSearch = namedtuple("SelectiveSearch", ["reduction_depth", "reduction_moves",
+                                                 "reduction", "futility_depth", "futility_margin"])
+SelectiveSearch.__new__.__defaults__ = (3, 2, 1, 1, 2.)
+
+# what AlphaBetaPlayer.search_stats() reports about its last move, for the
+# telemetry of `isolation.Board.play`
+SearchStats = namedtuple("SearchStats", ["depth", "nodes", "tt_hit_rate"])
+
+
+def next_above(x):
+    """Return the least float greater than `x`, or `x` if it is inf. A
+    search with the null window (x, next_above(x)) tells whether the score
+    of a position is greater than `x`: it returns at most `x` if not.
+    """
+    if x == float("inf"):
+        return x
+    if x == 0.:
+        return 5e-324
+    bits = struct.unpack("<q", struct.pack("<d", x))[0]
+    return struct.unpack("<d", struct.pack("<q", bits + 1 if x > 0 else bits - 1))[0]
+
+
+def next_below(x):
+    """Return the greatest float less than `x`, or `x` if it is -inf. """
+    return -next_above(-x)
+
+
+def transform_move(move, perm, height):
+    """Return the image of a move under a cell permutation from
+    `isolation.tables.symmetry_tables`, or None if `move` is None.
+    """
+    if move is None:
+        return None
+    idx = perm[move[0] + move[1] * height]
+    return (idx % height, idx // height)
+
+
+def order_first(moves, move):
+    """Move `move` to the front of the list `moves` in-place if present. """
+    if move is not None and move in moves:
+        moves.remove(move)
+        moves.insert(0, move)
+
+
 class IsolationPlayer:
     """Base class for minimax and alphabeta agents.
 
@@ -149,12 +255,46 @@ class IsolationPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    search_mode : str (optional)
+        One of `SEARCH_MODES`, the search algorithm of `AlphaBetaPlayer`:
+        "alphabeta" searches every move with the full (alpha, beta) window;
+        "pvs" (principal variation search) searches the first move of each
+        node with the full window and the others with a null window, and
+        searches a move again with the full window only if it beats the
+        best move so far; "aspiration" also searches each iteration of the
+        iterative deepening with a narrow window around the score of the
+        previous iteration, widened if the root score falls outside it.
+
+    Setting `time_left` also starts a new `SearchClock` in `clock`, which
+    the search nodes use instead of calling `time_left` themselves.
     """
-    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.):
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10., search_mode="alphabeta"):
+        if search_mode not in SEARCH_MODES:
+            raise ValueError("Unknown search mode {!r}; expected one of {}".format(
+                search_mode, SEARCH_MODES))
         self.search_depth = search_depth
         self.score = score_fn
-        self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.search_mode = search_mode
+        self.time_left = None
+
+    @property
+    def time_left(self):
+        return self._time_left
+
+    @time_left.setter
+    def time_left(self, time_left):
+        self._time_left = time_left
+        self.clock = None if time_left is None else SearchClock(time_left, self.TIMER_THRESHOLD)
+
+    def __getstate__(self):
+        # the timer closure of the current turn cannot be pickled, e.g. when
+        # sending the agent to a tournament worker process
+        state = self.__dict__.copy()
+        state["_time_left"] = None
+        state["clock"] = None
+        return state
 
 
 class MinimaxPlayer(IsolationPlayer):
@@ -224,8 +364,10 @@ class MinimaxPlayer(IsolationPlayer):
         def min_play(self, game, depth):
             """function used by minimax to return best score for minimizing layer"""
 
-            if self.time_left() < self.TIMER_THRESHOLD:
-                raise SearchTimeout()
+            clock = self.clock
+            clock.countdown -= 1
+            if not clock.countdown:
+                clock.check()
 
             moves = game.get_legal_moves()
             
@@ -246,8 +388,10 @@ class MinimaxPlayer(IsolationPlayer):
         def max_play(self, game, depth):
             """function used by minimax to return best score for maximizing layer"""
 
-            if self.time_left() < self.TIMER_THRESHOLD:
-                raise SearchTimeout()
+            clock = self.clock
+            clock.countdown -= 1
+            if not clock.countdown:
+                clock.check()
 
             moves = game.get_legal_moves()
 
@@ -290,7 +434,108 @@ class MinimaxPlayer(IsolationPlayer):
 class AlphaBetaPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. 
+
+    Search results are cached by position hash in a transposition table that
+    is cleared whenever the root position or the player to move there
+    changes, so it carries scores and best moves across the iterative
+    deepening iterations of one turn.
+
+    Moves are searched in the order: the principal variation of the previous
+    iteration (or the transposition table move), the killer moves that caused
+    a cutoff at the same ply, then the remaining moves by history heuristic
+    score. Killers and history scores are also kept for the whole turn.
+
+    After each call to get_move(), `depth_reached` holds the depth of the
+    last completed iteration, `node_counts[depth]` holds the number of
+    nodes visited by the iteration searched to `depth`, and
+    `cutoff_counts[depth]` holds a tuple (cutoffs, cutoffs on the first move
+    searched) for the same iteration. An iteration aborted by the timer
+    reports the counts reached before the timeout, and the node count of an
+    iteration searched again after an aspiration window failed includes
+    both searches. `root_score` holds the score returned by the last call
+    to alphabeta(), and search_stats() summarizes the move. If `progress` is
+    set to a function, it is called with the best move of every completed
+    iteration, e.g. to publish the best move so far to another process.
+
+    Parameters
+    ----------
+    tt_size : int (optional)
+        The number of transposition table slots; 0 disables the table.
+
+    tt_replacement : str or callable (optional)
+        The replacement policy of the transposition table (see
+        `transposition.TranspositionTable`).
+
+    move_ordering : bool (optional)
+        Order moves by principal variation, killer moves and history scores
+        if True; otherwise search them in the order of get_legal_moves().
+
+    tt_symmetry : bool (optional)
+        Key the transposition table by `Board.canonical_key()` so that
+        positions related by a symmetry of the board share one entry. This
+        hashes every symmetric image at each node, so it pays off mostly in
+        the opening, where symmetric transpositions are common.
+
+    endgame_cells : int (optional)
+        Positions with at most this many open cells are checked for a
+        partition of the board between the players, and partitioned
+        positions are solved exactly by `endgame.EndgameSolver` instead of
+        being searched; 0 disables the solver. The solver checks the search
+        clock, but a position it cannot solve in time wastes the turn, so
+        larger values need a longer time limit.
+
+    frontier_score_fn : callable (optional)
+        A function `f(game, moves, player)` that returns the list of
+        heuristic values to `player` of the positions reached by each of
+        `moves`, or None if it cannot score them, e.g., a vectorized
+        `batch_eval.FrontierScorer`. If given, nodes one ply above the
+        search horizon score all of their children with one call instead of
+        visiting them one at a time. It must agree with `score_fn`,
+        including the +/-inf values of finished games.
+
+    book : object (optional)
+        An opening book (see `opening_book.OpeningBook`) whose `lookup(game)`
+        returns the move to play without searching, or None for positions
+        that are not in the book.
+
+    search_mode : str (optional)
+        The search algorithm (see `IsolationPlayer`).
+
+    aspiration_window : float (optional)
+        Half the width of the aspiration windows of the "aspiration" mode.
+
+    selective : `SelectiveSearch` (optional)
+        The parameters of the selective search, or None to search every
+        move to full depth. Moves with the same history score are ordered
+        by the mobility of the player after the move, so the reduced late
+        moves are the ones that leave the player the fewest moves. A move
+        whose reduced null window search beats the bound of its node is
+        searched again to full depth; a node off the principal variation
+        near the horizon whose static score plus the futility margin cannot
+        reach the window searches only its first move.
     """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 tt_size=2**16, tt_replacement="depth", move_ordering=True, tt_symmetry=False,
+                 endgame_cells=16, frontier_score_fn=None, book=None, search_mode="alphabeta",
+                 aspiration_window=1., selective=None):
+        super().__init__(search_depth, score_fn, timeout, search_mode)
+        self.aspiration_window = aspiration_window
+        self.selective = selective
+        self.book = book
+        self.frontier_score_fn = frontier_score_fn
+        self.endgame = EndgameSolver(endgame_cells) if endgame_cells else None
+        self.tt = TranspositionTable(tt_size, tt_replacement) if tt_size else None
+        self.tt_symmetry = tt_symmetry
+        self._tt_root = None
+        self.move_ordering = move_ordering
+        self.pv = []
+        self.killers = {}
+        self.history = ({}, {})
+        self.node_counts = {}
+        self.cutoff_counts = {}
+        self.depth_reached = 0
+        self.root_score = None
+        self.progress = None
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -314,22 +559,98 @@ class AlphaBetaPlayer(IsolationPlayer):
             (-1, -1) if there are no available legal moves.
         """
         self.time_left = time_left
-
-        # Initialize the best move and depth_limit
-        best_move = (-1, -1)
-        depth_limit = 100
+        self.reset_search()
 
         # if no legal moves
         moves = game.get_legal_moves()
         if not moves:
-            return best_move
+            return (-1, -1)
+
+        # play the book move of an opening position without searching
+        if self.book is not None:
+            book_move = self.book.lookup(game)
+            if book_move in moves:
+                return book_move
+
+        # play the longest path of a partitioned endgame without searching,
+        # unless it takes too long to find
+        if self.endgame is not None:
+            try:
+                endgame_move = self.endgame.best_move(game, self.clock)
+            except SearchTimeout:
+                endgame_move = None
+            if endgame_move is not None:
+                return endgame_move
+
+        # on large boards the first iteration may not finish in time, and a
+        # random move is better than forfeiting the game
+        move = self.iterative_deepening(game)
+        return move if move != (-1, -1) else random.choice(moves)
+
+    def reset_search(self):
+        """Discard the search state of the previous turn. """
+        self._tt_root = None
+        self.pv = []
+        self.killers = {}
+        self.history = ({}, {})
+        self.node_counts = {}
+        self.cutoff_counts = {}
+        self.depth_reached = 0
+        if self.tt is not None:
+            self.tt.probes = self.tt.hits = 0
+
+    def search_stats(self):
+        """Return the `SearchStats` of the last call to get_move(): the depth
+        of the last completed iteration, the nodes visited by every
+        iteration, and the fraction of transposition table probes that
+        found their position (None if the table was not probed).
+        """
+        probes, hits = (self.tt.probes, self.tt.hits) if self.tt is not None else (0, 0)
+        return SearchStats(self.depth_reached, sum(self.node_counts.values()),
+                           hits / probes if probes else None)
+
+    def iterative_deepening(self, game, first_depth=1, depth_limit=100):
+        """Search `game` with alphabeta() to increasing depths, starting at
+        `first_depth`, until the timer expires or `depth_limit` is reached,
+        and return the best move of the deepest completed iteration.
+        """
+        # Initialize the best move
+        best_move = (-1, -1)
+        inf = float("inf")
 
         try:
             # The try/except block will automatically catch the exception
             # raised when the timer is about to expire.
-            for depth in range(depth_limit):
-                best_move = self.alphabeta(game, depth+1)
-                
+            for depth in range(first_depth, depth_limit + 1):
+                # an aspiration window around the previous score, unless the
+                # game is decided
+                alpha, beta = -inf, inf
+                if (self.search_mode == "aspiration" and depth > first_depth and
+                        abs(self.root_score) < inf):
+                    alpha = self.root_score - self.aspiration_window
+                    beta = self.root_score + self.aspiration_window
+
+                nodes = 0
+                while True:
+                    try:
+                        move = self.alphabeta(game, depth, alpha, beta)
+                    finally:
+                        # count the nodes of every search of this depth
+                        nodes += self.node_counts.pop(depth, 0)
+                        self.node_counts[depth] = nodes
+                    # open the failing side of the window and search again;
+                    # a fail high move already beats the previous best move
+                    if beta < inf and self.root_score >= beta:
+                        best_move, beta = move, inf
+                    elif alpha > -inf and self.root_score <= alpha:
+                        alpha = -inf
+                    else:
+                        best_move = move
+                        break
+                self.depth_reached = depth
+                if self.progress is not None:
+                    self.progress(best_move)
+
                 if best_move == (-1, -1):
                     break
 
@@ -339,6 +660,59 @@ class AlphaBetaPlayer(IsolationPlayer):
         # Return the best move from the last completed search iteration
         return best_move
 
+    def order_moves(self, moves, ply, first_move):
+        """Sort the list of moves at `ply` plies below the root in-place:
+        `first_move` (the principal variation or transposition table move),
+        then the killer moves for the ply, then the rest by history score.
+        """
+        history = self.history[ply & 1]
+        killers = self.killers.get(ply, ())
+        moves.sort(key=lambda m: -history.get(m, 0))
+        for move in reversed(killers):
+            order_first(moves, move)
+        order_first(moves, first_move)
+
+    def record_cutoff(self, move, ply, depth, first):
+        """Update the killer moves, history scores and cutoff counters after
+        `move` caused a cutoff at `ply` with `depth` plies left to search.
+        """
+        self._cutoff_count += 1
+        self._first_cutoff_count += first
+        if not self.move_ordering:
+            return
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        history = self.history[ply & 1]
+        history[move] = history.get(move, 0) + depth * depth
+
+    def tt_lookup(self, game, ply, depth, alpha, beta):
+        """Probe the transposition table for the position at `ply` (see
+        `TranspositionTable.lookup`), mapping the stored move to the frame
+        of `game`, and keep the key of the position for tt_store().
+        """
+        if self.tt_symmetry:
+            key, sym = game.canonical_key()
+        else:
+            key, sym = game.hash(), 0
+        self._tt_keys[ply] = (key, sym)
+        score, move = self.tt.lookup(key, depth, alpha, beta)
+        if sym:
+            move = transform_move(move, symmetry_tables(game.width, game.height).inverse[sym],
+                                  game.height)
+        return score, move
+
+    def tt_store(self, game, ply, depth, score, alpha, beta, move):
+        """Store the result of searching the position at `ply`, probed by
+        tt_lookup(), with the window (alpha, beta).
+        """
+        key, sym = self._tt_keys[ply]
+        if sym:
+            move = transform_move(move, symmetry_tables(game.width, game.height).forward[sym],
+                                  game.height)
+        self.tt.store(key, depth, score, bound_type(score, alpha, beta), move)
+
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
         """Depth-limited minimax search with alpha-beta pruning.
 
@@ -365,90 +739,286 @@ class AlphaBetaPlayer(IsolationPlayer):
             (-1, -1) if there are no legal moves
         """
 
+        def search_moves(self, game, depth, alpha, beta):
+            """Shared node prologue of min_play and max_play: returns either
+            (score, None) for a terminal, horizon or transposition table hit,
+            or (None, moves) with the moves in search order.
+            """
+            clock = self.clock
+            clock.countdown -= 1
+            if not clock.countdown:
+                clock.check()
+            self._node_count += 1
+            ply = self._root_depth - depth
+            self._pv[ply] = []
+
+            # check if end of game or end of search tree; the moves are
+            # counted without generating them, which leaves never need
+            if not game.mobility():
+                return game.utility(self), None
+            if game.move_count >= self._endgame_moves:
+                score = self.endgame.score(game, self, self.clock)
+                if score is not None:
+                    return score, None
+            if depth == 0:
+                return self.score(game, self), None
+            moves = game.get_legal_moves()
+
+            # reuse a stored result, or search the stored best move first
+            first_move = None
+            if self.tt is not None:
+                tt_score, first_move = self.tt_lookup(game, ply, depth, alpha, beta)
+                if tt_score is not None:
+                    return tt_score, None
+
+            if self.move_ordering:
+                if self._on_pv and ply < len(self.pv):
+                    first_move = self.pv[ply]
+                if self.selective is not None:
+                    # most mobile first, kept by the stable history sort
+                    masks, open_cells, height = game._masks, ~game._blocked, game.height
+                    moves.sort(key=lambda m: -popcount(masks[m[0] + m[1] * height] & open_cells))
+                self.order_moves(moves, ply, first_move)
+            else:
+                order_first(moves, first_move)
+            return None, moves
+
         def min_play(self, game, depth, alpha, beta):
             """function used by alphabeta to return best score for minimizing layer"""
 
-            if self.time_left() < self.TIMER_THRESHOLD:
-                raise SearchTimeout()
-
-            moves = game.get_legal_moves()
-            
-            # check if end of game or end of search tree
-            if not moves:
-                return game.utility(self)  
-            if depth == 0:
-                return self.score(game, self)      
+            score, moves = search_moves(self, game, depth, alpha, beta)
+            if moves is None:
+                return score
+            ply = self._root_depth - depth
+            on_pv = self._on_pv
+            pvs = self._pvs and depth > 1
+            alpha_orig, beta_orig = alpha, beta
 
             # initialize best score
             best_score = float('inf')
-
-            for move in moves:
-                best_score = min(best_score, max_play(self, game.forecast_move(move), 
-                                                        depth-1, alpha, beta))
+            best_move = None
+
+            # score a frontier of leaves in one call
+            leaf_scores = None
+            if (depth == 1 and self.frontier_score_fn is not None and
+                    game.move_count < self._endgame_moves):
+                leaf_scores = self.frontier_score_fn(game, moves, self)
+
+            # selective search: the late moves to reduce, and the bound of
+            # a frontier node whose static score is far above beta
+            reduce_from, futile = len(moves), False
+            if self.selective is not None and not on_pv and leaf_scores is None:
+                selective = self.selective
+                if depth >= selective.reduction_depth:
+                    reduce_from = selective.reduction_moves
+                if depth <= selective.futility_depth:
+                    futile_score = self.score(game, self) - selective.futility_margin * depth
+                    futile = futile_score >= beta
+
+            for idx, move in enumerate(moves):
+                if futile and idx:
+                    best_score = min(best_score, futile_score)
+                    break
+                self._on_pv = on_pv and idx == 0
+                if leaf_scores is None:
+                    game.apply_move(move)
+                    research = True
+                    if idx >= reduce_from:
+                        # a reduced null window search; search the move to
+                        # full depth only if it beats beta
+                        reduced = max(depth - 1 - selective.reduction, 0)
+                        score = max_play(self, game, reduced, next_below(beta), beta)
+                        research = score < beta
+                    if research and pvs and idx:
+                        # a null window tells whether the move beats beta
+                        score = max_play(self, game, depth-1, next_below(beta), beta)
+                        if alpha < score < beta:
+                            score = max_play(self, game, depth-1, alpha, beta)
+                    elif research:
+                        score = max_play(self, game, depth-1, alpha, beta)
+                    game.undo_move()
+                else:
+                    self._node_count += 1
+                    self._pv[ply + 1] = []
+                    score = leaf_scores[idx]
+                if score < best_score or best_move is None:
+                    best_score, best_move = score, move
+                    self._pv[ply] = [move] + self._pv[ply + 1]
                 # prune if branch best score smaller than alpha
                 if best_score <= alpha:
-                    return best_score
+                    self.record_cutoff(move, ply, depth, idx == 0)
+                    break
                 # update beta
                 beta = min(beta, best_score)
+
+            if self.tt is not None:
+                self.tt_store(game, ply, depth, best_score, alpha_orig, beta_orig, best_move)
             return best_score
            
         def max_play(self, game, depth, alpha, beta):
             """function used by alphabeta to return best score for maximizing layer"""
 
-            if self.time_left() < self.TIMER_THRESHOLD:
-                raise SearchTimeout()
-
-            moves = game.get_legal_moves()
-            
-            # check if end of game or end of search tree
-            if not moves:
-                return game.utility(self)
-            if depth == 0:
-                return self.score(game, self) 
+            score, moves = search_moves(self, game, depth, alpha, beta)
+            if moves is None:
+                return score
+            ply = self._root_depth - depth
+            on_pv = self._on_pv
+            pvs = self._pvs and depth > 1
+            alpha_orig, beta_orig = alpha, beta
 
             # initialize best score
             best_score = float('-inf')
+            best_move = None
             
-            for move in moves:
-                best_score = max(best_score, min_play(self, game.forecast_move(move),
-                                                        depth-1, alpha, beta))
+            # score a frontier of leaves in one call
+            leaf_scores = None
+            if (depth == 1 and self.frontier_score_fn is not None and
+                    game.move_count < self._endgame_moves):
+                leaf_scores = self.frontier_score_fn(game, moves, self)
+
+            # selective search: the late moves to reduce, and the bound of
+            # a frontier node whose static score is far below alpha
+            reduce_from, futile = len(moves), False
+            if self.selective is not None and not on_pv and leaf_scores is None:
+                selective = self.selective
+                if depth >= selective.reduction_depth:
+                    reduce_from = selective.reduction_moves
+                if depth <= selective.futility_depth:
+                    futile_score = self.score(game, self) + selective.futility_margin * depth
+                    futile = futile_score <= alpha
+
+            for idx, move in enumerate(moves):
+                if futile and idx:
+                    best_score = max(best_score, futile_score)
+                    break
+                self._on_pv = on_pv and idx == 0
+                if leaf_scores is None:
+                    game.apply_move(move)
+                    research = True
+                    if idx >= reduce_from:
+                        # a reduced null window search; search the move to
+                        # full depth only if it beats alpha
+                        reduced = max(depth - 1 - selective.reduction, 0)
+                        score = min_play(self, game, reduced, alpha, next_above(alpha))
+                        research = score > alpha
+                    if research and pvs and idx:
+                        # a null window tells whether the move beats alpha
+                        score = min_play(self, game, depth-1, alpha, next_above(alpha))
+                        if alpha < score < beta:
+                            score = min_play(self, game, depth-1, alpha, beta)
+                    elif research:
+                        score = min_play(self, game, depth-1, alpha, beta)
+                    game.undo_move()
+                else:
+                    self._node_count += 1
+                    self._pv[ply + 1] = []
+                    score = leaf_scores[idx]
+                if score > best_score or best_move is None:
+                    best_score, best_move = score, move
+                    self._pv[ply] = [move] + self._pv[ply + 1]
                 # prune if best score larger than beta
                 if best_score >= beta:
-                    return best_score
+                    self.record_cutoff(move, ply, depth, idx == 0)
+                    break
                 # update alpha
                 alpha = max(alpha, best_score)
+
+            if self.tt is not None:
+                self.tt_store(game, ply, depth, best_score, alpha_orig, beta_orig, best_move)
             return best_score
  
         ### BODY OF ALPHABETA
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
-        # get the list of all legal moves for the active player
-        moves = game.get_legal_moves()
-        # initialize the best move and best score 
-        best_move = (-1, -1)
-        best_score = float('-inf')
+        # search a private bitboard copy in-place with apply_move/undo_move
+        # rather than allocating a new board for every node
+        game = BitBoard.from_board(game)
+
+        # stored scores are from this player's point of view and the table
+        # is only reused by searches of the same root position, so start a
+        # new table whenever the root or the player holding it changes
+        root = (game.hash(), game.active_player == self)
+        if self.tt is not None and root != self._tt_root:
+            self.tt.clear()
+            self._tt_root = root
+
+        # per-iteration search state: node and cutoff counters, and the
+        # triangular table of principal variations found below each ply
+        self._root_depth = depth
+        self._node_count = 0
+        self._cutoff_count = 0
+        self._first_cutoff_count = 0
+        self._pv = [[] for _ in range(depth + 2)]
+        self._tt_keys = [None] * (depth + 2)
+
+        # every move blocks one cell, so the endgame solver applies once
+        # this many moves have been played
+        self._endgame_moves = float("inf")
+        if self.endgame is not None:
+            self._endgame_moves = game.width * game.height - self.endgame.max_cells
+        self._on_pv = True
+        self._pvs = self.search_mode != "alphabeta"
 
-        # test if end of game
-        if not moves:
-            return best_move
-        # test if end of search depth
-        if depth == 0:
-            return best_move
+        try:
+            # get the list of all legal moves for the active player
+            moves = game.get_legal_moves()
+            # initialize the best move and best score 
+            best_move = (-1, -1)
+            best_score = float('-inf')
+
+            # test if end of game
+            if not moves:
+                self.root_score = game.utility(self)
+                return best_move
+            # test if end of search depth
+            if depth == 0:
+                self.root_score = self.score(game, self)
+                return best_move
+            alpha_orig, beta_orig = alpha, beta
+            pvs = self._pvs
+
+            # search the best move of the previous iteration first
+            first_move = self.pv[0] if self.move_ordering and self.pv else None
+            if self.tt is not None:
+                _, tt_move = self.tt_lookup(game, 0, depth, alpha, beta)
+                first_move = first_move or tt_move
+            if self.move_ordering:
+                self.order_moves(moves, 0, first_move)
+            else:
+                order_first(moves, first_move)
+
+            for idx, move in enumerate(moves):
+                self._on_pv = idx == 0 and move == first_move
+                game.apply_move(move)
+                if pvs and idx and depth > 1:
+                    # a null window tells whether the move beats alpha
+                    score = min_play(self, game, depth-1, alpha, next_above(alpha))
+                    if alpha < score < beta:
+                        score = min_play(self, game, depth-1, alpha, beta)
+                else:
+                    score = min_play(self, game, depth-1, alpha, beta)
+                game.undo_move()
+                # remember score and move; keep the first move searched even if
+                # every move loses, so a losing position never returns (-1, -1)
+                if score > best_score or best_move == (-1, -1):
+                    best_move = move
+                    best_score = score
+                    self._pv[0] = [move] + self._pv[1]
+                # prune if branch yields score better than beta
+                if score >= beta:
+                    break
+                # update alpha
+                alpha = max(alpha, best_score)
 
-        for move in moves:
-            score = min_play(self, game.forecast_move(move), depth-1, alpha, beta)
-            # prune if branch yields score better than beta
-            if score >= beta:
-                return move
-            # otherwise remember score and move
-            if score > best_score:
-                best_move = move
-                best_score = score
-            # update alpha
-            alpha = max(alpha, best_score)
-
-        return best_move 
-   
-        
-    
\ No newline at end of file
+            self.root_score = best_score
+            if best_move != (-1, -1):
+                self.pv = self._pv[0]
+                if self.tt is not None:
+                    self.tt_store(game, 0, depth, best_score, alpha_orig, beta_orig, best_move)
+            return best_move
+        finally:
+            # publish the counters of the iteration, including one aborted
+            # by a search timeout
+            self.node_counts[depth] = self._node_count
+            self.cutoff_counts[depth] = (self._cutoff_count, self._first_cutoff_count)
@@ -0,0 +1,229 @@
+"""Append-only binary archive of played games, e.g. the games of a
+tournament, for mining with random access instead of reparsing text.
+
+An archive is two files: the games, and an index next to them (the same
+path plus ".idx") holding the byte offset of each game as a uint64. The
+game file starts with a header, followed by one record per game: a record
+header, the names of both agents in UTF-8, and one byte per move with the
+cell index (`row + column * height`) of every move of the game, opening
+moves included. Readers memory-map both files.
+
+Run this file to summarize an archive:
+
+    python game_archive.py tournament_games.bin
+"""
+import mmap
+import os
+import struct
+import sys
+
+from collections import Counter, namedtuple
+
+HEADER = struct.Struct("<8sBB")
+MAGIC = b"ISOGAME1"
+
+# name lengths, opening moves, termination code, winning seat, moves
+RECORD = struct.Struct("<BBBBBH")
+OFFSET = struct.Struct("<Q")
+
+# the termination reasons of `isolation.Board.play`, by code
+TERMINATIONS = ("illegal move", "timeout", "forfeit")
+
+# winner is the seat (0 for player 1, 1 for player 2) of the winning agent,
+# and opening the number of moves played before the game started
+GameRecord = namedtuple("GameRecord", ["player_1", "player_2", "winner", "termination",
+                                       "opening", "moves"])
+
+
+def index_path(path):
+    """Return the path of the index of the archive at `path`. """
+    return path + ".idx"
+
+
+class ArchiveWriter:
+    """Append games to an archive, creating it if needed; use as a context
+    manager or call close().
+
+    Parameters
+    ----------
+    path : str
+        The path of the game file.
+
+    width, height : int (optional)
+        The board size of the archived games; an existing archive must have
+        the same size.
+    """
+    def __init__(self, path, width=7, height=7):
+        if width * height > 256:
+            raise ValueError("Moves of a {}x{} board do not fit in a byte".format(width, height))
+        self.width = width
+        self.height = height
+        self._games = open(path, "ab")
+        self._index = open(index_path(path), "ab")
+        if self._games.tell() == 0:
+            self._games.write(HEADER.pack(MAGIC, width, height))
+        else:
+            with open(path, "rb") as f:
+                magic, file_width, file_height = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or (file_width, file_height) != (width, height):
+                self.close()
+                raise ValueError("Not a game archive of {}x{} boards: {}".format(
+                    width, height, path))
+
+    def append(self, player_1, player_2, winner, termination, opening, moves):
+        """Write one game.
+
+        Parameters
+        ----------
+        player_1, player_2 : str
+            The names of the agents in each seat.
+
+        winner : int
+            The seat of the winner, 0 for player 1 or 1 for player 2.
+
+        termination : str
+            One of `TERMINATIONS`.
+
+        opening : list<(int, int)>
+            The moves played before the game started.
+
+        moves : list<(int, int)>
+            The moves of the game, e.g. the move history returned by
+            `isolation.Board.play`.
+        """
+        names = [name.encode("utf-8") for name in (player_1, player_2)]
+        cells = bytes(r + c * self.height for r, c in list(opening) + list(moves))
+        offset = self._games.tell()
+        self._games.write(RECORD.pack(len(names[0]), len(names[1]), len(opening),
+                                      TERMINATIONS.index(termination), winner, len(cells)))
+        self._games.write(names[0] + names[1] + cells)
+        self._index.write(OFFSET.pack(offset))
+
+    def flush(self):
+        self._games.flush()
+        self._index.flush()
+
+    def close(self):
+        self._games.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class GameArchive:
+    """Read-only view of an archive written by `ArchiveWriter`, with random
+    access to its games by number. The view covers the games archived when
+    it was opened.
+
+    Parameters
+    ----------
+    path : str
+        The path of the game file.
+    """
+    def __init__(self, path):
+        self._files = []
+        self._data = self._map(path)
+        magic, self.width, self.height = HEADER.unpack_from(self._data)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("Not a game archive: {}".format(path))
+        index = self._map(index_path(path))
+        self._views = [memoryview(index)] if index else []
+        self._offsets = self._views[0].cast("Q") if index else []
+
+    def _map(self, path):
+        f = open(path, "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append(data)
+        return data
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def cells(self, idx):
+        """Return the cell indices of all moves of game `idx`, opening moves
+        included, as bytes.
+        """
+        offset = self._offsets[idx]
+        len_1, len_2, _, _, _, num_moves = RECORD.unpack_from(self._data, offset)
+        start = offset + RECORD.size + len_1 + len_2
+        return self._data[start:start + num_moves]
+
+    def __getitem__(self, idx):
+        offset = self._offsets[idx]
+        len_1, len_2, opening, code, winner, num_moves = RECORD.unpack_from(self._data, offset)
+        start = offset + RECORD.size
+        names = bytes(self._data[start:start + len_1 + len_2])
+        moves = [(cell % self.height, cell // self.height)
+                 for cell in self._data[start + len_1 + len_2:start + len_1 + len_2 + num_moves]]
+        return GameRecord(names[:len_1].decode("utf-8"), names[len_1:].decode("utf-8"),
+                          winner, TERMINATIONS[code], opening, moves)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def close(self):
+        # the views of the index must be released before unmapping it
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        for view in getattr(self, "_views", []):
+            view.release()
+        self._offsets = []
+        for f in reversed(self._files):
+            f.close()
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def rebuild_index(path):
+    """Rewrite the index of the archive at `path` by scanning its games,
+    e.g. after a crash between writing a game and its offset. An incomplete
+    last game is left out of the index.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    offsets = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        len_1, len_2, _, _, _, num_moves = RECORD.unpack_from(data, offset)
+        end = offset + RECORD.size + len_1 + len_2 + num_moves
+        if end > len(data):
+            break
+        offsets.append(offset)
+        offset = end
+    with open(index_path(path), "wb") as f:
+        f.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+    return len(offsets)
+
+
+def main():
+    """Print the number of games, wins and terminations of each agent. """
+    with GameArchive(sys.argv[1]) as archive:
+        wins, games, terminations = Counter(), Counter(), Counter()
+        for game in archive:
+            players = (game.player_1, game.player_2)
+            games.update(players)
+            wins[players[game.winner]] += 1
+            terminations[game.termination] += 1
+        print("{} games of {}x{} boards\n".format(len(archive), archive.width, archive.height))
+        print("{:<20}{:>8}{:>8}".format("Agent", "Games", "Wins"))
+        for name in sorted(games):
+            print("{:<20}{:>8}{:>8}".format(name, games[name], wins[name]))
+        print("\n" + ", ".join("{}: {}".format(t, n) for t, n in sorted(terminations.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Unit tests for the binary game archive. """
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from isolation import Board
+from game_archive import ArchiveWriter, GameArchive, index_path, rebuild_index
+
+
+def random_game(rng):
+    """Return the opening and the moves of a random game. """
+    game = Board("Player1", "Player2")
+    moves = []
+    while True:
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
+            break
+        moves.append(rng.choice(legal_moves))
+        game.apply_move(moves[-1])
+    return moves[:2], moves[2:]
+
+
+class GameArchiveTest(unittest.TestCase):
+    """Unit tests for writing and reading archives"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "games.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_games(self, num_games, seed):
+        rng = random.Random(seed)
+        games = []
+        with ArchiveWriter(self.path) as archive:
+            for idx in range(num_games):
+                opening, moves = random_game(rng)
+                winner = (len(opening) + len(moves)) & 1 ^ 1
+                games.append(("Agent{}".format(idx % 3), "Agent_é", winner, "illegal move",
+                              len(opening), opening + moves))
+                archive.append(games[-1][0], games[-1][1], winner, "illegal move",
+                               opening, moves)
+        return games
+
+    def test_round_trip(self):
+        games = self.write_games(50, 0)
+        # appending to an existing archive
+        games += self.write_games(30, 1)
+        with GameArchive(self.path) as archive:
+            self.assertEqual(len(archive), 80)
+            self.assertEqual([tuple(game) for game in archive], games)
+            for idx in (79, 0, 41):
+                self.assertEqual(archive[idx].moves, games[idx][5])
+                self.assertEqual(list(archive.cells(idx)),
+                                 [r + c * 7 for r, c in games[idx][5]])
+
+    def test_empty(self):
+        ArchiveWriter(self.path).close()
+        with GameArchive(self.path) as archive:
+            self.assertEqual(len(archive), 0)
+            self.assertEqual(list(archive), [])
+
+    def test_rebuild_index(self):
+        games = self.write_games(20, 2)
+        # a crash while writing the last game
+        with open(self.path, "rb+") as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        os.remove(index_path(self.path))
+        self.assertEqual(rebuild_index(self.path), 19)
+        with GameArchive(self.path) as archive:
+            self.assertEqual([tuple(game) for game in archive], games[:19])
+
+    def test_board_size(self):
+        ArchiveWriter(self.path).close()
+        with self.assertRaises(ValueError):
+            ArchiveWriter(self.path, width=8, height=8)
+
+
+if __name__ == '__main__':
+    unittest.main()
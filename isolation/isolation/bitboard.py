@@ -0,0 +1,418 @@
+"""
+This file contains the `BitBoard` class, an alternative engine for the game
+Isolation that keeps the blocked cells in an integer bitmask and supports
+in-place make/unmake moves so that search can walk the game tree without
+copying the board at every node.
+"""
+import random
+
+from .isolation import Board
+from .tables import (knight_tables, knight_spread, zobrist_tables, symmetry_tables,
+                     symmetric_zobrist_tables)
+
+
+class BitBoard(Board):
+    """Implement a model for the game Isolation with the same public
+    interface as `isolation.Board`, backed by integer bitmasks.
+
+    Cell (row, column) is stored in bit `row + column * height`, the same
+    index that `Board` uses for its state list. Blocked cells (including the
+    cells currently occupied by the players) are set in `_blocked`, and the
+    cell index of each player is kept in `_locs` (player 1 first). Python
+    integers have arbitrary precision, so the masks are as wide as the
+    board, e.g., 441 bits on a 21x21 board.
+
+    `Board.__init__` is not called, so every `Board` method that reads the
+    list-backed state is overridden here.
+
+    The move lists and move counts of both players are cached for the
+    current state, as in `Board`, and cleared by `apply_move` and
+    `undo_move`; code that edits `_blocked` or `_locs` directly must do so
+    before asking for moves.
+
+    Every call to `apply_move` pushes the previous location of the moving
+    player onto an undo stack, so `undo_move` restores the prior state
+    exactly. Copies start with an empty undo stack.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        self._blocked = 0
+        self._locs = [Board.NOT_MOVED, Board.NOT_MOVED]
+        self._history = []
+        tables = knight_tables(width, height)
+        self._cells = tables.cells
+        self._neighbors = tables.neighbors
+        self._masks = tables.masks
+        self._shifts = tables.shifts
+        self._zobrist = zobrist_tables(width, height)
+        self._key = 0
+        self._moves = [None, None]
+        self._mobility = [None, None]
+
+    @classmethod
+    def from_board(cls, board):
+        """Return a new `BitBoard` holding the same game state as the input
+        board, which may be any object implementing the `isolation.Board`
+        interface. A `BitBoard` input is simply copied.
+        """
+        if isinstance(board, BitBoard):
+            return board.copy()
+
+        # player 1 always holds the initiative after an even number of moves
+        if board.move_count % 2 == 0:
+            player_1, player_2 = board.active_player, board.inactive_player
+        else:
+            player_1, player_2 = board.inactive_player, board.active_player
+
+        new_board = cls(player_1, player_2, width=board.width, height=board.height)
+        new_board.move_count = board.move_count
+        new_board._active_player = board.active_player
+        new_board._inactive_player = board.inactive_player
+
+        zobrist = new_board._zobrist
+        new_board._blocked = (1 << (board.width * board.height)) - 1
+        for r, c in board.get_blank_spaces():
+            new_board._blocked ^= 1 << (r + c * board.height)
+        for idx, key in enumerate(zobrist.cells):
+            if (new_board._blocked >> idx) & 1:
+                new_board._key ^= key
+        for slot, player in enumerate((player_1, player_2)):
+            loc = board.get_player_location(player)
+            if loc is not Board.NOT_MOVED:
+                new_board._locs[slot] = loc[0] + loc[1] * board.height
+                new_board._key ^= zobrist.locs[slot][new_board._locs[slot]]
+        if board.move_count & 1:
+            new_board._key ^= zobrist.side
+        return new_board
+
+    def hash(self):
+        return self._key
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = BitBoard(self._player_1, self._player_2, width=self.width, height=self.height)
+        new_board.move_count = self.move_count
+        new_board._active_player = self._active_player
+        new_board._inactive_player = self._inactive_player
+        new_board._blocked = self._blocked
+        new_board._locs = self._locs[:]
+        new_board._key = self._key
+        return new_board
+
+    def transform(self, symmetry):
+        """Return a copy of the board mapped by a symmetry of the board.
+
+        Parameters
+        ----------
+        symmetry : int
+            The index of the symmetry in `isolation.tables.symmetry_tables`,
+            e.g., the symmetry returned by canonical_key().
+
+        Returns
+        -------
+        isolation.BitBoard
+            A copy of the board with every cell and player location moved
+            to its image under the symmetry.
+        """
+        perm = symmetry_tables(self.width, self.height).forward[symmetry]
+        blocked = self._blocked_cells()
+        new_board = self.copy()
+        new_board._blocked = 0
+        for idx in blocked:
+            new_board._blocked |= 1 << perm[idx]
+        new_board._locs = [idx if idx is Board.NOT_MOVED else perm[idx] for idx in self._locs]
+        new_board._key = self._image_key(
+            symmetric_zobrist_tables(self.width, self.height)[symmetry], blocked, self._locs)
+        return new_board
+
+    def _blocked_cells(self):
+        """Return the list of indices of the blocked cells. """
+        cells = []
+        blocked = self._blocked
+        while blocked:
+            low = blocked & -blocked
+            cells.append(low.bit_length() - 1)
+            blocked ^= low
+        return cells
+
+    def _player_cells(self):
+        """Return the cell indices of player 1 and player 2 (or NOT_MOVED). """
+        return self._locs
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
+                not (self._blocked >> (move[0] + move[1] * self.height)) & 1)
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        blocked = self._blocked
+        return [cell for idx, cell in enumerate(self._cells) if not (blocked >> idx) & 1]
+
+    def get_player_location(self, player):
+        """Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int) or None
+            The coordinate pair (row, column) of the input player, or None
+            if the player has not moved.
+        """
+        if player == self._player_1:
+            idx = self._locs[0]
+        elif player == self._player_2:
+            idx = self._locs[1]
+        else:
+            raise RuntimeError("Invalid player in get_player_location: {}".format(player))
+        if idx is Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return (idx % self.height, idx // self.height)
+
+    def _move_list(self, slot):
+        """Return the cached list of legal moves of the player in `slot`, in
+        a fixed order. The list is shared by every caller until the next
+        move, so it must not be modified.
+        """
+        moves = self._moves[slot]
+        if moves is None:
+            moves = self._moves[slot] = self._moves_from(self._locs[slot], False)
+        return moves
+
+    def _move_count(self, slot):
+        """Return the cached number of legal moves of the player in `slot`,
+        counted from the bitmasks without generating the moves.
+        """
+        count = self._mobility[slot]
+        if count is None:
+            idx = self._locs[slot]
+            if idx is Board.NOT_MOVED:
+                count = self.width * self.height - bin(self._blocked).count("1")
+            else:
+                count = bin(self._masks[idx] & ~self._blocked).count("1")
+            self._mobility[slot] = count
+        return count
+
+    def _moves_from(self, idx, shuffle=True):
+        """Generate the list of knight moves from the cell index `idx`, or
+        every blank space if `idx` is NOT_MOVED.
+        """
+        if idx is Board.NOT_MOVED:
+            return self.get_blank_spaces()
+
+        # intersect the precomputed neighbor mask with the open cells
+        open_cells = self._masks[idx] & ~self._blocked
+        if not open_cells:
+            return []
+        moves = [move for move, n_idx in self._neighbors[idx] if open_cells >> n_idx & 1]
+        if shuffle:
+            random.shuffle(moves)
+        return moves
+
+    def _Board__get_moves(self, loc, shuffle=True):
+        # override the name-mangled private helper of Board, which reads the
+        # list-backed state that BitBoard does not have
+        if loc == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        return self._moves_from(loc[0] + loc[1] * self.height, shuffle)
+
+    def apply_move(self, move):
+        """Move the active player to a specified location in-place. The move
+        can be reverted with `undo_move`.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        slot = self.move_count & 1
+        prev = self._locs[slot]
+        locs = self._zobrist.locs[slot]
+        if prev is not Board.NOT_MOVED:
+            self._key ^= locs[prev]
+        self._key ^= self._zobrist.cells[idx] ^ locs[idx] ^ self._zobrist.side
+        self._history.append(prev)
+        self._locs[slot] = idx
+        self._blocked |= 1 << idx
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+        self._moves = [None, None]
+        self._mobility = [None, None]
+
+    def undo_move(self):
+        """Revert the last move applied with `apply_move`, restoring the
+        previous location of the player who made it and unblocking the cell.
+        """
+        self.move_count -= 1
+        slot = self.move_count & 1
+        idx = self._locs[slot]
+        prev = self._history.pop()
+        locs = self._zobrist.locs[slot]
+        self._key ^= self._zobrist.cells[idx] ^ locs[idx] ^ self._zobrist.side
+        if prev is not Board.NOT_MOVED:
+            self._key ^= locs[prev]
+        self._blocked ^= 1 << idx
+        self._locs[slot] = prev
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self._moves = [None, None]
+        self._mobility = [None, None]
+
+    def region(self, player, stop=0):
+        """Return the bitmask of the open cells that the specified player can
+        reach by any sequence of knight moves, found by a flood fill that
+        moves the whole frontier one step at a time with the `shifts` table
+        of `isolation.tables.knight_tables`, so it takes a few operations
+        per step on boards of any size.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game, which must
+            have moved.
+
+        stop : int (optional)
+            A bitmask of cells; the fill ends as soon as it reaches one of
+            them, and returns the cells reached so far.
+
+        Returns
+        -------
+        int
+            The bitmask of the reachable cells, without the player's cell.
+        """
+        idx = self._locs[self._slot(player, "region")]
+        if idx is Board.NOT_MOVED:
+            raise RuntimeError("The player has not moved: {}".format(player))
+        open_cells = ~self._blocked & ((1 << (self.width * self.height)) - 1)
+        shifts = self._shifts
+        region = frontier = self._masks[idx] & open_cells
+        while frontier and not region & stop:
+            frontier = knight_spread(frontier, shifts) & open_cells & ~region
+            region |= frontier
+        return region
+
+    def regions(self):
+        """Test whether the players are separated, i.e., no open cell can
+        be reached by both of them, so that each player is confined to its
+        own region for the rest of the game.
+
+        Returns
+        -------
+        (int, int) or None
+            The bitmasks of the cells reachable by the active player and by
+            the inactive player if the players are separated, or None if
+            they may still interact or either player has not moved.
+        """
+        if Board.NOT_MOVED in self._locs:
+            return None
+        # the players are connected iff the active player's region reaches
+        # a cell next to the inactive player
+        inactive_moves = self._masks[self._locs[(self.move_count & 1) ^ 1]] & ~self._blocked
+        active_region = self.region(self._active_player, stop=inactive_moves)
+        if active_region & inactive_moves:
+            return None
+        return active_region, self.region(self._inactive_player)
+
+    def playout(self, rand=random.random):
+        """Play the game out from the current state with uniformly random
+        moves for both players, without modifying the board.
+
+        Parameters
+        ----------
+        rand : callable (optional)
+            A function returning a random float in [0, 1).
+
+        Returns
+        -------
+        (object, int)
+            The winning player and the number of moves played.
+        """
+        neighbors = self._neighbors
+        blocked = self._blocked
+        locs = self._locs[:]
+        slot = self.move_count & 1
+        plies = 0
+        while True:
+            loc = locs[slot]
+            if loc is Board.NOT_MOVED:
+                moves = [idx for idx in range(self.width * self.height)
+                         if not (blocked >> idx) & 1]
+            else:
+                moves = [idx for _, idx in neighbors[loc] if not (blocked >> idx) & 1]
+            if not moves:
+                break
+            idx = moves[int(rand() * len(moves))]
+            blocked |= 1 << idx
+            locs[slot] = idx
+            slot ^= 1
+            plies += 1
+        return (self._player_2 if slot == 0 else self._player_1), plies
+
+    def to_string(self, symbols=['1', '2']):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        p1_loc, p2_loc = self._locs
+
+        col_margin = len(str(self.height - 1)) + 1
+        prefix = "{:<" + "{}".format(col_margin) + "}"
+        offset = " " * (col_margin + 3)
+        out = offset + '   '.join(map(str, range(self.width))) + '\n\r'
+        for i in range(self.height):
+            out += prefix.format(i) + ' | '
+            for j in range(self.width):
+                idx = i + j * self.height
+                if not (self._blocked >> idx) & 1:
+                    out += ' '
+                elif p1_loc == idx:
+                    out += symbols[0]
+                elif p2_loc == idx:
+                    out += symbols[1]
+                else:
+                    out += '-'
+                out += ' | '
+            out += '\n\r'
+
+        return out
@@ -4,10 +4,20 @@ game Isolation, i.e., the players move like knights in chess.
 """
 import random
 import timeit
+from collections import namedtuple
 from copy import copy
 
+from .tables import knight_tables, zobrist_tables, symmetry_tables, symmetric_zobrist_tables
+
 TIME_LIMIT_MILLIS = 150
 
+# what Board.play() records about each move requested from a player: the
+# milliseconds used and left in the turn (negative after a timeout), and
+# the depth reached, nodes searched and transposition table hit rate the
+# player reports through its `search_stats()` method (None if it has none)
+MoveTelemetry = namedtuple("MoveTelemetry", ["player", "time_used", "time_left", "depth",
+                                             "nodes", "tt_hit_rate"])
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -46,9 +56,79 @@ class Board(object):
         self._board_state = [Board.BLANK] * (width * height + 3)
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
+        self._neighbors = knight_tables(width, height).neighbors
+
+        # Zobrist key of the current state, updated incrementally by apply_move
+        self._zobrist = zobrist_tables(width, height)
+        self._key = 0
+
+        # the legal moves and move counts of each player (player 1 first) in
+        # the current state, computed on demand and cleared by apply_move
+        self._moves = [None, None]
+        self._mobility = [None, None]
 
     def hash(self):
-        return str(self._board_state).__hash__()
+        return self._key
+
+    def canonical_key(self):
+        """Return the hash of the canonical form of the current state, which
+        is the least hash among the images of the state under the symmetries
+        of the board, and the index of a symmetry (see
+        `isolation.tables.symmetry_tables`) mapping the state to it.
+        Symmetric states have the same canonical key.
+        """
+        blocked, locs = self._blocked_cells(), self._player_cells()
+        keys = [self._image_key(zobrist, blocked, locs)
+                for zobrist in symmetric_zobrist_tables(self.width, self.height)]
+        key = min(keys)
+        return key, keys.index(key)
+
+    def transform(self, symmetry):
+        """Return a copy of the board mapped by a symmetry of the board.
+
+        Parameters
+        ----------
+        symmetry : int
+            The index of the symmetry in `isolation.tables.symmetry_tables`,
+            e.g., the symmetry returned by canonical_key().
+
+        Returns
+        -------
+        isolation.Board
+            A copy of the board with every cell and player location moved
+            to its image under the symmetry.
+        """
+        perm = symmetry_tables(self.width, self.height).forward[symmetry]
+        new_board = self.copy()
+        for idx, t_idx in enumerate(perm):
+            new_board._board_state[t_idx] = self._board_state[idx]
+        for i in (-1, -2):
+            if self._board_state[i] is not Board.NOT_MOVED:
+                new_board._board_state[i] = perm[self._board_state[i]]
+        new_board._key = self._image_key(
+            symmetric_zobrist_tables(self.width, self.height)[symmetry],
+            self._blocked_cells(), self._player_cells())
+        return new_board
+
+    def _blocked_cells(self):
+        """Return the list of indices of the blocked cells. """
+        return [idx for idx in range(self.width * self.height) if self._board_state[idx]]
+
+    def _player_cells(self):
+        """Return the cell indices of player 1 and player 2 (or NOT_MOVED). """
+        return self._board_state[-1], self._board_state[-2]
+
+    def _image_key(self, zobrist, blocked, locs):
+        """Hash the state given by the blocked cells and player locations
+        with a set of Zobrist tables.
+        """
+        key = zobrist.side if self.move_count & 1 else 0
+        for idx in blocked:
+            key ^= zobrist.cells[idx]
+        for keys, idx in zip(zobrist.locs, locs):
+            if idx is not Board.NOT_MOVED:
+                key ^= keys[idx]
+        return key
 
     @property
     def active_player(self):
@@ -92,6 +172,7 @@ class Board(object):
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._key = self._key
         return new_board
 
     def forecast_move(self, move):
@@ -164,7 +245,7 @@ class Board(object):
         h = idx % self.height
         return (h, w)
 
-    def get_legal_moves(self, player=None):
+    def get_legal_moves(self, player=None, shuffle=True):
         """Return the list of all legal moves for the specified player.
 
         Parameters
@@ -173,6 +254,11 @@ class Board(object):
             An object registered as a player in the current game. If None,
             return the legal moves for the active player on the board.
 
+        shuffle : bool (optional)
+            Return the moves in random order if True; otherwise return them
+            in a fixed order, which skips the cost of shuffling for callers
+            that only count moves or order them themselves.
+
         Returns
         -------
         list<(int, int)>
@@ -180,8 +266,84 @@ class Board(object):
             for the player constrained by the current game state.
         """
         if player is None:
-            player = self.active_player
-        return self.__get_moves(self.get_player_location(player))
+            player = self._active_player
+        moves = self._move_list(self._slot(player, "get_legal_moves"))[:]
+        if shuffle:
+            random.shuffle(moves)
+        return moves
+
+    def mobility(self, player=None):
+        """Return the number of legal moves of the specified player, i.e.,
+        `len(get_legal_moves(player))` without building a new list.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            count the legal moves of the active player on the board.
+
+        Returns
+        -------
+        int
+            The number of legal moves of the player.
+        """
+        if player is None:
+            player = self._active_player
+        return self._move_count(self._slot(player, "mobility"))
+
+    def status(self, player):
+        """Return the utility of the current game state from the perspective
+        of the specified player (see `utility`), and the number of legal
+        moves of the player and of its opponent, in a single call.
+
+        Heuristics that test for a finished game and then count the moves of
+        both players should call this instead of is_winner(), is_loser()
+        and get_legal_moves(), which would generate the same moves again.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (float, int, int)
+            The utility of the state for the player (+inf, -inf or 0), the
+            number of legal moves of the player and that of its opponent.
+        """
+        slot = self._slot(player, "status")
+        own, opp = self._move_count(slot), self._move_count(slot ^ 1)
+        if player == self._active_player:
+            return (0. if own else float("-inf")), own, opp
+        return (0. if opp else float("inf")), own, opp
+
+    def _slot(self, player, caller):
+        """Return 0 for player 1 and 1 for player 2, the index of the
+        player in the move caches.
+        """
+        if player == self._player_1:
+            return 0
+        elif player == self._player_2:
+            return 1
+        raise RuntimeError("Invalid player in {}: {}".format(caller, player))
+
+    def _move_list(self, slot):
+        """Return the cached list of legal moves of the player in `slot`, in
+        a fixed order. The list is shared by every caller until the next
+        move, so it must not be modified.
+        """
+        moves = self._moves[slot]
+        if moves is None:
+            player = self._player_2 if slot else self._player_1
+            moves = self._moves[slot] = self.__get_moves(self.get_player_location(player), False)
+        return moves
+
+    def _move_count(self, slot):
+        """Return the cached number of legal moves of the player in `slot`. """
+        count = self._mobility[slot]
+        if count is None:
+            count = self._mobility[slot] = len(self._move_list(slot))
+        return count
 
     def apply_move(self, move):
         """Move the active player to a specified location.
@@ -194,19 +356,27 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         last_move_idx = int(self.active_player == self._player_2) + 1
+        locs = self._zobrist.locs[last_move_idx - 1]
+        if self._board_state[-last_move_idx] != Board.NOT_MOVED:
+            self._key ^= locs[self._board_state[-last_move_idx]]
+        self._key ^= self._zobrist.cells[idx] ^ locs[idx] ^ self._zobrist.side
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
+        self._moves = [None, None]
+        self._mobility = [None, None]
 
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return (player == self._inactive_player and
+                not self._move_count(self._slot(self._active_player, "is_winner")))
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return (player == self._active_player and
+                not self._move_count(self._slot(player, "is_loser")))
 
     def utility(self, player):
         """Returns the utility of the current game state from the perspective
@@ -230,7 +400,7 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self._move_count(self._slot(self._active_player, "utility")):
 
             if player == self._inactive_player:
                 return float("inf")
@@ -240,19 +410,18 @@ class Board(object):
 
         return 0.
 
-    def __get_moves(self, loc):
+    def __get_moves(self, loc, shuffle=True):
         """Generate the list of possible moves for an L-shaped motion (like a
         knight in chess).
         """
         if loc == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = loc
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2), (1, 2), (2, -1), (2, 1)]
-        valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                       if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+        state = self._board_state
+        valid_moves = [move for move, idx in self._neighbors[loc[0] + loc[1] * self.height]
+                       if state[idx] == Board.BLANK]
+        if shuffle:
+            random.shuffle(valid_moves)
         return valid_moves
 
     def print_board(self):
@@ -288,7 +457,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, ponder=False, telemetry=None):
         """Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
 
@@ -298,6 +467,21 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        ponder : bool (optional)
+            Let players think on their opponent's time. After each move, the
+            player who made it is passed a copy of the new board through its
+            `ponder(game)` method, if it has one, and may search in the
+            background until its next call to get_move(), where stopping
+            counts against its own time. When the game ends, the players'
+            `stop_pondering()` methods are called.
+
+        telemetry : list (optional)
+            If given, a `MoveTelemetry` is appended to it for every move
+            requested, including a move that loses the game by timeout or
+            forfeit. A player reports its search with a `search_stats()`
+            method returning a tuple (depth, nodes, tt_hit_rate) for the
+            move it just returned.
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -305,6 +489,15 @@ class Board(object):
             move history, and a string indicating the reason for losing
             (e.g., timeout or invalid move).
         """
+        try:
+            return self._play(time_limit, ponder, telemetry)
+        finally:
+            if ponder:
+                for player in (self._player_1, self._player_2):
+                    if hasattr(player, "stop_pondering"):
+                        player.stop_pondering()
+
+    def _play(self, time_limit, ponder, telemetry):
         move_history = []
 
         time_millis = lambda: 1000 * timeit.default_timer()
@@ -319,6 +512,12 @@ class Board(object):
             curr_move = self._active_player.get_move(game_copy, time_left)
             move_end = time_left()
 
+            if telemetry is not None:
+                player = self._active_player
+                stats = player.search_stats() if hasattr(player, "search_stats") else None
+                telemetry.append(MoveTelemetry(player, time_limit - move_end, move_end,
+                                               *(stats or (None, None, None))))
+
             if curr_move is None:
                 curr_move = Board.NOT_MOVED
 
@@ -333,3 +532,7 @@ class Board(object):
             move_history.append(list(curr_move))
 
             self.apply_move(curr_move)
+
+            # start pondering before the opponent's clock starts
+            if ponder and hasattr(self._inactive_player, "ponder"):
+                self._inactive_player.ponder(self.copy())
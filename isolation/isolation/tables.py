@@ -0,0 +1,188 @@
+"""
+This file contains lookup tables for the game Isolation that depend only on
+the board dimensions, computed once and cached for each (width, height).
+
+Cells are indexed by `row + column * height`, matching the layout of
+`Board` and `BitBoard`.
+"""
+import random
+from collections import namedtuple
+from functools import lru_cache
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+KnightTables = namedtuple("KnightTables", ["cells", "neighbors", "masks", "shifts"])
+ZobristTables = namedtuple("ZobristTables", ["cells", "locs", "side"])
+SymmetryTables = namedtuple("SymmetryTables", ["forward", "inverse"])
+
+
+@lru_cache(maxsize=None)
+def knight_tables(width, height):
+    """Return the knight-move lookup tables for a board of the given size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    -------
+    KnightTables
+        A named tuple with three lists indexed by cell:
+        `cells` holds the (row, column) coordinate pair of each cell,
+        `neighbors` holds a tuple of ((row, column), index) pairs for each
+        cell reachable by a knight move, and `masks` holds the bitmask of
+        those neighbor cells; and `shifts`, a tuple with one pair
+        (offset, mask) per direction, where `mask` holds the cells with a
+        neighbor in that direction, found `offset` bits higher (lower if
+        negative). With `shifts` a set of cells is moved in every direction
+        at once, in 8 operations on bitmasks of any width (see
+        `knight_spread`).
+    """
+    size = width * height
+    cells = [None] * size
+    neighbors = [None] * size
+    masks = [0] * size
+    shifts = [[dr + dc * height, 0] for dr, dc in DIRECTIONS]
+    for c in range(width):
+        for r in range(height):
+            idx = r + c * height
+            cells[idx] = (r, c)
+            neighbors[idx] = tuple(((r + dr, c + dc), r + dr + (c + dc) * height)
+                                   for dr, dc in DIRECTIONS
+                                   if 0 <= r + dr < height and 0 <= c + dc < width)
+            for _, n_idx in neighbors[idx]:
+                masks[idx] |= 1 << n_idx
+            for shift, (dr, dc) in zip(shifts, DIRECTIONS):
+                if 0 <= r + dr < height and 0 <= c + dc < width:
+                    shift[1] |= 1 << idx
+    return KnightTables(cells, neighbors, masks, tuple(map(tuple, shifts)))
+
+
+def knight_spread(cells, shifts):
+    """Return the bitmask of the cells one knight move away from any cell
+    in the bitmask `cells`.
+
+    Parameters
+    ----------
+    cells : int
+        A bitmask of cells.
+
+    shifts : tuple
+        The `shifts` table of `knight_tables` for the board size.
+
+    Returns
+    -------
+    int
+        The bitmask of the neighbors of the cells.
+    """
+    reached = 0
+    for offset, mask in shifts:
+        if offset > 0:
+            reached |= (cells & mask) << offset
+        else:
+            reached |= (cells & mask) >> -offset
+    return reached
+
+
+@lru_cache(maxsize=None)
+def zobrist_tables(width, height):
+    """Return the Zobrist hashing keys for a board of the given size.
+
+    The keys are drawn from a generator seeded by the board dimensions, so
+    every process computes the same hash for the same position.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    -------
+    ZobristTables
+        A named tuple with `cells`, a list of 64-bit keys for each blocked
+        cell, `locs`, a pair of such lists for the location of player 1 and
+        player 2, and `side`, the key toggled when player 2 has initiative.
+    """
+    rng = random.Random("zobrist-{}x{}".format(width, height))
+    size = width * height
+    cells = [rng.getrandbits(64) for _ in range(size)]
+    locs = ([rng.getrandbits(64) for _ in range(size)],
+            [rng.getrandbits(64) for _ in range(size)])
+    return ZobristTables(cells, locs, rng.getrandbits(64))
+
+
+@lru_cache(maxsize=None)
+def symmetry_tables(width, height):
+    """Return the cell permutations of the symmetries of a board of the
+    given size: the 8 rotations and reflections of a square board, or the
+    4 reflections and half-turn of a rectangular board. Knight moves are
+    preserved by all of them, so they map every game to an equivalent game.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    -------
+    SymmetryTables
+        A named tuple of two tuples with one permutation per symmetry, the
+        identity first: `forward[s][idx]` is the index of the cell that
+        cell `idx` is mapped to by symmetry `s`, and `inverse[s]` undoes
+        `forward[s]`.
+    """
+    last_r, last_c = height - 1, width - 1
+    transforms = [lambda r, c: (r, c),
+                  lambda r, c: (last_r - r, c),
+                  lambda r, c: (r, last_c - c),
+                  lambda r, c: (last_r - r, last_c - c)]
+    if width == height:
+        transforms += [lambda r, c: (c, r),
+                       lambda r, c: (c, last_r - r),
+                       lambda r, c: (last_c - c, r),
+                       lambda r, c: (last_c - c, last_r - r)]
+
+    forward, inverse = [], []
+    for transform in transforms:
+        perm = [0] * (width * height)
+        for c in range(width):
+            for r in range(height):
+                t_r, t_c = transform(r, c)
+                perm[r + c * height] = t_r + t_c * height
+        inv = [0] * len(perm)
+        for idx, t_idx in enumerate(perm):
+            inv[t_idx] = idx
+        forward.append(tuple(perm))
+        inverse.append(tuple(inv))
+    return SymmetryTables(tuple(forward), tuple(inverse))
+
+
+@lru_cache(maxsize=None)
+def symmetric_zobrist_tables(width, height):
+    """Return the Zobrist keys of a board of the given size rearranged for
+    each symmetry, so that hashing the cells of a position with the tables
+    of symmetry `s` gives the hash of the image of the position under `s`.
+
+    Returns
+    -------
+    tuple<ZobristTables>
+        One `ZobristTables` per symmetry, in the order of `symmetry_tables`.
+    """
+    zobrist = zobrist_tables(width, height)
+    images = []
+    for perm in symmetry_tables(width, height).forward:
+        cells = [zobrist.cells[t_idx] for t_idx in perm]
+        locs = tuple([keys[t_idx] for t_idx in perm] for keys in zobrist.locs)
+        images.append(ZobristTables(cells, locs, zobrist.side))
+    return tuple(images)
@@ -0,0 +1,275 @@
+"""This file contains a parallel alpha-beta agent in the "Lazy SMP" style:
+helper processes search the same root as the agent, starting at staggered
+depths and in different move orders, and all of them share one
+transposition table in shared memory. The helpers fill the table with
+results that cut off the agent's own search, and the deepest iteration
+completed by any process is played.
+
+Run this file to measure the search depth reached with 0, 1, ... helpers:
+
+    python lazy_smp.py
+"""
+import multiprocessing
+import os
+import random
+import time
+
+from isolation import Board, BitBoard
+from game_agent import AlphaBetaPlayer, SearchTimeout, custom_score, order_first
+from sample_players import improved_score
+from transposition import SharedTranspositionTable
+
+# the opponent in the boards rebuilt by the helpers, which only need to
+# know which seat their own agent holds
+OPPONENT = "Opponent"
+
+
+def pack_root(game, player):
+    """Return a picklable description of the position `game` searched by
+    `player`.
+    """
+    board = BitBoard.from_board(game)
+    seat = 0 if board._player_1 == player else 1
+    return (board.width, board.height, board._blocked, tuple(board._locs),
+            board.move_count, seat)
+
+
+def unpack_root(state, player):
+    """Rebuild the position described by pack_root(), with `player` in the
+    seat of the searching agent.
+    """
+    width, height, blocked, locs, move_count, seat = state
+    players = [OPPONENT, OPPONENT]
+    players[seat] = player
+    game = BitBoard(players[0], players[1], width=width, height=height)
+    game._blocked = blocked
+    game._locs = list(locs)
+    game.move_count = move_count
+    game._active_player = players[move_count & 1]
+    game._inactive_player = players[(move_count & 1) ^ 1]
+    game._key = game._image_key(game._zobrist, game._blocked_cells(), game._locs)
+    return game
+
+
+def helper_loop(player, tt, conn, generation, result):
+    """Main loop of a helper process.
+
+    Each job received from `conn` is a tuple (job number, root state,
+    deadline, first depth). The helper deepens the root from the first
+    depth until the deadline or until the shared `generation` counter moves
+    past the job number, and after each completed iteration writes (job
+    number, depth, row, column) to the shared array `result`. The loop ends
+    when None is received.
+    """
+    random.seed()
+    player.tt = tt
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        number, state, deadline, first_depth = job
+        game = unpack_root(state, player)
+        player.reset_search()
+        player._tt_root = (game.hash(), game.active_player == player)
+        player.time_left = lambda: (1000 * (deadline - time.monotonic())
+                                    if generation.value == number else float("-inf"))
+        try:
+            for depth in range(first_depth, 101):
+                move = player.alphabeta(game, depth)
+                with result.get_lock():
+                    result[:] = [number, depth, move[0], move[1]]
+                if move == (-1, -1):
+                    break
+        except SearchTimeout:
+            pass
+
+
+class LazySMPPlayer(AlphaBetaPlayer):
+    """Alpha-beta agent that searches each move in parallel with helper
+    processes sharing its transposition table.
+
+    The helpers are started on the first call to get_move() and kept for
+    the rest of the game; call close() to stop them. Helper `i` starts its
+    iterative deepening at depth 1 + (i + 1) % 2, so half of the helpers
+    run one iteration ahead of the agent, and each helper orders moves
+    with its own random seed, killer moves and history scores.
+
+    After each call to get_move(), `depth_reached` holds the deepest
+    iteration completed by the agent or any helper, and `helper_depths`
+    the depth completed by each helper; search_stats() counts the nodes
+    and table probes of the agent's own process only.
+
+    The agent can ponder (see `isolation.Board.play`): after each move,
+    helper `i` searches the position after the opponent's `i`-th most
+    likely reply, the reply predicted by the principal variation first,
+    until the agent's next turn. If the opponent plays one of these
+    replies, the next search starts from the table filled by pondering
+    (counted in `ponder_hits`); otherwise the table is cleared. Pondering
+    uses one helper if `workers` is 0.
+
+    Parameters
+    ----------
+    workers : int (optional)
+        The number of helper processes; by default one per additional core.
+
+    The other parameters are those of `AlphaBetaPlayer`; `tt_size` is the
+    number of slots of the shared table.
+    """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10., tt_size=2**16,
+                 tt_replacement="depth", workers=None, **kwargs):
+        super().__init__(search_depth, score_fn, timeout, tt_size=0, **kwargs)
+        self.workers = max((os.cpu_count() or 1) - 1, 0) if workers is None else workers
+        self.tt_size = tt_size
+        self.tt_replacement = tt_replacement
+        self.helper_depths = []
+        self.ponder_hits = 0
+        self._pondered = set()
+        self._generation = None
+        self._helpers = None
+
+    def __getstate__(self):
+        # shared memory and processes stay with the process that created
+        # them; a copy of the agent starts its own
+        state = super().__getstate__()
+        state["tt"] = None
+        state["_generation"] = None
+        state["_helpers"] = None
+        return state
+
+    def start(self, workers=None):
+        """Create the shared transposition table and start the helpers,
+        `self.workers` of them by default.
+        """
+        self.tt = SharedTranspositionTable(self.tt_size, self.tt_replacement)
+        self._generation = multiprocessing.RawValue("i", 0)
+        self._helpers = []
+        for i in range(self.workers if workers is None else workers):
+            conn, child_conn = multiprocessing.Pipe()
+            result = multiprocessing.Array("i", 4)
+            helper = AlphaBetaPlayer(self.search_depth, self.score, self.TIMER_THRESHOLD,
+                                     tt_size=0, move_ordering=self.move_ordering,
+                                     tt_symmetry=self.tt_symmetry,
+                                     endgame_cells=self.endgame.max_cells if self.endgame else 0,
+                                     frontier_score_fn=self.frontier_score_fn,
+                                     search_mode=self.search_mode,
+                                     selective=self.selective)
+            process = multiprocessing.Process(
+                target=helper_loop, args=(helper, self.tt, child_conn, self._generation, result),
+                daemon=True)
+            process.start()
+            self._helpers.append((process, conn, result, 1 + (i + 1) % 2))
+
+    def close(self):
+        """Stop the helper processes. """
+        if self._helpers is None:
+            return
+        self._generation.value += 1
+        for process, conn, _, _ in self._helpers:
+            conn.send(None)
+            process.join()
+        self._helpers = None
+        self.tt = None
+
+    def get_move(self, game, time_left):
+        # stop pondering, on this agent's own time
+        if self._generation is not None:
+            self._generation.value += 1
+        return super().get_move(game, time_left)
+
+    def iterative_deepening(self, game, first_depth=1, depth_limit=100):
+        if self._helpers is None:
+            self.start()
+
+        # the shared table belongs to the root searched now, or to the
+        # pondered roots if one of them was reached; this agent clears it
+        # before the helpers start writing to it
+        board = BitBoard.from_board(game)
+        root = (board.hash(), board.active_player == self)
+        if root in self._pondered:
+            self.ponder_hits += 1
+        else:
+            self.tt.clear()
+        self._tt_root = root
+        self._pondered = set()
+
+        self._generation.value += 1
+        number = self._generation.value
+        state = pack_root(board, self)
+        deadline = time.monotonic() + self.time_left() / 1000.
+        for _, conn, _, first_depth in self._helpers:
+            conn.send((number, state, deadline, first_depth))
+
+        best_move = super().iterative_deepening(game, first_depth, depth_limit)
+
+        # stop the helpers and play the deepest completed iteration
+        self._generation.value += 1
+        self.helper_depths = []
+        for _, _, result, _ in self._helpers:
+            with result.get_lock():
+                result_number, depth, row, col = result[:]
+            depth = depth if result_number == number else 0
+            self.helper_depths.append(depth)
+            if depth > self.depth_reached:
+                self.depth_reached = depth
+                best_move = (row, col)
+        return best_move
+
+    def ponder(self, game):
+        """Start searching the opponent's likely replies in `game`, the
+        position after this agent's move, in the helpers.
+        """
+        if not self._helpers:
+            self.start(max(self.workers, 1))
+        board = BitBoard.from_board(game)
+        replies = board.get_legal_moves(shuffle=False)
+        if not replies or board.active_player == self:
+            return
+        order_first(replies, self.pv[1] if len(self.pv) > 1 else None)
+
+        self._generation.value += 1
+        number = self._generation.value
+        self._pondered = set()
+        for (_, conn, _, _), reply in zip(self._helpers, replies):
+            board.apply_move(reply)
+            self._pondered.add((board.hash(), True))
+            conn.send((number, pack_root(board, self), float("inf"), 1))
+            board.undo_move()
+
+    def stop_pondering(self):
+        """Stop searching the replies passed to ponder(). """
+        if self._generation is not None:
+            self._generation.value += 1
+        self._pondered = set()
+
+
+def main():
+    """Report the average depth reached by the agent on random positions
+    with an increasing number of helpers.
+    """
+    openings = []
+    rng = random.Random(0)
+    for _ in range(10):
+        game = Board("Player1", "Player2")
+        opening = []
+        for _ in range(4):
+            opening.append(rng.choice(game.get_legal_moves()))
+            game.apply_move(opening[-1])
+        openings.append(opening)
+
+    print("{:>8}{:>12}".format("Helpers", "Avg depth"))
+    for workers in range(os.cpu_count() or 1):
+        player = LazySMPPlayer(score_fn=improved_score, workers=workers)
+        depths = []
+        for opening in openings:
+            game = Board(player, "Opponent")
+            for move in opening:
+                game.apply_move(move)
+            deadline = time.monotonic() + 0.15
+            player.get_move(game, lambda: 1000 * (deadline - time.monotonic()))
+            depths.append(player.depth_reached)
+        player.close()
+        print("{:>8}{:>12.1f}".format(workers, sum(depths) / len(depths)))
+
+
+if __name__ == "__main__":
+    main()
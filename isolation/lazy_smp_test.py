@@ -0,0 +1,108 @@
+"""Unit tests for the parallel Lazy SMP agent and its shared table. """
+
+import multiprocessing
+import pickle
+import timeit
+import unittest
+
+from isolation import BitBoard
+from lazy_smp import LazySMPPlayer, pack_root, unpack_root
+from agent_test import random_position
+from sample_players import improved_score
+from transposition import EXACT, LOWER, SharedTranspositionTable
+
+
+def store_entry(tt):
+    tt.store(12345, 4, float("inf"), LOWER, (2, 5))
+
+
+class SharedTranspositionTableTest(unittest.TestCase):
+    """Unit tests for the shared memory transposition table"""
+
+    def test_shared(self):
+        tt = SharedTranspositionTable(size=64)
+        process = multiprocessing.Process(target=store_entry, args=(tt,))
+        process.start()
+        process.join()
+        self.assertEqual(tuple(tt.probe(12345)), (12345, 4, float("inf"), LOWER, (2, 5)))
+        self.assertIsNone(tt.probe(12345 + 64))
+
+        # a process started with the spawn method rebuilds its views of the
+        # shared arrays
+        tt.clear()
+        process = multiprocessing.get_context("spawn").Process(target=store_entry, args=(tt,))
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(tuple(tt.probe(12345)), (12345, 4, float("inf"), LOWER, (2, 5)))
+
+        # the empty board hashes to 0, which must not match an empty slot
+        self.assertIsNone(tt.probe(0))
+        tt.store(0, 1, -2.5, EXACT, None)
+        self.assertEqual(tuple(tt.probe(0)), (0, 1, -2.5, EXACT, None))
+        tt.clear()
+        self.assertIsNone(tt.probe(12345))
+
+    def test_torn_slot(self):
+        tt = SharedTranspositionTable(size=64)
+        tt.store(70, 3, 1., EXACT, (0, 1))
+        tt._scores[70 % 64] = 2.
+        self.assertIsNone(tt.probe(70))
+
+
+class LazySMPPlayerTest(unittest.TestCase):
+    """Unit tests for the Lazy SMP agent"""
+
+    def test_pack_root(self):
+        player = LazySMPPlayer(workers=0)
+        for seat in range(2):
+            players = [player, "Opponent"] if seat == 0 else ["Opponent", player]
+            game = random_position(players[0], players[1], 5, seat)
+            copy = unpack_root(pack_root(game, player), player)
+            self.assertEqual(copy.to_string(), game.to_string())
+            self.assertEqual(copy.hash(), game.hash())
+            self.assertEqual(copy.active_player == player, game.active_player == player)
+
+    def test_get_move(self):
+        player = LazySMPPlayer(score_fn=improved_score, workers=2)
+        try:
+            game = random_position(player, "Opponent", 4, 0)
+            for _ in range(2):
+                deadline = timeit.default_timer() + 0.1
+                move = player.get_move(game, lambda: 1000 * (deadline - timeit.default_timer()))
+                self.assertGreater(1000 * (deadline - timeit.default_timer()), 0)
+                self.assertIn(move, game.get_legal_moves())
+                self.assertEqual(len(player.helper_depths), 2)
+                self.assertGreater(max(player.helper_depths), 0)
+                self.assertGreaterEqual(player.depth_reached, max(player.helper_depths))
+
+            copy = pickle.loads(pickle.dumps(player))
+            self.assertIsNone(copy._helpers)
+            self.assertIsNone(copy.tt)
+        finally:
+            player.close()
+        self.assertIsNone(player._helpers)
+
+    def test_ponder(self):
+        class FirstMovePlayer:
+            def get_move(self, game, time_left):
+                moves = game.get_legal_moves(shuffle=False)
+                return moves[0] if moves else (-1, -1)
+
+        # the opponent's reply is always one of the two replies pondered:
+        # the predicted one and the first legal move; the timeout margin is
+        # wide for machines where the helpers share a core with the agent
+        player = LazySMPPlayer(score_fn=improved_score, workers=2, endgame_cells=0, timeout=50.)
+        opponent = FirstMovePlayer()
+        game = BitBoard(player, opponent)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        winner, history, termination = game.play(ponder=True)
+        self.assertNotIn(termination, ("timeout", "forfeit"))
+        self.assertGreaterEqual(player.ponder_hits, len(history) // 2 - 1)
+        self.assertEqual(player._pondered, set())
+        player.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
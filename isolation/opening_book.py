@@ -0,0 +1,167 @@
+"""Build and query an opening book: the best reply found by a deep
+alpha-beta search for every early position of the game, with positions
+that are rotations or reflections of each other stored once.
+
+Run this file to (re)build the book shipped next to it:
+
+    python opening_book.py
+"""
+import os
+import struct
+import timeit
+
+from isolation import Board, BitBoard
+from isolation.tables import symmetry_tables
+from sample_players import improved_score
+from game_agent import AlphaBetaPlayer
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+BOOK_PLIES = 4  # positions with fewer moves played than this are in the book
+BOOK_DEPTH = 10  # search depth once both players are on the board
+PLACEMENT_DEPTH = 5  # search depth while a player still has to be placed
+
+# file layout: a header, then one (key, cell index) record per position
+# sorted by key
+HEADER = struct.Struct("<8sBBI")
+RECORD = struct.Struct("<QB")
+MAGIC = b"ISOBOOK1"
+
+
+class OpeningBook:
+    """Map from the canonical form of a position (see
+    `isolation.Board.canonical_key`) to the best move found there. Moves
+    are stored as cell indices in the frame of the canonical form and
+    mapped back to the frame of the queried board on lookup.
+
+    Parameters
+    ----------
+    width : int (optional)
+        The number of columns of the boards in the book.
+
+    height : int (optional)
+        The number of rows of the boards in the book.
+    """
+    def __init__(self, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.moves = {}
+
+    def __len__(self):
+        return len(self.moves)
+
+    def add(self, board, move):
+        """Record `move` as the best move of the active player in `board`. """
+        key, sym = board.canonical_key()
+        perm = symmetry_tables(self.width, self.height).forward[sym]
+        self.moves[key] = perm[move[0] + move[1] * self.height]
+
+    def lookup(self, board):
+        """Return the book move of the active player in `board`, or None if
+        the position is not in the book.
+        """
+        if (board.width, board.height) != (self.width, self.height):
+            return None
+        key, sym = board.canonical_key()
+        idx = self.moves.get(key)
+        if idx is None:
+            return None
+        idx = symmetry_tables(self.width, self.height).inverse[sym][idx]
+        return (idx % self.height, idx // self.height)
+
+    def save(self, path):
+        """Write the book to a binary file. """
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.width, self.height, len(self.moves)))
+            for key in sorted(self.moves):
+                f.write(RECORD.pack(key, self.moves[key]))
+
+    @classmethod
+    def load(cls, path):
+        """Read a book written by `save`. """
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, width, height, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not an opening book file: {}".format(path))
+        book = cls(width, height)
+        book.moves = dict(RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * RECORD.size]))
+        return book
+
+
+def opening_positions(plies, width=7, height=7):
+    """Return the move sequence leading to one position of each class of
+    symmetric positions that can be reached in fewer than `plies` moves and
+    where the player to move has a legal move, in order of move count.
+    """
+    positions = []
+    frontier = [()]
+    for _ in range(plies):
+        positions.extend(frontier)
+        seen = set()
+        next_frontier = []
+        for moves in frontier:
+            board = BitBoard("Player1", "Player2", width=width, height=height)
+            for move in moves:
+                board.apply_move(move)
+            for move in board.get_legal_moves(shuffle=False):
+                board.apply_move(move)
+                key, _ = board.canonical_key()
+                if key not in seen and board.get_legal_moves(shuffle=False):
+                    seen.add(key)
+                    next_frontier.append(moves + (move,))
+                board.undo_move()
+        frontier = next_frontier
+    return positions
+
+
+def build_book(plies=BOOK_PLIES, depth=BOOK_DEPTH, placement_depth=PLACEMENT_DEPTH,
+               score_fn=improved_score, width=7, height=7, verbose=False):
+    """Search every opening position with iterative deepening alpha-beta to
+    a fixed depth and return an `OpeningBook` of the best moves.
+
+    Parameters
+    ----------
+    plies : int (optional)
+        Positions with fewer moves played than `plies` are searched.
+
+    depth : int (optional)
+        The search depth of positions where both players are placed.
+
+    placement_depth : int (optional)
+        The search depth of positions where a player has not moved yet,
+        which have a move for every blank cell.
+
+    score_fn : callable (optional)
+        The heuristic used at the search horizon.
+    """
+    book = OpeningBook(width, height)
+    positions = opening_positions(plies, width, height)
+    start = timeit.default_timer()
+    for num, moves in enumerate(positions):
+        # a new pair of players per position, so no search state is shared
+        players = [AlphaBetaPlayer(score_fn=score_fn), AlphaBetaPlayer(score_fn=score_fn)]
+        game = BitBoard(players[0], players[1], width=width, height=height)
+        for move in moves:
+            game.apply_move(move)
+        player = game.active_player
+        player.time_left = lambda: float("inf")
+        max_depth = placement_depth if Board.NOT_MOVED in game._locs else depth
+        for d in range(1, max_depth + 1):
+            move = player.alphabeta(game, d)
+        book.add(game, move)
+        if verbose:
+            print("{:>5}/{} positions, {:.0f}s".format(
+                num + 1, len(positions), timeit.default_timer() - start), end="\r", flush=True)
+    if verbose:
+        print()
+    return book
+
+
+def main():
+    book = build_book(verbose=True)
+    book.save(BOOK_FILE)
+    print("Wrote {} positions to {}".format(len(book), BOOK_FILE))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Unit tests for building and querying the opening book. """
+
+import os
+import tempfile
+import unittest
+
+from isolation import Board
+from isolation.tables import symmetry_tables
+from game_agent import AlphaBetaPlayer
+from opening_book import OpeningBook, build_book, opening_positions
+
+
+def symmetric_games(moves, width=7, height=7):
+    """Return one board for each symmetric image of the game `moves`. """
+    games = []
+    for perm in symmetry_tables(width, height).forward:
+        game = Board("Player1", "Player2", width=width, height=height)
+        for r, c in moves:
+            idx = perm[r + c * height]
+            game.apply_move((idx % height, idx // height))
+        games.append(game)
+    return games
+
+
+class OpeningBookTest(unittest.TestCase):
+    """Unit tests for the opening book"""
+
+    def test_opening_positions(self):
+        positions = opening_positions(3)
+        self.assertEqual([len(moves) for moves in positions[:2]], [0, 1])
+        # the center, 3 cells on the diagonals, 3 on the axes and 3 others
+        self.assertEqual(sum(len(moves) == 1 for moves in positions), 10)
+
+    def test_lookup(self):
+        book = build_book(plies=3, depth=2, placement_depth=1, width=5, height=5)
+        self.assertEqual(len(book), len(opening_positions(3, 5, 5)))
+
+        path = os.path.join(tempfile.mkdtemp(), "book.bin")
+        book.save(path)
+        loaded = OpeningBook.load(path)
+        self.assertEqual((loaded.width, loaded.height, loaded.moves),
+                         (book.width, book.height, book.moves))
+
+        for moves in opening_positions(3, 5, 5):
+            games = symmetric_games(moves, 5, 5)
+            book_moves = [loaded.lookup(game) for game in games]
+            for game, move in zip(games, book_moves):
+                self.assertIn(move, game.get_legal_moves())
+            # every image answers with an image of the same move
+            reply_key = games[0].forecast_move(book_moves[0]).canonical_key()
+            for game, move in zip(games, book_moves):
+                self.assertEqual(game.forecast_move(move).canonical_key()[0], reply_key[0])
+
+        game = Board("Player1", "Player2", width=5, height=5)
+        for move in [(0, 0), (4, 4), (1, 2), (3, 2)]:
+            game.apply_move(move)
+        self.assertIsNone(loaded.lookup(game))
+        self.assertIsNone(loaded.lookup(Board("Player1", "Player2")))
+
+    def test_agent_plays_book_move(self):
+        class FixedBook:
+            def lookup(self, game):
+                return (3, 3)
+
+        player = AlphaBetaPlayer(book=FixedBook())
+        game = Board(player, "Opponent")
+        self.assertEqual(player.get_move(game, lambda: 1000.), (3, 3))
+        self.assertEqual(player.node_counts, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
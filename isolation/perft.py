@@ -0,0 +1,147 @@
+"""Perft: count the positions reached from fixed positions by every
+sequence of legal moves of a given length, to check and time the move
+generation of the board engines (`get_legal_moves`, `apply_move`,
+`forecast_move`) against each other and against stored reference counts
+and timings.
+
+Run this file to check the counts of every engine and compare their speed
+with the reference timings shipped next to it:
+
+    python perft.py [--update]
+
+`--update` stores the measured timings as the new reference.
+"""
+import json
+import os
+import sys
+import timeit
+
+from isolation import Board, BitBoard
+
+REFERENCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perft_reference.json")
+
+# the board engines compared, by name
+ENGINES = {
+    "Board": Board,
+    "BitBoard": BitBoard,
+}
+
+# the moves leading to each fixed position, and the deepest perft
+# measured from it
+POSITIONS = {
+    "start": ([], 5),
+    "opening": ([(4, 6), (4, 0), (3, 4), (5, 2), (4, 2), (6, 4)], 9),
+    "middlegame": ([(2, 5), (3, 5), (4, 4), (1, 6), (5, 6), (2, 4), (6, 4), (4, 5), (5, 2),
+                    (6, 6), (6, 0), (5, 4), (4, 1), (6, 2)], 11),
+    "endgame": ([(3, 0), (5, 1), (1, 1), (4, 3), (0, 3), (6, 2), (2, 2), (5, 0), (1, 0),
+                 (3, 1), (0, 2), (2, 3), (1, 4), (1, 5), (3, 5), (3, 6), (5, 4), (2, 4),
+                 (4, 6), (0, 5), (6, 5), (2, 6), (4, 4), (4, 5)], 14),
+}
+
+# alarm threshold: a timing below this fraction of the reference is a
+# regression
+SLOWDOWN = 0.7
+
+
+def position(engine, name):
+    """Return the fixed position `name` on a board of class `engine`. """
+    game = engine("Player1", "Player2")
+    for move in POSITIONS[name][0]:
+        game.apply_move(move)
+    return game
+
+
+def perft(game, depth):
+    """Return the number of positions reached from `game` by sequences of
+    exactly `depth` legal moves, creating the children with forecast_move().
+    """
+    moves = game.get_legal_moves(shuffle=False)
+    if depth == 1:
+        return len(moves)
+    return sum(perft(game.forecast_move(move), depth - 1) for move in moves)
+
+
+def perft_in_place(game, depth):
+    """perft() with apply_move()/undo_move() on `game` instead of copies,
+    for engines that support undo_move().
+    """
+    moves = game.get_legal_moves(shuffle=False)
+    if depth == 1:
+        return len(moves)
+    count = 0
+    for move in moves:
+        game.apply_move(move)
+        count += perft_in_place(game, depth - 1)
+        game.undo_move()
+    return count
+
+
+def methods(engine):
+    """Return the perft functions supported by the board class `engine`,
+    by name.
+    """
+    result = {"forecast": perft}
+    if hasattr(engine, "undo_move"):
+        result["in-place"] = perft_in_place
+    return result
+
+
+def measure(engine, name, method=perft, depth=None):
+    """Run `method` from position `name` on `engine` at `depth` (by default
+    the deepest perft of the position).
+
+    Returns
+    -------
+    (int, float)
+        The number of positions counted, and positions per second.
+    """
+    depth = POSITIONS[name][1] if depth is None else depth
+    game = position(engine, name)
+    start = timeit.default_timer()
+    count = method(game, depth)
+    return count, count / (timeit.default_timer() - start)
+
+
+def load_reference(path=REFERENCE_FILE):
+    """Return the reference counts and timings stored in `path`. The
+    counts of position `name` to depths 1, 2, ... are in
+    `reference["counts"][name]`, and the positions per second of each
+    engine and method in `reference["timings"][engine][method][name]`.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    update = "--update" in sys.argv[1:]
+    reference = load_reference()
+    timings = {}
+    failed = False
+
+    print("{:<10}{:<10}{:<12}{:>6}{:>12}{:>12}{:>10}".format(
+        "Engine", "Method", "Position", "Depth", "Count", "Pos/s", "vs ref"))
+    for engine_name, engine in ENGINES.items():
+        for method_name, method in methods(engine).items():
+            for name, (_, depth) in POSITIONS.items():
+                count, speed = measure(engine, name, method)
+                timings.setdefault(engine_name, {}).setdefault(method_name, {})[name] = round(speed)
+                ref_speed = reference["timings"].get(engine_name, {}).get(method_name, {}).get(name)
+                ratio = "" if ref_speed is None else "{:.2f}".format(speed / ref_speed)
+                status = ""
+                if count != reference["counts"][name][depth - 1]:
+                    status, failed = "  WRONG COUNT", True
+                elif ref_speed is not None and speed < SLOWDOWN * ref_speed:
+                    status = "  SLOWER"
+                print("{:<10}{:<10}{:<12}{:>6}{:>12}{:>12.0f}{:>10}{}".format(
+                    engine_name, method_name, name, depth, count, speed, ratio, status))
+
+    if update and not failed:
+        reference["timings"] = timings
+        with open(REFERENCE_FILE, "w") as f:
+            json.dump(reference, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""Unit tests for the perft move-generation counts of the board engines. """
+
+import unittest
+
+from perft import ENGINES, POSITIONS, load_reference, measure, methods
+
+
+class PerftTest(unittest.TestCase):
+    """Unit tests for the perft counts"""
+
+    def test_reference_counts(self):
+        counts = load_reference()["counts"]
+        for engine_name, engine in ENGINES.items():
+            for method_name, method in methods(engine).items():
+                for name in POSITIONS:
+                    # the shallow counts; perft.py checks the deepest ones
+                    for depth in range(1, min(4, len(counts[name])) + 1):
+                        count, _ = measure(engine, name, method, depth)
+                        self.assertEqual(count, counts[name][depth - 1],
+                                         (engine_name, method_name, name, depth))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+"""This file contains an out-of-process agent runner: `RemotePlayer` wraps an
+agent that searches in its own long-lived worker process, so that the
+referee's clock is enforced on it exactly. The worker keeps the agent, and
+whatever it caches between moves, for the whole game, and receives each
+position over a pipe. At the deadline the runner stops waiting and plays
+the best move the agent has published so far, instead of losing the game
+on time to a garbage collection pause or a slow heuristic call.
+
+Run this file to compare the timeouts of an agent whose heuristic stalls
+now and then, played in the referee's process and in a worker:
+
+    python remote_agent.py
+"""
+import multiprocessing
+import random
+import time
+
+from isolation import Board
+from game_agent import AlphaBetaPlayer
+from lazy_smp import pack_root, unpack_root
+from sample_players import RandomPlayer, improved_score
+
+
+def worker_loop(player, conn, generation, result):
+    """Main loop of a worker process.
+
+    Each job received from `conn` is a tuple (job number, root state,
+    deadline). The worker asks `player` for a move with a clock running
+    out at the deadline, or as soon as the shared `generation` counter
+    moves past the job number, and replies with (job number, move, search
+    stats). If the player has a `progress` attribute, the best move of each
+    completed iteration is written to the shared array `result` as (job
+    number, row, column) while it searches. The loop ends when None is
+    received.
+    """
+    random.seed()
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        number, state, deadline = job
+
+        def publish(move, number=number):
+            with result.get_lock():
+                result[:] = [number, move[0], move[1]]
+
+        if hasattr(player, "progress"):
+            player.progress = publish
+        game = unpack_root(state, player)
+        move = player.get_move(game, lambda: (1000 * (deadline - time.monotonic())
+                                              if generation.value == number else float("-inf")))
+        stats = player.search_stats() if hasattr(player, "search_stats") else None
+        conn.send((number, move, stats))
+
+
+class RemotePlayer:
+    """Agent that runs another agent in a worker process and enforces the
+    time limit of each move on it.
+
+    The worker is started on the first call to get_move(), or by start(),
+    and kept until close(). get_move() sends the position to the worker and
+    waits for its move until `margin` milliseconds before the time limit.
+    If the move is late, the search is stopped and counted in
+    `preemptions`, and the runner plays the last move published through
+    the agent's `progress` callback (see `game_agent.AlphaBetaPlayer`) for
+    this position, or a random legal move if there is none; so it does if
+    the agent returns an illegal move, e.g. (-1, -1) after running out of
+    time on its own.
+
+    A worker that is still busy with the previous move when the next one is
+    requested, `restart_grace` milliseconds after being told to stop, is
+    stuck in a call that never checks the clock: it is terminated and a new
+    worker is started with a fresh copy of the agent, counted in
+    `restarts`.
+
+    Parameters
+    ----------
+    player : object
+        The agent run by the worker, e.g. an `AlphaBetaPlayer`.
+
+    margin : float (optional)
+        The milliseconds left in the turn when the runner stops waiting,
+        for the time it takes to return the move.
+
+    restart_grace : float (optional)
+        The milliseconds a preempted worker is given to stop searching.
+    """
+    def __init__(self, player, margin=10., restart_grace=5.):
+        self.player = player
+        self.margin = margin
+        self.restart_grace = restart_grace
+        self.preemptions = 0
+        self.restarts = 0
+        self._stats = None
+        self._pending = None
+        self._worker = None
+
+    def __getstate__(self):
+        # the worker stays with the process that started it; a copy of the
+        # runner starts its own
+        state = self.__dict__.copy()
+        state["_pending"] = None
+        state["_worker"] = None
+        return state
+
+    def start(self):
+        """Start the worker process. """
+        conn, child_conn = multiprocessing.Pipe()
+        generation = multiprocessing.RawValue("i", 0)
+        result = multiprocessing.Array("i", 3)
+        process = multiprocessing.Process(
+            target=worker_loop, args=(self.player, child_conn, generation, result), daemon=True)
+        process.start()
+        self._worker = (process, conn, generation, result)
+        self._pending = None
+
+    def close(self):
+        """Stop the worker process, terminating it if it is busy. """
+        if self._worker is None:
+            return
+        process, conn, generation, _ = self._worker
+        generation.value += 1
+        if self._pending is None or self._receive(self._pending, self.restart_grace):
+            conn.send(None)
+            process.join()
+        else:
+            process.terminate()
+            process.join()
+        self._worker = None
+        self._pending = None
+
+    def _receive(self, number, timeout):
+        """Wait up to `timeout` milliseconds for the reply to job `number`,
+        discarding the late replies to earlier jobs, and return it or None.
+        """
+        conn = self._worker[1]
+        deadline = time.monotonic() + timeout / 1000.
+        while True:
+            remaining = deadline - time.monotonic()
+            if not conn.poll(max(remaining, 0.)):
+                return None
+            reply = conn.recv()
+            if reply[0] == number:
+                self._pending = None
+                return reply
+
+    def get_move(self, game, time_left):
+        """Return the move of the agent in the worker, or its best move so
+        far if it is not done `margin` milliseconds before the time limit.
+        """
+        deadline = time.monotonic() + (time_left() - self.margin) / 1000.
+        if self._worker is None:
+            self.start()
+        elif self._pending is not None and self._receive(self._pending, self.restart_grace) is None:
+            # the stuck worker is reaped by multiprocessing once it exits,
+            # so only the time to start a new one counts against this move
+            self.restarts += 1
+            self._worker[0].terminate()
+            self.start()
+        _, conn, generation, result = self._worker
+
+        number = generation.value + 1
+        generation.value = number
+        conn.send((number, pack_root(game, self), deadline))
+        self._pending = number
+        reply = self._receive(number, 1000 * (deadline - time.monotonic()))
+        moves = game.get_legal_moves()
+        if reply is not None:
+            self._stats = reply[2]
+            if reply[1] in moves or not moves:
+                return reply[1]
+        else:
+            # stop the search
+            generation.value += 1
+            self.preemptions += 1
+            self._stats = None
+
+        # play the best move published so far
+        with result.get_lock():
+            result_number, row, col = result[:]
+        if result_number == number and (row, col) in moves:
+            return (row, col)
+        return random.choice(moves) if moves else (-1, -1)
+
+    def search_stats(self):
+        """Return the search statistics the agent reported for the last move
+        (see `isolation.Board.play`), or None if it was preempted or does
+        not report them.
+        """
+        return self._stats
+
+
+def stalling_score(game, player):
+    """`improved_score` that stalls for 30 ms on about one call in 20000,
+    like a garbage collection pause.
+    """
+    if random.random() < 5e-5:
+        time.sleep(0.03)
+    return improved_score(game, player)
+
+
+def main():
+    """Play an agent with a stalling heuristic against a random agent, in
+    the referee's process and in a worker, and report the timeouts.
+    """
+    num_games = 20
+    print("{:<12}{:>8}{:>10}{:>13}".format("Agent", "Wins", "Timeouts", "Preemptions"))
+    for name in ("in-process", "remote"):
+        wins = timeouts = 0
+        player = AlphaBetaPlayer(score_fn=stalling_score)
+        if name == "remote":
+            player = RemotePlayer(player)
+        for _ in range(num_games):
+            game = Board(player, RandomPlayer())
+            winner, _, termination = game.play()
+            wins += winner == player
+            timeouts += termination == "timeout" and winner != player
+        print("{:<12}{:>8}{:>10}{:>13}".format(name, wins, timeouts,
+                                                getattr(player, "preemptions", "-")))
+        if name == "remote":
+            player.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Unit tests for the out-of-process agent runner. """
+
+import time
+import unittest
+
+from isolation import Board
+from game_agent import AlphaBetaPlayer
+from remote_agent import RemotePlayer
+from sample_players import RandomPlayer, improved_score
+
+
+class CountingPlayer:
+    """Agent playing its first legal move, which reports the number of
+    moves it has made as its node count.
+    """
+
+    def __init__(self):
+        self.moves = 0
+
+    def get_move(self, game, time_left):
+        self.moves += 1
+        moves = game.get_legal_moves(shuffle=False)
+        return moves[0] if moves else (-1, -1)
+
+    def search_stats(self):
+        return (0, self.moves, None)
+
+
+def slow_score(game, player):
+    """`improved_score` that takes 20 ms per call. """
+    time.sleep(0.02)
+    return improved_score(game, player)
+
+
+def stuck_score(game, player):
+    """A heuristic that never returns within a move. """
+    time.sleep(0.5)
+    return improved_score(game, player)
+
+
+class RemotePlayerTest(unittest.TestCase):
+    """Unit tests for agents searching in worker processes"""
+
+    def play(self, player, time_limit=50):
+        game = Board(player, RandomPlayer())
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        try:
+            return game.play(time_limit=time_limit)
+        finally:
+            player.close()
+
+    def test_persistent_worker(self):
+        # one agent in one worker plays every move of the game, and reports
+        # its search
+        player = RemotePlayer(CountingPlayer())
+        game = Board(player, RandomPlayer())
+        telemetry = []
+        try:
+            game.play(time_limit=50, telemetry=telemetry)
+            process = player._worker[0]
+            self.assertTrue(process.is_alive())
+        finally:
+            player.close()
+        self.assertFalse(process.is_alive())
+        self.assertEqual((player.restarts, player.preemptions), (0, 0))
+        searched = [record for record in telemetry if record.player is player]
+        self.assertEqual([record.nodes for record in searched],
+                         list(range(1, len(searched) + 1)))
+        # the agent plays in the worker, not in the referee process
+        self.assertEqual(player.player.moves, 0)
+
+    def test_preemption(self):
+        # a search too slow for the time limit is stopped at the deadline
+        # and plays its best move so far instead of losing on time
+        player = RemotePlayer(AlphaBetaPlayer(score_fn=slow_score, timeout=1.))
+        winner, history, termination = self.play(player)
+        self.assertNotEqual(termination, "timeout")
+        self.assertNotEqual(termination, "forfeit")
+        self.assertGreater(player.preemptions, 0)
+
+    def test_restart(self):
+        # a worker stuck in a heuristic call is replaced by a new one
+        player = RemotePlayer(AlphaBetaPlayer(score_fn=stuck_score))
+        winner, history, termination = self.play(player)
+        self.assertNotIn(termination, ("timeout", "forfeit"))
+        self.assertGreater(player.restarts, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""This file contains a vectorized simulator that plays a whole batch of
+random games in lockstep: every game of the batch plays its next uniformly
+random move in the same few NumPy operations, until all of them are over.
+It plays the same games as `isolation.BitBoard.playout` (and as two
+`sample_players.RandomPlayer` agents), without the Python overhead of
+playing one move at a time.
+
+Games are stored like the batches of `batch_eval`, so boards of up to 64
+cells are supported.
+
+Run this file to compare its speed with single-game playouts:
+
+    python simulator.py
+"""
+import random
+import timeit
+
+from collections import namedtuple
+
+import numpy as np
+
+from isolation import Board, BitBoard
+from batch_eval import batch_tables
+
+# the winning seat (0 for player 1, 1 for player 2) and the number of
+# moves played in each simulated game
+SimulationResult = namedtuple("SimulationResult", ["winners", "plies"])
+
+ONE = np.uint64(1)
+
+
+def _choose(candidates, is_open, counts, rng):
+    """Return a uniformly random open candidate cell of each row. """
+    picks = (rng.random_sample(len(counts)) * counts).astype(np.int64)
+    columns = np.argmax(np.cumsum(is_open, axis=1) > picks[:, None], axis=1)
+    return candidates[np.arange(len(counts)), columns]
+
+
+def simulate_boards(boards, rng=None):
+    """Play each board of a list of boards of the same size out with
+    uniformly random moves for both players, all games in lockstep.
+
+    Parameters
+    ----------
+    boards : list
+        The positions to play out, as `isolation.Board` objects or any
+        other board accepted by `isolation.BitBoard.from_board`; they are
+        not modified.
+
+    rng : numpy.random.RandomState (optional)
+        The random number generator of the moves; a new one by default.
+
+    Returns
+    -------
+    SimulationResult
+        Arrays of the winning seat and of the number of moves played after
+        the given position, for each board.
+    """
+    boards = [board if isinstance(board, BitBoard) else BitBoard.from_board(board)
+              for board in boards]
+    size = boards[0].width * boards[0].height
+    blocked = np.array([board._blocked for board in boards], dtype=np.uint64)
+    locs = np.array([[size if loc is Board.NOT_MOVED else loc for loc in board._locs]
+                     for board in boards], dtype=np.int64).reshape(len(boards), 2)
+    slots = np.array([board.move_count & 1 for board in boards], dtype=np.int64)
+    return _simulate(boards[0].width, boards[0].height, blocked, locs, slots, rng)
+
+
+def simulate(game, num_games, rng=None):
+    """Play `num_games` random games out from the position `game` in
+    lockstep (see simulate_boards()).
+    """
+    board = game if isinstance(game, BitBoard) else BitBoard.from_board(game)
+    size = board.width * board.height
+    blocked = np.full(num_games, board._blocked, dtype=np.uint64)
+    locs = np.empty((num_games, 2), dtype=np.int64)
+    locs[:] = [size if loc is Board.NOT_MOVED else loc for loc in board._locs]
+    slots = np.full(num_games, board.move_count & 1, dtype=np.int64)
+    return _simulate(board.width, board.height, blocked, locs, slots, rng)
+
+
+def _simulate(width, height, blocked, locs, slots, rng):
+    """Play out the games given by the arrays of their blocked cells, of
+    the cells of both players (`width * height` for a player who has not
+    moved yet) and of the seat of the active player.
+    """
+    rng = np.random.RandomState() if rng is None else rng
+    size = width * height
+    tables = batch_tables(width, height)
+    cells = np.arange(size, dtype=np.uint64)
+
+    # the arrays only hold the games still being played, indexed by `ids`
+    ids = np.arange(len(slots))
+    winners = np.empty(len(slots), dtype=np.int64)
+    plies = np.empty(len(slots), dtype=np.int64)
+    ply = 0
+    while len(ids):
+        rows = np.arange(len(ids))
+        current = locs[rows, slots]
+        candidates = tables.neighbors[current]
+        is_open = (((blocked[:, None] >> candidates.astype(np.uint64)) & ONE) == 0)
+        is_open &= candidates != size
+        counts = is_open.sum(axis=1)
+        moves = _choose(candidates, is_open, np.maximum(counts, 1), rng)
+
+        # a player who has not moved yet can move to any blank cell
+        unplaced = np.flatnonzero(current == size)
+        if len(unplaced):
+            blank = ((blocked[unplaced, None] >> cells) & ONE) == 0
+            counts[unplaced] = blank.sum(axis=1)
+            candidates = np.broadcast_to(np.arange(size), blank.shape)
+            moves[unplaced] = _choose(candidates, blank, np.maximum(counts[unplaced], 1), rng)
+
+        # the games where the active player is stuck are lost by that player
+        done = counts == 0
+        if done.any():
+            winners[ids[done]] = slots[done] ^ 1
+            plies[ids[done]] = ply
+            keep = ~done
+            ids, blocked, locs = ids[keep], blocked[keep], locs[keep]
+            slots, moves, rows = slots[keep], moves[keep], rows[:len(ids)]
+
+        blocked |= ONE << moves.astype(np.uint64)
+        locs[rows, slots] = moves
+        slots ^= 1
+        ply += 1
+    return SimulationResult(winners, plies)
+
+
+def main():
+    """Report the random moves per second played by simulate() and by
+    single-game playouts from the empty board.
+    """
+    game = BitBoard("Player1", "Player2")
+
+    print("{:<24}{:>10}{:>14}".format("Simulator", "Games", "Moves/s"))
+    for num_games in (100, 1000, 10000, 100000):
+        start = timeit.default_timer()
+        result = simulate(game, num_games)
+        elapsed = timeit.default_timer() - start
+        print("{:<24}{:>10}{:>14.0f}".format("simulate", num_games, result.plies.sum() / elapsed))
+
+    num_games = 2000
+    start = timeit.default_timer()
+    moves = sum(game.playout(random.random)[1] for _ in range(num_games))
+    elapsed = timeit.default_timer() - start
+    print("{:<24}{:>10}{:>14.0f}".format("BitBoard.playout", num_games, moves / elapsed))
+
+
+if __name__ == "__main__":
+    main()
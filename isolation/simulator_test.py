@@ -0,0 +1,53 @@
+"""Unit tests for the lockstep random game simulator. """
+
+import random
+import unittest
+
+import numpy as np
+
+from isolation import BitBoard
+from batch_eval_test import random_boards
+from simulator import simulate, simulate_boards
+
+
+class SimulatorTest(unittest.TestCase):
+    """Unit tests for the lockstep simulator"""
+
+    def test_finished_games(self):
+        # games with no legal move left are lost at once by the active player
+        boards = [board for board in random_boards(200) if not board.get_legal_moves()]
+        result = simulate_boards(boards, np.random.RandomState(0))
+        self.assertEqual(result.plies.tolist(), [0] * len(boards))
+        self.assertEqual(result.winners.tolist(), [(board.move_count & 1) ^ 1 for board in boards])
+
+    def test_forced_line(self):
+        # every cell is blocked but (1, 2): player 1 moves there from (0, 0),
+        # then player 2 is stuck at (6, 6)
+        game = BitBoard("Player1", "Player2")
+        game.apply_move((0, 0))
+        game.apply_move((6, 6))
+        game._blocked = (1 << 49) - 1 - (1 << (1 + 2 * 7))
+        self.assertEqual(game.get_legal_moves(), [(1, 2)])
+        result = simulate(game, 10, np.random.RandomState(0))
+        self.assertEqual(result.plies.tolist(), [1] * 10)
+        self.assertEqual(result.winners.tolist(), [0] * 10)
+
+    def test_statistics(self):
+        # the win rate and mean length of the simulated games match those of
+        # single-game playouts, including the two placement moves
+        num_games = 10000
+        for num_moves in (0, 2, 8):
+            rng = random.Random(num_moves)
+            game = BitBoard("Player1", "Player2")
+            for _ in range(num_moves):
+                game.apply_move(rng.choice(game.get_legal_moves(shuffle=False)))
+            result = simulate(game, num_games, np.random.RandomState(num_moves))
+            playouts = [game.playout(rng.random) for _ in range(num_games)]
+            wins = sum(winner == "Player2" for winner, _ in playouts) / num_games
+            plies = sum(p for _, p in playouts) / num_games
+            self.assertAlmostEqual(result.winners.mean(), wins, delta=0.03)
+            self.assertAlmostEqual(result.plies.mean(), plies, delta=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
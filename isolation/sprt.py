@@ -0,0 +1,84 @@
+"""Statistics of match results: the sequential probability ratio test
+(SPRT) used to stop a strength comparison as soon as its result is
+decided, and confidence intervals on win rates.
+
+Isolation games cannot be drawn, so results are a sequence of wins and
+losses with a fixed win probability, from which the Elo difference
+between two agents follows by the logistic model of the Elo system.
+"""
+import math
+
+
+def elo_to_score(elo):
+    """Return the expected score of an agent `elo` points stronger than its
+    opponent.
+    """
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+
+def score_to_elo(score):
+    """Return the Elo difference of an agent with the expected score
+    `score` against its opponent (+/-inf for a score of 1 or 0).
+    """
+    if score <= 0.:
+        return float("-inf")
+    if score >= 1.:
+        return float("inf")
+    return -400. * math.log10(1. / score - 1.)
+
+
+def wilson_interval(wins, games, z=1.96):
+    """Return the Wilson score interval (low, high) of the win probability
+    after `wins` wins in `games` games; by default the 95% interval.
+    """
+    if not games:
+        return 0., 1.
+    p = wins / games
+    center = (p + z * z / (2 * games)) / (1 + z * z / games)
+    half = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return max(0., center - half), min(1., center + half)
+
+
+class SPRT:
+    """Sequential probability ratio test of the hypotheses H0: the agent is
+    `elo0` Elo stronger than its opponent, against H1: it is `elo1` Elo
+    stronger, with `elo0 < elo1`.
+
+    After each game, the log-likelihood ratio of the results under H1 and
+    H0 is compared with the bounds log(beta / (1 - alpha)) and
+    log((1 - beta) / alpha). The test accepts H0 or H1 once a bound is
+    crossed, with error rates of about `alpha` (accepting H1 when H0 holds)
+    and `beta` (accepting H0 when H1 holds).
+
+    Parameters
+    ----------
+    elo0, elo1 : float (optional)
+        The Elo differences of the two hypotheses.
+
+    alpha, beta : float (optional)
+        The target error rates.
+    """
+    def __init__(self, elo0=0., elo1=100., alpha=0.05, beta=0.05):
+        if not elo0 < elo1:
+            raise ValueError("elo0 must be less than elo1, not {} >= {}".format(elo0, elo1))
+        p0, p1 = elo_to_score(elo0), elo_to_score(elo1)
+        self.elo0, self.elo1 = elo0, elo1
+        self.win_llr = math.log(p1 / p0)
+        self.loss_llr = math.log((1 - p1) / (1 - p0))
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    def llr(self, wins, losses):
+        """Return the log-likelihood ratio of H1 to H0 of a result. """
+        return wins * self.win_llr + losses * self.loss_llr
+
+    def status(self, wins, losses):
+        """Return "H1" or "H0" if the test accepts that hypothesis after
+        `wins` wins and `losses` losses, or None if it must go on.
+        """
+        llr = self.llr(wins, losses)
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
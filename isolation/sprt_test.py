@@ -0,0 +1,54 @@
+"""Unit tests for the sequential probability ratio test and the win rate
+confidence intervals.
+"""
+
+import random
+import unittest
+
+from sprt import SPRT, elo_to_score, score_to_elo, wilson_interval
+
+
+class SPRTTest(unittest.TestCase):
+    """Unit tests for the match statistics"""
+
+    def test_elo(self):
+        self.assertEqual(elo_to_score(0.), 0.5)
+        self.assertAlmostEqual(elo_to_score(400.), 10. / 11.)
+        for elo in (-250., 0., 35., 600.):
+            self.assertAlmostEqual(score_to_elo(elo_to_score(elo)), elo)
+        self.assertEqual(score_to_elo(1.), float("inf"))
+
+    def test_wilson_interval(self):
+        low, high = wilson_interval(50, 100)
+        self.assertAlmostEqual(low, 0.4038, places=3)
+        self.assertAlmostEqual(high, 0.5962, places=3)
+        self.assertEqual(wilson_interval(0, 0), (0., 1.))
+        low, high = wilson_interval(20, 20)
+        self.assertEqual(high, 1.)
+        self.assertGreater(low, 0.8)
+
+    def test_decisions(self):
+        # simulated matches at the elo of each hypothesis are decided for it
+        # in most runs, after far fewer games than the worst case
+        sprt = SPRT(elo0=0., elo1=100.)
+        rng = random.Random(0)
+        for elo, hypothesis in ((0., "H0"), (100., "H1")):
+            p = elo_to_score(elo)
+            correct, games = 0, 0
+            for _ in range(200):
+                wins = losses = 0
+                while sprt.status(wins, losses) is None:
+                    if rng.random() < p:
+                        wins += 1
+                    else:
+                        losses += 1
+                correct += sprt.status(wins, losses) == hypothesis
+                games += wins + losses
+            self.assertGreater(correct, 0.9 * 200)
+            self.assertLess(games / 200, 400)
+        with self.assertRaises(ValueError):
+            SPRT(elo0=50., elo1=0.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,56 +8,167 @@ players, and the players play each match twice -- once as the first player and
 once as the second player. Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
 """
+import bisect
 import itertools
+import multiprocessing
+import os
 import random
 import warnings
 
 from collections import namedtuple
 
-from isolation import Board
+from isolation import BitBoard
+from game_archive import ArchiveWriter
+from sprt import wilson_interval
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
-from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score, custom_score_2, custom_score_3)
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer, SEARCH_MODES, SelectiveSearch,
+                        custom_score, custom_score_2, custom_score_3)
 
 NUM_MATCHES = 10  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+BOARD_CLASS = BitBoard  # board engine used to referee the matches
+# worker processes; 1 plays serially. Parallel play is opt-in: the games
+# compete for the CPU with their time limits running, and the workers are
+# only pinned to cores where the OS supports it (Linux, not macOS), so use
+# at most os.cpu_count() // 2 and compare the win rates with a serial run
+NUM_PROCESSES = 1
+# archive of every game played, e.g. "tournament_games.bin"; None disables it
+ARCHIVE_FILE = None
+# stop the matches of a test agent against an opponent once this test
+# decides whether the test agent is stronger, e.g.
+# sprt.SPRT(elo0=0., elo1=100., alpha=0.05, beta=0.05); None always plays
+# NUM_MATCHES, so every win rate is over the same number of games
+SPRT_TEST = None
+NUM_POSITIONS = 10  # positions searched by each search mode
+SEARCH_DEPTH = 9  # depth of the iterative deepening of each search mode
+# upper edges (ms) of the bins of the move latency histograms; the last
+# bin holds the moves at or over the time limit
+LATENCY_BINS = (5, 10, 25, 50, 100, 130, 140, TIME_LIMIT)
+
+# the reductions and futility margin of the AB_Selective agent; see
+# game_agent.SelectiveSearch
+SELECTIVE_SEARCH = SelectiveSearch(reduction_depth=3, reduction_moves=2, reduction=1,
+                                   futility_depth=1, futility_margin=2.)
 
 DESCRIPTION = """
 This script evaluates the performance of the custom_score evaluation
 function against a baseline agent using alpha-beta search and iterative
 deepening (ID) called `AB_Improved`. The three `AB_Custom` agents use
 ID and alpha-beta search with the custom_score functions defined in
-game_agent.py.
+game_agent.py, and `AB_Selective` adds the late move reductions and
+futility pruning of SELECTIVE_SEARCH to `AB_Custom`.
 """
 
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
+def random_opening(cpu_agent, agent):
+    """Return a random first move and response for a fair match. """
+    game = BOARD_CLASS(cpu_agent.player, agent.player)
+    opening = []
+    for _ in range(2):
+        move = random.choice(game.get_legal_moves())
+        game.apply_move(move)
+        opening.append(move)
+    return opening
+
+
+def play_fair_match(cpu_agent, agent, opening):
+    """Play a test agent against a cpu agent from the same opening twice,
+    first with the cpu agent as player 1 and then with the test agent, and
+    return a list of (test agent won, termination, move history, telemetry)
+    tuples for the two games, where telemetry is the list of the
+    `isolation.MoveTelemetry` of each move with the name of the agent that
+    made it in place of the player.
+    """
+    names = {cpu_agent.player: cpu_agent.name, agent.player: agent.name}
+    results = []
+    for game in (BOARD_CLASS(cpu_agent.player, agent.player),
+                 BOARD_CLASS(agent.player, cpu_agent.player)):
+        for move in opening:
+            game.apply_move(move)
+        telemetry = []
+        winner, history, termination = game.play(time_limit=TIME_LIMIT, telemetry=telemetry)
+        results.append((winner == agent.player, termination, history,
+                        [record._replace(player=names[record.player]) for record in telemetry]))
+    return results
+
+
+def init_worker(next_core, cores):
+    """Pool initializer that pins each worker process to its own core, so
+    that concurrent games do not compete for CPU time within their move time
+    limits, and reseeds the random module forked from the parent. Pinning
+    is skipped where the OS does not support it, e.g. on macOS.
+    """
+    random.seed()
+    with next_core.get_lock():
+        core = cores[next_core.value % len(cores)]
+        next_core.value += 1
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+
+
+def make_pool(processes):
+    """Return a process pool with at most one worker per available core, or
+    None to play serially if fewer than two workers would be used.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    processes = min(processes or 1, len(cores))
+    if processes < 2:
+        return None
+    return multiprocessing.Pool(processes, initializer=init_worker,
+                                initargs=(multiprocessing.Value("i", 0), cores))
+
+
+def play_round(cpu_agent, test_agents, win_counts, num_matches, pool=None, archive=None,
+               telemetry=None):
     """Compare the test agents to the cpu agent in "fair" matches.
 
     "Fair" matches use random starting locations and force the agents to
     play as both first and second player to control for advantages resulting
     from choosing better opening moves or having first initiative to move.
+
+    If a process pool is given, the fair matches are spread across its
+    workers, one fair match per task; the results are tallied in the same
+    order as the serial games, so the counts do not depend on scheduling.
+
+    If a `game_archive.ArchiveWriter` is given, every game is appended to it,
+    and if a `telemetry` dict is given, the telemetry of every move (see
+    play_fair_match()) is appended to the list `telemetry[name]` of the
+    agent that made it.
     """
     timeout_count = 0
     forfeit_count = 0
-    for _ in range(num_matches):
 
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
-                    for agent in test_agents], [])
+    # each test agent plays the same random opening in every match
+    matches = []
+    for _ in range(num_matches):
+        opening = random_opening(cpu_agent, test_agents[0])
+        matches.extend((cpu_agent, agent, opening) for agent in test_agents)
 
-        # initialize all games with a random move and response
-        for _ in range(2):
-            move = random.choice(games[0].get_legal_moves())
-            for game in games:
-                game.apply_move(move)
+    if pool is None:
+        results = itertools.starmap(play_fair_match, matches)
+    else:
+        results = pool.starmap(play_fair_match, matches, chunksize=1)
 
-        # play all games and tally the results
-        for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
-            win_counts[winner] += 1
+    # tally the results
+    for (_, agent, opening), games in zip(matches, results):
+        for seat, (test_won, termination, history, moves) in enumerate(games):
+            win_counts[agent.player if test_won else cpu_agent.player] += 1
+            if telemetry is not None:
+                for record in moves:
+                    telemetry.setdefault(record.player, []).append(record)
+            if archive is not None:
+                # the test agent is player 2 in the first game and player 1
+                # in the second
+                names = (cpu_agent.name, agent.name) if seat == 0 else (agent.name, cpu_agent.name)
+                test_seat = 1 - seat
+                archive.append(names[0], names[1], test_seat if test_won else seat,
+                               termination, opening, history)
 
             if termination == "timeout":
                 timeout_count += 1
@@ -67,48 +178,125 @@ def play_round(cpu_agent, test_agents, win_counts, num_matches):
     return timeout_count, forfeit_count
 
 
+def play_sprt_round(cpu_agent, test_agents, win_counts, game_counts, max_matches, sprt,
+                    pool=None, archive=None, batch_size=1, telemetry=None):
+    """Compare the test agents to the cpu agent in "fair" matches like
+    play_round(), but stop playing the matches of a test agent as soon as
+    the sequential test `sprt` accepts a hypothesis, or after `max_matches`
+    matches. The matches are played `batch_size` at a time, e.g. one per
+    worker of the pool.
+
+    Returns
+    -------
+    (int, int, dict)
+        The number of timeouts and forfeits, and the SPRT decision ("H0",
+        "H1" or None) of each test agent.
+    """
+    timeout_count = 0
+    forfeit_count = 0
+    decisions = {agent.player: None for agent in test_agents}
+    matches = 0
+    while matches < max_matches:
+        undecided = [agent for agent in test_agents if decisions[agent.player] is None]
+        if not undecided:
+            break
+        num_matches = min(batch_size, max_matches - matches)
+        wins = {agent.player: 0 for agent in undecided}
+        wins[cpu_agent.player] = 0
+        counts = play_round(cpu_agent, undecided, wins, num_matches, pool, archive, telemetry)
+        timeout_count += counts[0]
+        forfeit_count += counts[1]
+        matches += num_matches
+        for agent in undecided:
+            win_counts[agent.player] += wins[agent.player]
+            win_counts[cpu_agent.player] += 2 * num_matches - wins[agent.player]
+            game_counts[agent.player] += 2 * num_matches
+            decisions[agent.player] = sprt.status(
+                win_counts[agent.player], game_counts[agent.player] - win_counts[agent.player])
+    return timeout_count, forfeit_count, decisions
+
+
 def update(total_wins, wins):
     for player in total_wins:
         total_wins[player] += wins[player]
     return total_wins
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
-    """Play matches between the test agent and each cpu_agent individually. """
+def play_matches(cpu_agents, test_agents, num_matches, processes=1, archive_file=None,
+                 sprt=None):
+    """Play matches between the test agent and each cpu_agent individually,
+    spreading the fair matches of each round over `processes` workers, and
+    append the games to the archive at `archive_file` if given.
+
+    If a `sprt.SPRT` test is given, each test agent plays at most
+    `num_matches` matches against each cpu agent, stopping as soon as the
+    test accepts a hypothesis (see play_sprt_round()).
+
+    The move latency and search telemetry of every agent is summarized
+    after the results (see print_telemetry()).
+    """
+    telemetry = {}
     total_wins = {agent.player: 0 for agent in test_agents}
+    total_games = {agent.player: 0 for agent in test_agents}
     total_timeouts = 0.
     total_forfeits = 0.
-    total_matches = 2 * num_matches * len(cpu_agents)
 
     print("\n{:^9}{:^13}".format("Match #", "Opponent") + ''.join(['{:^13}'.format(x[1].name) for x in enumerate(test_agents)]))
     print("{:^9}{:^13} ".format("", "") +  ' '.join(['{:^5}| {:^5}'.format("Won", "Lost") for x in enumerate(test_agents)]))
 
-    for idx, agent in enumerate(cpu_agents):
-        wins = {key: 0 for (key, value) in test_agents}
-        wins[agent.player] = 0
-
-        print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
-
-        counts = play_round(agent, test_agents, wins, num_matches)
-        total_timeouts += counts[0]
-        total_forfeits += counts[1]
-        total_wins = update(total_wins, wins)
-        _total = 2 * num_matches
-        round_totals = sum([[wins[agent.player], _total - wins[agent.player]]
-                            for agent in test_agents], [])
-        print(' ' + ' '.join([
-            '{:^5}| {:^5}'.format(
-                round_totals[i],round_totals[i+1]
-            ) for i in range(0, len(round_totals), 2)
-        ]))
+    pool = make_pool(processes)
+    archive = None if archive_file is None else ArchiveWriter(archive_file)
+    try:
+        for idx, agent in enumerate(cpu_agents):
+            wins = {key: 0 for (key, value) in test_agents}
+            wins[agent.player] = 0
+            games = {key: 2 * num_matches for (key, value) in test_agents}
+
+            print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
+
+            if sprt is None:
+                counts = play_round(agent, test_agents, wins, num_matches, pool, archive,
+                                    telemetry)
+            else:
+                games = {key: 0 for (key, value) in test_agents}
+                counts = play_sprt_round(agent, test_agents, wins, games, num_matches, sprt,
+                                         pool, archive, batch_size=processes or 1,
+                                         telemetry=telemetry)
+            total_timeouts += counts[0]
+            total_forfeits += counts[1]
+            total_wins = update(total_wins, wins)
+            total_games = update(total_games, games)
+            round_totals = sum([[wins[agent.player], games[agent.player] - wins[agent.player]]
+                                for agent in test_agents], [])
+            print(' ' + ' '.join([
+                '{:^5}| {:^5}'.format(
+                    round_totals[i],round_totals[i+1]
+                ) for i in range(0, len(round_totals), 2)
+            ]))
+            if sprt is not None:
+                print("{:^9}{:^13}".format("", "SPRT") + ''.join([
+                    '{:^13}'.format(counts[2][agent.player] or "-") for agent in test_agents]))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if archive is not None:
+            archive.close()
 
     print("-" * 74)
     print('{:^9}{:^13}'.format("", "Win Rate:") +
         ''.join([
             '{:^13}'.format(
-                "{:.1f}%".format(100 * total_wins[x[1].player] / total_matches)
+                "{:.1f}%".format(100 * total_wins[x[1].player] / total_games[x[1].player])
             ) for x in enumerate(test_agents)
     ]))
+    print('{:^9}{:^13}'.format("", "95% CI:") + ''.join([
+        '{:^13}'.format("{:.1f}-{:.1f}%".format(
+            *(100 * p for p in wilson_interval(total_wins[agent.player], total_games[agent.player]))))
+        for agent in test_agents]))
+    if sprt is not None:
+        print(("\nSPRT: H0 = {:+.0f} Elo, H1 = {:+.0f} Elo against each opponent; "
+               "{} games played").format(sprt.elo0, sprt.elo1, int(sum(total_games.values()))))
 
     if total_timeouts:
         print(("\nThere were {} timeouts during the tournament -- make sure " +
@@ -119,6 +307,100 @@ def play_matches(cpu_agents, test_agents, num_matches):
         print(("\nYour ID search forfeited {} games while there were still " +
                "legal moves available to play.\n").format(total_forfeits))
 
+    print_telemetry(telemetry)
+
+
+def latency_histogram(records, bins=LATENCY_BINS):
+    """Return the number of moves of a list of `isolation.MoveTelemetry`
+    whose time used falls in each bin: below bins[0] ms, then in
+    [bins[i - 1], bins[i]), and at or above bins[-1] in the last one.
+    """
+    counts = [0] * (len(bins) + 1)
+    for record in records:
+        counts[bisect.bisect_right(bins, record.time_used)] += 1
+    return counts
+
+
+def summarize_telemetry(records):
+    """Return (moves, mean ms, max ms, min ms left, mean depth, nodes per
+    second, mean tt hit rate) of a list of `isolation.MoveTelemetry`; the
+    search statistics are None if no move reported them.
+    """
+    times = [record.time_used for record in records]
+    searched = [record for record in records if record.nodes is not None]
+    rates = [record.tt_hit_rate for record in searched if record.tt_hit_rate is not None]
+    search_time = sum(record.time_used for record in searched) / 1000.
+    return (len(records), sum(times) / len(times), max(times),
+            min(record.time_left for record in records),
+            sum(record.depth for record in searched) / len(searched) if searched else None,
+            sum(record.nodes for record in searched) / search_time if search_time else None,
+            sum(rates) / len(rates) if rates else None)
+
+
+def print_telemetry(telemetry, bins=LATENCY_BINS):
+    """Print the move latency histogram and search statistics of each agent
+    from the telemetry collected by play_round().
+    """
+    labels = ["<{}".format(edge) for edge in bins] + [">={}".format(bins[-1])]
+    print("\nMove latency (ms):\n")
+    print("{:<13}".format("Agent") + "".join("{:>7}".format(label) for label in labels))
+    for name in sorted(telemetry):
+        print("{:<13}".format(name) +
+              "".join("{:>7}".format(count) for count in latency_histogram(telemetry[name], bins)))
+
+    print("\n{:<13}{:>7}{:>8}{:>8}{:>9}{:>7}{:>10}{:>8}".format(
+        "Agent", "Moves", "Mean ms", "Max ms", "Min left", "Depth", "kNodes/s", "TT hit"))
+    for name in sorted(telemetry):
+        moves, mean, slowest, margin, depth, speed, hit_rate = summarize_telemetry(telemetry[name])
+        print("{:<13}{:>7}{:>8.1f}{:>8.1f}{:>9.1f}{:>7}{:>10}{:>8}".format(
+            name, moves, mean, slowest, margin,
+            "-" if depth is None else "{:.1f}".format(depth),
+            "-" if speed is None else "{:.1f}".format(speed / 1000.),
+            "-" if hit_rate is None else "{:.0%}".format(hit_rate)))
+
+
+def search_mode_nodes(num_positions, depth, score_fn=improved_score):
+    """Search the same random positions to `depth` with each search mode of
+    `AlphaBetaPlayer` and return, for each mode, the average number of nodes
+    visited by the iterative deepening iteration of each depth.
+    """
+    openings = []
+    for _ in range(num_positions):
+        game = BOARD_CLASS("Player1", "Player2")
+        opening = []
+        for _ in range(4):
+            move = random.choice(game.get_legal_moves())
+            game.apply_move(move)
+            opening.append(move)
+        openings.append(opening)
+
+    nodes = {}
+    for mode in SEARCH_MODES:
+        player = AlphaBetaPlayer(score_fn=score_fn, search_mode=mode)
+        player.time_left = lambda: float("inf")
+        nodes[mode] = [0] * depth
+        for opening in openings:
+            game = BOARD_CLASS(player, "Opponent")
+            for move in opening:
+                game.apply_move(move)
+            player.reset_search()
+            player.iterative_deepening(game, depth_limit=depth)
+            for d, count in player.node_counts.items():
+                nodes[mode][d - 1] += count / num_positions
+    return nodes
+
+
+def print_search_mode_nodes(num_positions, depth):
+    """Print the table of search_mode_nodes(). """
+    nodes = search_mode_nodes(num_positions, depth)
+    print("\nAverage nodes per iteration of {} positions:\n".format(num_positions))
+    print("{:^9}".format("Depth") + ''.join('{:^13}'.format(mode) for mode in SEARCH_MODES))
+    for d in range(depth):
+        print("{:^9}".format(d + 1) +
+              ''.join('{:^13.0f}'.format(nodes[mode][d]) for mode in SEARCH_MODES))
+    print("{:^9}".format("Total") +
+          ''.join('{:^13.0f}'.format(sum(nodes[mode])) for mode in SEARCH_MODES))
+
 
 def main():
 
@@ -128,7 +410,9 @@ def main():
         Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
         Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
         Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score, selective=SELECTIVE_SEARCH),
+              "AB_Selective")
     ]
 
     # Define a collection of agents to compete against the test agents
@@ -146,7 +430,12 @@ def main():
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    play_matches(cpu_agents, test_agents, NUM_MATCHES, NUM_PROCESSES, ARCHIVE_FILE, SPRT_TEST)
+
+    print("{:^74}".format("*************************"))
+    print("{:^74}".format("Search Modes"))
+    print("{:^74}".format("*************************"))
+    print_search_mode_nodes(NUM_POSITIONS, SEARCH_DEPTH)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+"""Unit tests for the tournament runner"""
+
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import tournament
+from game_archive import ArchiveWriter, GameArchive
+from isolation import Board, MoveTelemetry
+from sprt import SPRT
+from game_agent import AlphaBetaPlayer
+from sample_players import RandomPlayer, GreedyPlayer, improved_score
+from tournament import Agent
+
+
+class PlayRoundTest(unittest.TestCase):
+    """Unit tests for serial and process pool rounds"""
+
+    def setUp(self):
+        self.cpu_agent = Agent(RandomPlayer(), "Random")
+        self.test_agents = [Agent(GreedyPlayer(), "Greedy"),
+                            Agent(GreedyPlayer(score_fn=improved_score), "Greedy_Improved")]
+
+    def check_round(self, pool):
+        wins = {agent.player: 0 for agent in self.test_agents + [self.cpu_agent]}
+        telemetry = {}
+        timeouts, forfeits = tournament.play_round(self.cpu_agent, self.test_agents,
+                                                   wins, 3, pool, telemetry=telemetry)
+        self.assertEqual(sum(wins.values()), 2 * 3 * len(self.test_agents))
+        self.assertEqual((timeouts, forfeits), (0, 0))
+        self.assertEqual(sorted(telemetry),
+                         sorted(agent.name for agent in self.test_agents + [self.cpu_agent]))
+        for name, records in telemetry.items():
+            self.assertTrue(all(record.player == name for record in records))
+            self.assertEqual(sum(tournament.latency_histogram(records)), len(records))
+
+    def test_serial(self):
+        self.check_round(None)
+
+    def test_pool(self):
+        next_core = multiprocessing.Value("i", 0)
+        with multiprocessing.Pool(2, initializer=tournament.init_worker,
+                                  initargs=(next_core, [0])) as pool:
+            self.check_round(pool)
+
+    def test_archive(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "games.bin")
+            with ArchiveWriter(path) as archive:
+                wins = {agent.player: 0 for agent in self.test_agents + [self.cpu_agent]}
+                tournament.play_round(self.cpu_agent, self.test_agents, wins, 2, None, archive)
+            with GameArchive(path) as archive:
+                self.assertEqual(len(archive), 2 * 2 * len(self.test_agents))
+                names = {agent.name: agent.player for agent in self.test_agents + [self.cpu_agent]}
+                archived_wins = {player: 0 for player in wins}
+                for record in archive:
+                    self.assertIn(self.cpu_agent.name, (record.player_1, record.player_2))
+                    self.assertEqual(record.opening, 2)
+                    # replay the game: the player to move at the end lost
+                    game = Board(record.player_1, record.player_2)
+                    for move in record.moves:
+                        self.assertIn(move, game.get_legal_moves())
+                        game.apply_move(move)
+                    self.assertEqual(game.get_legal_moves(), [])
+                    self.assertEqual(record.winner, len(record.moves) & 1 ^ 1)
+                    winner = (record.player_1, record.player_2)[record.winner]
+                    archived_wins[names[winner]] += 1
+                self.assertEqual(archived_wins, wins)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_sprt_round(self):
+        # a loose test decides after the first matches; a strict one plays
+        # all matches
+        for sprt, max_games in ((SPRT(-400., 400., alpha=0.3, beta=0.3), 10),
+                                (SPRT(0., 1.), 4)):
+            wins = {agent.player: 0 for agent in self.test_agents + [self.cpu_agent]}
+            games = {agent.player: 0 for agent in self.test_agents}
+            timeouts, forfeits, decisions = tournament.play_sprt_round(
+                self.cpu_agent, self.test_agents, wins, games, max_games // 2, sprt)
+            self.assertEqual((timeouts, forfeits), (0, 0))
+            self.assertEqual(wins[self.cpu_agent.player],
+                             sum(games.values()) - sum(wins[a.player] for a in self.test_agents))
+            for agent in self.test_agents:
+                self.assertLessEqual(games[agent.player], max_games)
+                self.assertEqual(decisions[agent.player],
+                                 sprt.status(wins[agent.player], games[agent.player] - wins[agent.player]))
+                if decisions[agent.player] is None:
+                    self.assertEqual(games[agent.player], max_games)
+            if max_games == 4:
+                self.assertEqual(set(decisions.values()), {None})
+
+    def test_latency_histogram(self):
+        records = [MoveTelemetry("Agent", used, 150. - used, None, None, None)
+                   for used in (0., 4.9, 5., 60., 149.9, 150., 151.)]
+        self.assertEqual(tournament.latency_histogram(records, (5, 10, 100, 150)),
+                         [2, 1, 1, 1, 2])
+        moves, mean, slowest, margin, depth, speed, hit_rate = \
+            tournament.summarize_telemetry(records)
+        self.assertEqual((moves, slowest, margin), (7, 151., -1.))
+        self.assertEqual((depth, speed, hit_rate), (None, None, None))
+
+    def test_pickle_agent(self):
+        player = AlphaBetaPlayer()
+        player.time_left = lambda: 0.
+        self.assertIsNone(pickle.loads(pickle.dumps(player)).time_left)
+
+
+class SearchModeNodesTest(unittest.TestCase):
+    """Unit tests for the node counts of the search modes"""
+
+    def test_nodes(self):
+        nodes = tournament.search_mode_nodes(2, 4)
+        self.assertEqual(sorted(nodes), sorted(tournament.SEARCH_MODES))
+        for counts in nodes.values():
+            self.assertEqual(len(counts), 4)
+            self.assertTrue(all(count > 0 for count in counts))
+
+
+if __name__ == '__main__':
+    unittest.main()
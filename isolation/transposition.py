@@ -0,0 +1,207 @@
+"""This file contains a bounded transposition table for caching alpha-beta
+search results by the Zobrist hash of a position (`Board.hash()`).
+"""
+
+import ctypes
+from collections import namedtuple
+from multiprocessing.sharedctypes import RawArray
+
+# bound types of a stored score
+EXACT = 0
+LOWER = 1   # the search failed high; the true score is at least `score`
+UPPER = 2   # the search failed low; the true score is at most `score`
+
+TTEntry = namedtuple("TTEntry", ["key", "depth", "score", "bound", "move"])
+
+
+def replace_always(old, depth):
+    """Replacement policy that always overwrites the stored entry. """
+    return True
+
+
+def replace_deeper(old, depth):
+    """Replacement policy that keeps the stored entry if it was searched to
+    a greater depth than the new result.
+    """
+    return depth >= old.depth
+
+
+REPLACEMENT_POLICIES = {
+    "always": replace_always,
+    "depth": replace_deeper,
+}
+
+
+def bound_type(score, alpha, beta):
+    """Return the bound type of a fail-soft search result obtained with the
+    window (alpha, beta).
+    """
+    if score <= alpha:
+        return UPPER
+    if score >= beta:
+        return LOWER
+    return EXACT
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results. Each position hashes to one
+    slot; when two positions collide the replacement policy decides which
+    entry is kept.
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots in the table.
+
+    replacement : str or callable (optional)
+        The name of a policy in `REPLACEMENT_POLICIES`, or a function
+        `policy(old_entry, new_depth)` that returns True if the stored entry
+        should be overwritten by a new result searched to `new_depth`.
+    """
+    def __init__(self, size=2**16, replacement="depth"):
+        if not callable(replacement):
+            replacement = REPLACEMENT_POLICIES[replacement]
+        self.size = size
+        self.replace = replacement
+        self.clear()
+
+    def clear(self):
+        """Remove every entry and reset the hit counters. """
+        self._slots = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        """Return the `TTEntry` stored for the position key, or None. """
+        self.probes += 1
+        entry = self._slots[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def lookup(self, key, depth, alpha, beta):
+        """Probe the table for a position about to be searched to `depth`
+        plies with the window (alpha, beta).
+
+        Returns
+        -------
+        (float or None, (int, int) or None)
+            The stored score if it is deep enough and its bound decides the
+            search window (None otherwise), and the stored best move for
+            move ordering (None if there is no entry).
+        """
+        entry = self.probe(key)
+        if entry is None:
+            return None, None
+        if entry.depth >= depth and (entry.bound == EXACT or
+                                     (entry.bound == LOWER and entry.score >= beta) or
+                                     (entry.bound == UPPER and entry.score <= alpha)):
+            return entry.score, entry.move
+        return None, entry.move
+
+    def store(self, key, depth, score, bound, move):
+        """Record the result of searching the position key to `depth` plies.
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist hash of the position.
+
+        depth : int
+            The number of plies searched below the position.
+
+        score : float
+            The score returned by the search.
+
+        bound : int
+            One of EXACT, LOWER or UPPER.
+
+        move : (int, int)
+            The best move found in the position, or None.
+        """
+        idx = key % self.size
+        old = self._slots[idx]
+        if old is None or old.key == key or self.replace(old, depth):
+            self._slots[idx] = TTEntry(key, depth, score, bound, move)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """Transposition table kept in shared memory, so that search processes
+    forked from the process that created it read and write the same
+    entries.
+
+    Entries are written without locks. Each slot holds the entry packed in
+    a data word and a score, plus the position key XORed with both, so a
+    slot torn by concurrent writes from two processes fails the key check
+    and reads as empty ("lockless hashing").
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots in the table.
+
+    replacement : str or callable (optional)
+        The replacement policy (see `TranspositionTable`).
+    """
+    VALID = 1 << 63
+    NO_MOVE = 0xffff
+
+    def __init__(self, size=2**16, replacement="depth"):
+        self._checks = RawArray(ctypes.c_uint64, size)
+        self._data = RawArray(ctypes.c_uint64, size)
+        self._scores = RawArray(ctypes.c_double, size)
+        # the bits of the scores, read through the same buffer
+        self._score_bits = (ctypes.c_uint64 * size).from_buffer(self._scores)
+        super().__init__(size, replacement)
+
+    def __getstate__(self):
+        # the view of the score bits cannot be pickled; a process started
+        # with the "spawn" method rebuilds it over the shared scores
+        state = self.__dict__.copy()
+        del state["_score_bits"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._score_bits = (ctypes.c_uint64 * self.size).from_buffer(self._scores)
+
+    def clear(self):
+        """Remove every entry and reset the hit counters of this process. """
+        for array in (self._checks, self._data, self._scores):
+            ctypes.memset(array, 0, ctypes.sizeof(array))
+        self.probes = 0
+        self.hits = 0
+
+    def _read(self, idx):
+        """Return the (key, TTEntry) stored in the slot `idx`, or None. """
+        data = self._data[idx]
+        if not data & self.VALID:
+            return None
+        score = self._scores[idx]
+        key = self._checks[idx] ^ data ^ self._score_bits[idx]
+        move = (data >> 18) & 0xffff
+        move = None if move == self.NO_MOVE else (move >> 8, move & 0xff)
+        return TTEntry(key, data & 0xffff, score, (data >> 16) & 3, move)
+
+    def probe(self, key):
+        """Return the `TTEntry` stored for the position key, or None. """
+        self.probes += 1
+        entry = self._read(key % self.size)
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        """Record the result of searching the position key to `depth` plies
+        (see `TranspositionTable.store`).
+        """
+        idx = key % self.size
+        old = self._read(idx)
+        if old is None or old.key == key or self.replace(old, depth):
+            packed = self.NO_MOVE if move is None else (move[0] << 8) | move[1]
+            data = self.VALID | (packed << 18) | (bound << 16) | depth
+            self._data[idx] = data
+            self._scores[idx] = score
+            self._checks[idx] = key ^ data ^ self._score_bits[idx]